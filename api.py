@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import sys
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import consultas
+from conexion import DB_PATH, PoolConexiones
+from exportacion import CacheLRU
+from migraciones import aplicar_migraciones
+from reportes import tablas_rotacion
+
+# API HTTP de solo lectura (sin Streamlit) con los mismos números que la app:
+#   GET /api/version                                   versión de datos
+#   GET /api/totales?anio=&semana=                     totales autoritativos (leer_totales_autoritativos)
+#   GET /api/totales/maquinas?anio=&semana=            totales por máquina de la semana
+#   GET /api/ranking?anio=&semana=                     ranking por ventas (df_rank de Reabastecimiento:
+#                                                      al programar la semana N se usa el de N-1)
+#   GET /api/rotacion/top?anio=&semana=&maquina=&limite=   productos más vendidos (Rotación)
+# Sin anio/semana se usa la última semana con datos. Cada respuesta lleva un ETag con la versión
+# de datos: si no hubo escrituras, un If-None-Match igual recibe 304 sin consultar nada más, y
+# los cuerpos ya armados se sirven de una caché LRU por (versión, ruta).
+#
+#   python api.py [--host 127.0.0.1] [--puerto 8502] [--db ruta]
+
+
+class ErrorSolicitud(Exception):
+    pass
+
+
+def _entero(params, nombre, defecto=None, minimo=None, maximo=None):
+    valor = params.get(nombre, [None])[0]
+    if valor is None or valor == "":
+        return defecto
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ErrorSolicitud(f"'{nombre}' debe ser un entero")
+    if (minimo is not None and numero < minimo) or (maximo is not None and numero > maximo):
+        raise ErrorSolicitud(f"'{nombre}' fuera de rango")
+    return numero
+
+
+def _semana(conn, params):
+    año = _entero(params, "anio", minimo=1)
+    semana = _entero(params, "semana", minimo=1, maximo=53)
+    if año is None or semana is None:
+        ultima = consultas.ultima_semana(conn)
+        if ultima is None:
+            raise ErrorSolicitud("No hay datos registrados")
+        año, semana = año or ultima[0], semana or ultima[1]
+    try:
+        date.fromisocalendar(año, semana, 1)
+    except ValueError:
+        raise ErrorSolicitud(f"La semana {semana} no existe en {año}")
+    return año, semana
+
+
+def _registros(df):
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def version(conn, params):
+    return {"version": consultas.version_datos(conn)}
+
+
+def totales(conn, params):
+    año, semana = _semana(conn, params)
+    ventas, egresos = consultas.leer_totales_autoritativos(conn, año, semana)
+    return {"iso_year": año, "iso_week": semana, "ventas": ventas, "egresos": egresos, "neto": ventas - egresos}
+
+
+def totales_maquinas(conn, params):
+    año, semana = _semana(conn, params)
+    return {"iso_year": año, "iso_week": semana, "maquinas": _registros(consultas.totales_maquinas_semana(conn, año, semana))}
+
+
+def ranking(conn, params):
+    año, semana = _semana(conn, params)
+    df_v = consultas.ventas_semana(conn, año, semana)
+    df_rank = df_v.groupby("maquina", sort=False)["ventas"].sum().reset_index().sort_values("ventas", ascending=False)
+    df_rank.insert(0, "posicion", range(1, len(df_rank) + 1))
+    return {"iso_year": año, "iso_week": semana, "ranking": _registros(df_rank)}
+
+
+def rotacion_top(conn, params):
+    año, semana = _semana(conn, params)
+    limite = _entero(params, "limite", 10, minimo=1, maximo=500)
+    maquina = params.get("maquina", [None])[0]
+    if maquina:
+        df = consultas.rotacion_semana(conn, año, semana, maquina).drop(columns="rowid")
+    else:
+        df = consultas.rotacion_flota(conn, año, semana, año, semana)
+    productos = tablas_rotacion(df)[2].head(limite) if not df.empty else df
+    return {"iso_year": año, "iso_week": semana, "maquina": maquina, "productos": _registros(productos)}
+
+
+RUTAS = {
+    "/api/version": version,
+    "/api/totales": totales,
+    "/api/totales/maquinas": totales_maquinas,
+    "/api/ranking": ranking,
+    "/api/rotacion/top": rotacion_top,
+}
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive: los sondeos reutilizan la conexión
+    disable_nagle_algorithm = True      # cabeceras y cuerpo van en escrituras separadas
+    server_version = "PuntoExpressAPI/1.0"
+
+    def _responder(self, estado, cuerpo=b"", etag=None):
+        self.send_response(estado)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if cuerpo:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if cuerpo and self.command != "HEAD":
+            self.wfile.write(cuerpo)
+
+    def _error(self, estado, mensaje):
+        self._responder(estado, json.dumps({"error": mensaje}, ensure_ascii=False).encode())
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        manejador = RUTAS.get(partes.path.rstrip("/"))
+        if manejador is None:
+            self._error(404, f"Ruta desconocida: {partes.path}")
+            return
+        conn = self.server.pool.conexion()
+        # Una sola transacción de lectura: la versión (ETag) y el cuerpo corresponden al mismo estado
+        # de la base. La versión cambia con cada escritura (misma transacción): sirve de ETag para toda la API
+        conn.execute("BEGIN")
+        try:
+            etag = f'"v{consultas.version_datos(conn)}"'
+            if etag in [e.strip() for e in self.headers.get("If-None-Match", "").split(",")]:
+                cuerpo = None
+            else:
+                cuerpo = self.server.cache.obtener(
+                    (etag, partes.path.rstrip("/"), partes.query),
+                    lambda: json.dumps(manejador(conn, parse_qs(partes.query)), ensure_ascii=False).encode(),
+                )
+        except ErrorSolicitud as e:
+            self._error(400, str(e))
+            return
+        except Exception as e:
+            self._error(500, f"{type(e).__name__}: {e}")
+            return
+        finally:
+            conn.execute("ROLLBACK")
+        if cuerpo is None:
+            self._responder(304, etag=etag)
+        else:
+            self._responder(200, cuerpo, etag)
+
+    do_HEAD = do_GET
+
+    def log_message(self, formato, *args):
+        if self.server.registrar:
+            super().log_message(formato, *args)
+
+
+class ServidorAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, ruta=DB_PATH, registrar=True):
+        super().__init__(direccion, Manejador)
+        self.pool = PoolConexiones(ruta)
+        self.cache = CacheLRU(max_bytes=16 * 1024 * 1024)
+        self.registrar = registrar
+
+    def server_close(self):
+        super().server_close()
+        self.pool.cerrar()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    host = args[args.index("--host") + 1] if "--host" in args else "127.0.0.1"
+    puerto = int(args[args.index("--puerto") + 1]) if "--puerto" in args else 8502
+    ruta = args[args.index("--db") + 1] if "--db" in args else DB_PATH
+
+    # Mismo esquema que la app (weekly_machine_totals, version_datos...) antes de aceptar pedidos
+    conn = sqlite3.connect(ruta, timeout=30)
+    aplicar_migraciones(conn)
+    conn.close()
+
+    servidor = ServidorAPI((host, puerto), ruta, registrar="--silencioso" not in args)
+    print(f"API de Punto Express en http://{host}:{puerto}/api/totales (base: {ruta})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
@@ -0,0 +1,126 @@
+import http.client
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from consultas import marcar_cambio
+
+# Prueba de carga local de api.py: el servidor corre en su propio proceso sobre una copia de la
+# base y N clientes con keep-alive sondean las rutas durante unos segundos en tres escenarios:
+# respuestas sin caché (consulta + JSON), respuestas de la caché por versión y sondeos con
+# If-None-Match (304). Al final una escritura cambia la versión y el ETag viejo deja de valer.
+#
+#   python benchmarks/bench_api.py [--clientes 8] [--segundos 3] [--db ventas_semanales.db]
+
+RUTAS = [
+    "/api/totales?anio=2025&semana=38",
+    "/api/totales/maquinas?anio=2025&semana=38",
+    "/api/ranking?anio=2025&semana=38",
+    "/api/rotacion/top?anio=2025&semana=38&maquina=Norte",
+    "/api/rotacion/top?anio=2025&semana=38",
+]
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def cliente(puerto, fin, modo, resultados, idx):
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    etags = {}
+    n, latencias = 0, []
+    while time.perf_counter() < fin:
+        ruta = RUTAS[(idx + n) % len(RUTAS)]
+        cabeceras = {}
+        if modo == "sin_cache":
+            ruta += f"&n={idx}-{n}"          # parámetro ignorado: otra clave de caché
+        elif modo == "304" and ruta in etags:
+            cabeceras["If-None-Match"] = etags[ruta]
+        t = time.perf_counter()
+        conn.request("GET", ruta, headers=cabeceras)
+        r = conn.getresponse()
+        r.read()
+        latencias.append(time.perf_counter() - t)
+        assert r.status in (200, 304), (ruta, r.status)
+        etags[ruta] = r.getheader("ETag")
+        n += 1
+    conn.close()
+    resultados[idx] = latencias
+
+
+def escenario(puerto, modo, clientes, segundos):
+    resultados = [None] * clientes
+    fin = time.perf_counter() + segundos
+    hilos = [threading.Thread(target=cliente, args=(puerto, fin, modo, resultados, i)) for i in range(clientes)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    latencias = sorted(l for r in resultados for l in r)
+    return len(latencias) / segundos, latencias[len(latencias) // 2] * 1000, latencias[int(len(latencias) * 0.95)] * 1000
+
+
+def pedir(puerto, ruta, cabeceras=None):
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    conn.request("GET", ruta, headers=cabeceras or {})
+    r = conn.getresponse()
+    r.read()
+    conn.close()
+    return r.status, r.getheader("ETag")
+
+
+def main():
+    args = sys.argv[1:]
+    clientes = int(args[args.index("--clientes") + 1]) if "--clientes" in args else 8
+    segundos = float(args[args.index("--segundos") + 1]) if "--segundos" in args else 3.0
+    origen = args[args.index("--db") + 1] if "--db" in args else os.path.join(RAIZ, "ventas_semanales.db")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "api.db")
+        shutil.copy(origen, ruta)
+        puerto = puerto_libre()
+        servidor = subprocess.Popen(
+            [sys.executable, os.path.join(RAIZ, "api.py"), "--db", ruta, "--puerto", str(puerto), "--silencioso"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            for _ in range(100):
+                try:
+                    pedir(puerto, "/api/version")
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+            print(f"{clientes} clientes keep-alive, {segundos:.0f}s por escenario\n")
+            for modo, nombre in (("sin_cache", "200 sin caché"), ("cache", "200 desde caché"), ("304", "304 If-None-Match")):
+                rps, p50, p95 = escenario(puerto, modo, clientes, segundos)
+                print(f"{nombre:20} {rps:8,.0f} req/s   p50 {p50:6.2f} ms   p95 {p95:6.2f} ms")
+
+            estado, etag = pedir(puerto, RUTAS[0])
+            assert pedir(puerto, RUTAS[0], {"If-None-Match": etag})[0] == 304
+            conn = sqlite3.connect(ruta, timeout=30)
+            with conn:
+                conn.execute("UPDATE resumen_semanal SET ventas = ventas + 1 WHERE iso_year = 2025 AND iso_week = 38 AND maquina = 'Norte'")
+                marcar_cambio(conn)
+            conn.close()
+            estado, nuevo = pedir(puerto, RUTAS[0], {"If-None-Match": etag})
+            assert estado == 200 and nuevo != etag, (estado, etag, nuevo)
+            print(f"\nTras una escritura: ETag {etag} -> {nuevo}, el sondeo con el ETag viejo recibe {estado}")
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+
+if __name__ == "__main__":
+    main()
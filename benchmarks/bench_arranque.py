@@ -0,0 +1,101 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Arranque en frío de la app: cada sección se abre en un proceso nuevo (AppTest) con
+# `python -X importtime`. Se mide cuándo sale el primer elemento hacia el navegador, la primera
+# ejecución completa del script (lo que espera el primer usuario de un proceso recién iniciado),
+# la segunda (lo que pagan las siguientes sesiones) y el tiempo de importación acumulado de los
+# paquetes pesados que cargó cada sección.
+#
+#   python benchmarks/bench_arranque.py [--db ventas_semanales.db] [--repeticiones 3]
+
+SECCIONES = ["Dashboard", "Control Ventas", "Reabastecimiento", "Rotación", "Mantenimiento", "Reportes"]
+PESADOS = ["pandas", "plotly", "fpdf", "openpyxl", "kaleido", "pyarrow"]
+
+HIJO = """
+import json
+import sys
+import time
+
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+from streamlit.testing.v1 import AppTest
+# Primer elemento enviado al navegador: primer ForwardMsg con un delta
+primer_delta = []
+enqueue = ScriptRunContext.enqueue
+def _enqueue(self, msg):
+    if not primer_delta and msg.HasField("delta"):
+        primer_delta.append(time.perf_counter())
+    return enqueue(self, msg)
+ScriptRunContext.enqueue = _enqueue
+app, seccion = sys.argv[1], sys.argv[2]
+at = AppTest.from_file(app, default_timeout=120)
+at.session_state["menu_navegacion"] = seccion
+t = time.perf_counter()
+at.run()
+primera = time.perf_counter() - t
+render = primer_delta[0] - t
+t = time.perf_counter()
+at.run()
+segunda = time.perf_counter() - t
+assert not at.exception, [e.value for e in at.exception]
+print(json.dumps({"render": render * 1000, "primera": primera * 1000, "segunda": segunda * 1000}))
+"""
+
+
+def importaciones(stderr):
+    # Acumulado (µs) por paquete raíz según -X importtime: se suma cada importación cuyo
+    # importador es de otro paquete (los hijos aparecen antes que el padre, con más sangría)
+    filas = []
+    for linea in stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", linea)
+        if m:
+            filas.append((len(m.group(2)), m.group(3).split(".")[0], int(m.group(1))))
+    acumulado, pila = {}, []
+    for nivel, raiz, micro in reversed(filas):
+        while pila and pila[-1][0] >= nivel:
+            pila.pop()
+        if not pila or pila[-1][1] != raiz:
+            acumulado[raiz] = acumulado.get(raiz, 0) + micro
+        pila.append((nivel, raiz))
+    return acumulado
+
+
+def medir(db, seccion):
+    with tempfile.TemporaryDirectory() as tmp:
+        if os.path.exists(db):
+            shutil.copy(db, os.path.join(tmp, "ventas_semanales.db"))
+        proceso = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", HIJO, os.path.join(RAIZ, "punto_express.py"), seccion],
+            cwd=tmp, capture_output=True, text=True, env={**os.environ, "HOME": tmp, "PYTHONPATH": RAIZ},
+        )
+    if proceso.returncode:
+        raise SystemExit(proceso.stderr[-3000:])
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado["importaciones"] = importaciones(proceso.stderr)
+    return resultado
+
+
+def main():
+    args = sys.argv[1:]
+    db = args[args.index("--db") + 1] if "--db" in args else os.path.join(RAIZ, "ventas_semanales.db")
+    repeticiones = int(args[args.index("--repeticiones") + 1]) if "--repeticiones" in args else 3
+
+    print(f"{'sección':18} {'1er elemento':>13} {'1ª ejecución':>13} {'2ª ejecución':>13}   importado (ms, acumulado)")
+    for seccion in SECCIONES:
+        medidas = [medir(db, seccion) for _ in range(repeticiones)]
+        render, primera, segunda = (sorted(m[k] for m in medidas)[len(medidas) // 2] for k in ("render", "primera", "segunda"))
+        importado = medidas[-1]["importaciones"]
+        paquetes = "  ".join(f"{p} {importado[p] / 1000:.0f}" for p in PESADOS if p in importado)
+        print(f"{seccion:18} {render:10.0f} ms {primera:10.0f} ms {segunda:10.0f} ms   {paquetes}")
+
+
+if __name__ == "__main__":
+    main()
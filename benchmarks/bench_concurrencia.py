@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_indices import poblar
+from conexion import PRAGMAS, PoolConexiones
+from consultas import marcar_cambio
+from migraciones import aplicar_migraciones
+
+# Throughput con N sesiones concurrentes: conexión única compartida (como antes, un cursor
+# de módulo usado por todos los hilos) contra el pool de conexiones por hilo bajo WAL.
+# Cada sesión repite lecturas del Dashboard/Control Ventas y, cada --cada operaciones, una escritura.
+# Las lecturas en paralelo solo escalan con varios núcleos; con uno, la diferencia viene de las escrituras.
+#
+#   python benchmarks/bench_concurrencia.py [--sesiones 20] [--segundos 5] [--cada 20] [--maquinas 50] [--años 2]
+
+LECTURAS = [
+    ("SELECT COALESCE(SUM(ventas),0), COALESCE(SUM(egresos),0) FROM weekly_machine_totals WHERE iso_year = ? AND iso_week = ?", "semana"),
+    ("SELECT maquina, ventas, egresos FROM weekly_machine_totals WHERE iso_year = ? AND iso_week = ?", "semana"),
+    ("SELECT semana, fecha, maquina, dia, ventas, egresos FROM resumen_semanal WHERE iso_year = ? AND iso_week = ? ORDER BY maquina, fecha", "semana"),
+    ("SELECT iso_year, iso_week, SUM(ventas) FROM weekly_machine_totals GROUP BY iso_year, iso_week ORDER BY iso_year DESC, iso_week DESC LIMIT 12", None),
+    ("SELECT substr(fecha, 1, 7), SUM(ventas) FROM resumen_semanal GROUP BY 1", None),
+]
+ESCRITURA = "UPDATE resumen_semanal SET ventas = ventas + 1 WHERE maquina = ? AND fecha = (SELECT MAX(fecha) FROM resumen_semanal)"
+
+
+def sesion(obtener, transaccion, maquinas, semanas, fin, contador, idx, cada):
+    ops = 0
+    n = 0
+    while time.perf_counter() < fin:
+        año, sem = semanas[-1 - (n % 8)]
+        if n % cada == cada - 1:
+            with transaccion() as tx:
+                tx.execute(ESCRITURA, (maquinas[(idx + n) % len(maquinas)],))
+                marcar_cambio(tx)
+        else:
+            sql, tipo = LECTURAS[n % len(LECTURAS)]
+            obtener().execute(sql, (año, sem) if tipo else ()).fetchall()
+        n += 1
+        ops += 1
+    contador[idx] = ops
+
+
+def correr(nombre, obtener, transaccion, maquinas, semanas, n_sesiones, segundos, cada):
+    contador = [0] * n_sesiones
+    fin = time.perf_counter() + segundos
+    hilos = [
+        threading.Thread(target=sesion, args=(obtener, transaccion, maquinas, semanas, fin, contador, i, cada))
+        for i in range(n_sesiones)
+    ]
+    t = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    total = time.perf_counter() - t
+    ops = sum(contador)
+    print(f"{nombre:32s} {ops:10,d} ops {ops / total:12,.0f} ops/s")
+    return ops / total
+
+
+def main():
+    args = sys.argv[1:]
+    n_sesiones = int(args[args.index("--sesiones") + 1]) if "--sesiones" in args else 20
+    segundos = float(args[args.index("--segundos") + 1]) if "--segundos" in args else 5
+    cada = int(args[args.index("--cada") + 1]) if "--cada" in args else 20
+    n_maquinas = int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 50
+    n_años = int(args[args.index("--años") + 1]) if "--años" in args else 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(ruta)
+        aplicar_migraciones(conn, hasta=1)
+        maquinas, semanas, n_res, _ = poblar(conn, n_maquinas, n_años)
+        aplicar_migraciones(conn)
+        conn.close()
+        print(f"Datos: {n_res:,} filas en resumen_semanal; {n_sesiones} sesiones durante {segundos:.0f}s\n")
+
+        # Antes: una conexión sin PRAGMAs compartida por todos los hilos. El lock serializa
+        # el acceso, que es lo que en la práctica ocurre con un único cursor de módulo.
+        compartida = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        lock = threading.RLock()
+
+        class Serializada:
+            def execute(self, *a):
+                with lock:
+                    return _Filas(compartida.execute(*a).fetchall())
+
+        class _Filas:
+            def __init__(self, filas):
+                self.filas = filas
+
+            def fetchall(self):
+                return self.filas
+
+        def transaccion_compartida():
+            class _Ctx:
+                def __enter__(self):
+                    lock.acquire()
+                    return compartida
+
+                def __exit__(self, tipo, *_):
+                    try:
+                        compartida.rollback() if tipo else compartida.commit()
+                    finally:
+                        lock.release()
+            return _Ctx()
+
+        antes = correr("conexión compartida", Serializada, transaccion_compartida,
+                       maquinas, semanas, n_sesiones, segundos, cada)
+        compartida.close()
+
+        pool = PoolConexiones(ruta, PRAGMAS)
+        despues = correr("pool por hilo (WAL)", pool.conexion, pool.transaccion,
+                         maquinas, semanas, n_sesiones, segundos, cada)
+        print(f"\nConexiones abiertas por el pool: {pool.abiertas}")
+        print(f"Mejora: x{despues / antes:.2f}")
+        pool.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from costos import agregar_costos, calcular_gasto, calcular_precio_unitario
+
+# Motor de costos de Rotación: tiempo de apply fila a fila con los helpers escalares contra
+# agregar_costos() en un histórico de flota. La equivalencia entre ambos caminos la cubre
+# tests/test_costos.py.
+#
+#   python benchmarks/bench_costos.py [--filas 1000000]
+
+
+def main():
+    args = sys.argv[1:]
+    n_filas = int(args[args.index("--filas") + 1]) if "--filas" in args else 1_000_000
+
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({
+        "costo_compra": rng.integers(500, 50000, n_filas).astype(float),
+        "unidad_compra": rng.choice(["unidad", "docena", "paquete"], n_filas),
+        "cantidad": rng.integers(1, 40, n_filas),
+        "unidades_por_paquete": rng.choice([6, 12, 24], n_filas),
+    })
+
+    t = time.perf_counter()
+    precio = df.apply(lambda r: calcular_precio_unitario(r["costo_compra"], r["unidad_compra"], r["unidades_por_paquete"]), axis=1)
+    gasto = df.apply(lambda r: calcular_gasto(r["costo_compra"], r["unidad_compra"], r["cantidad"], r["unidades_por_paquete"]), axis=1)
+    t_antes = time.perf_counter() - t
+
+    t = time.perf_counter()
+    res = agregar_costos(df)
+    t_despues = time.perf_counter() - t
+
+    assert np.allclose(precio, res["precio_unitario"]) and np.allclose(gasto, res["gasto_total"])
+    print(f"{n_filas:,} filas: apply {t_antes * 1000:,.0f} ms -> agregar_costos {t_despues * 1000:,.1f} ms  (x{t_antes / t_despues:,.0f})")
+
+
+if __name__ == "__main__":
+    main()
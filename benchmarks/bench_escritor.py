@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conexion import PRAGMAS, PoolConexiones
+from consultas import marcar_cambio
+from escritor import Escritor
+from migraciones import aplicar_migraciones
+
+# Escrituras concurrentes: una transacción por escritura desde cada hilo (pool) contra el
+# escritor único con group commit. Cada sesión inserta un día de ventas de una máquina.
+#
+#   python benchmarks/bench_escritor.py [--sesiones 20] [--escrituras 200]
+
+SQL = ("INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week) "
+       "VALUES ('Semana 1', ?, ?, 'Lunes', 1000, 200, 2024, 1)")
+
+
+def correr(nombre, prefijo, escribir_fila, n_sesiones, n_escrituras):
+    def sesion(i):
+        for j in range(n_escrituras):
+            # cada fase usa sus propias máquinas: (maquina, fecha) es único desde la migración 7
+            escribir_fila((f"2024-01-{j % 28 + 1:02d}", f"{prefijo} {i}-{j}"))
+
+    hilos = [threading.Thread(target=sesion, args=(i,)) for i in range(n_sesiones)]
+    t = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    total = time.perf_counter() - t
+    ops = n_sesiones * n_escrituras
+    print(f"{nombre:34s} {ops:8,d} escrituras {ops / total:10,.0f} /s")
+    return ops / total
+
+
+def main():
+    args = sys.argv[1:]
+    n_sesiones = int(args[args.index("--sesiones") + 1]) if "--sesiones" in args else 20
+    n_escrituras = int(args[args.index("--escrituras") + 1]) if "--escrituras" in args else 200
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(ruta)
+        aplicar_migraciones(conn)
+        conn.close()
+
+        pool = PoolConexiones(ruta, PRAGMAS)
+
+        def por_transaccion(params):
+            with pool.transaccion() as tx:
+                tx.execute(SQL, params)
+                marcar_cambio(tx)
+
+        antes = correr("una transacción por escritura", "Pool", por_transaccion, n_sesiones, n_escrituras)
+
+        escritor = Escritor(ruta, PRAGMAS)
+        despues = correr("escritor único (group commit)", "Escritor",
+                         lambda params: escritor.escribir(lambda tx: tx.execute(SQL, params)),
+                         n_sesiones, n_escrituras)
+
+        m = escritor.metricas()
+        print(f"\nLotes: {m['lotes']:,} · lote medio {m['lote_medio']:.1f} · máx. {m['lote_max']} · "
+              f"commit p50 {m['commit_p50_ms']:.2f} ms · p95 {m['commit_p95_ms']:.2f} ms")
+        print(f"Mejora: x{despues / antes:.2f}")
+
+        filas = sqlite3.connect(ruta).execute("SELECT COUNT(*) FROM resumen_semanal").fetchone()[0]
+        assert filas == 2 * n_sesiones * n_escrituras, filas
+        pool.cerrar()
+
+
+if __name__ == "__main__":
+    main()
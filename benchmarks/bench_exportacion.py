@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exportacion
+
+# Exportaciones bajo demanda: costo por rerun de armar el Excel/PDF en cada render (como antes)
+# contra crear el callable, más el primer clic (genera) y los siguientes (caché por huella).
+# Verifica además que un cambio en los datos cambie la huella y que el LRU respete el tope.
+#
+#   python benchmarks/bench_exportacion.py [--filas 20000] [--reruns 20]
+
+
+def marco(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "semana": rng.integers(1, 53, n).astype(str),
+        "fecha": pd.date_range("2025-01-06", periods=n, freq="h").strftime("%Y-%m-%d"),
+        "maquina": rng.choice(["Norte", "Sur", "Motomall", "Centro"], n),
+        "ventas": rng.integers(0, 200000, n).astype(float),
+        "egresos": rng.integers(0, 90000, n).astype(float),
+    })
+
+
+def medir(fn, veces):
+    t = time.perf_counter()
+    for _ in range(veces):
+        fn()
+    return (time.perf_counter() - t) / veces * 1000
+
+
+def verificar():
+    df = marco(200)
+    otro = df.copy()
+    otro.loc[5, "ventas"] += 1
+    assert exportacion.huella("xlsx", {"A": df}) == exportacion.huella("xlsx", {"A": df.copy()})
+    assert exportacion.huella("xlsx", {"A": df}) != exportacion.huella("xlsx", {"A": otro})
+    assert exportacion.huella("xlsx", {"A": df}) != exportacion.huella("xlsx", {"B": df})
+    assert exportacion.huella("xlsx", {"A": df}) != exportacion.huella("png", {"A": df})
+
+    lru = exportacion.CacheLRU(max_bytes=1000)
+    for i in range(10):
+        lru.obtener(i, lambda: b"x" * 300)
+    e = lru.estadisticas()
+    assert e["bytes"] <= 1000 and e["entradas"] == 3 and e["desalojos"] == 7, e
+    lru.obtener(9, lambda: b"y")
+    assert lru.estadisticas()["aciertos"] == 1
+
+
+def main():
+    args = sys.argv[1:]
+    n_filas = int(args[args.index("--filas") + 1]) if "--filas" in args else 20_000
+    reruns = int(args[args.index("--reruns") + 1]) if "--reruns" in args else 20
+
+    verificar()
+    print("Huellas y desalojo LRU OK\n")
+
+    df = marco(n_filas)
+    hojas = {"Semana": df, "Resumen": df.describe().reset_index()}
+    filas = [("Ventas", "$910,000"), ("Egresos", "$555,300"), ("Margen", "$354,700")]
+
+    antes = medir(lambda: exportacion.construir_excel(hojas), max(1, reruns // 5))
+    despues = medir(lambda: exportacion.excel(hojas), reruns)
+    print(f"Excel {n_filas:,} filas por rerun: armado {antes:,.1f} ms -> callable {despues:.3f} ms")
+
+    if exportacion.disponible("fpdf"):
+        antes = medir(lambda: exportacion.construir_pdf_resumen("Resumen", "Semana 38-2025", filas, ["Alerta"], "hoy"), reruns)
+        despues = medir(lambda: exportacion.pdf_resumen("Resumen", "Semana 38-2025", filas, ["Alerta"]), reruns)
+        print(f"PDF resumen por rerun: armado {antes:,.2f} ms -> callable {despues:.3f} ms")
+
+    exportacion.cache.limpiar()
+    descarga = exportacion.excel(hojas)
+    primero = medir(descarga, 1)
+    siguiente = medir(descarga, reruns)
+    contenido = descarga()
+    assert contenido[:2] == b"PK"
+    e = exportacion.cache.estadisticas()
+    print(f"Clic: primero {primero:,.1f} ms (genera) -> siguientes {siguiente:,.2f} ms (huella + caché)")
+    print(f"Caché: {e['entradas']} archivo(s), {e['bytes'] / 1024:,.0f} KB, {e['aciertos']} aciertos / {e['fallos']} generados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exportacion import disponible, exportar_rango
+
+# Exportación por rango en streaming: genera un histórico sintético de rotacion_producto y mide
+# tiempo, tamaño y pico de memoria (RSS máximo del proceso hijo) por formato, para el total de
+# filas y para una décima parte. Si la memoria está acotada, ambos picos deben ser parecidos.
+#
+#   python benchmarks/bench_exportacion_rango.py [--filas 2000000] [--formatos xlsx,csv,parquet]
+
+MAQUINAS = ["Norte", "Sur", "Motomall", "Centro", "Paquetex", "Terminal"]
+PRODUCTOS = [f"Producto {i}" for i in range(120)]
+
+
+def generar(ruta, n):
+    conn = sqlite3.connect(ruta)
+    conn.execute("""
+        CREATE TABLE rotacion_producto (
+            semana TEXT, fecha TEXT, maquina TEXT, producto TEXT, cantidad INTEGER, valor_unitario INTEGER,
+            costo_compra INTEGER, unidad_compra TEXT, unidades_por_paquete INTEGER, precio_unitario REAL
+        )
+    """)
+    inicio = date(2020, 1, 6)
+
+    def filas():
+        for i in range(n):
+            fecha = inicio + timedelta(days=i // 400)
+            año, semana, _ = fecha.isocalendar()
+            costo = 1000 + (i * 37) % 40000
+            yield (
+                f"Semana {semana}-{año}", fecha.isoformat(), MAQUINAS[i % len(MAQUINAS)],
+                PRODUCTOS[i % len(PRODUCTOS)], 1 + i % 30, costo // 10 + 500, costo,
+                ("unidad", "docena", "paquete")[i % 3], 6, costo / 6,
+            )
+
+    conn.executemany(f"INSERT INTO rotacion_producto VALUES ({', '.join('?' * 10)})", filas())
+    conn.commit()
+    ultima = conn.execute("SELECT MAX(fecha) FROM rotacion_producto").fetchone()[0]
+    conn.close()
+    return ultima
+
+
+def hijo(ruta, formato, hasta, destino):
+    conn = sqlite3.connect(ruta)
+    t = time.perf_counter()
+    conteo = exportar_rango(conn, destino, "2000-01-01", hasta, ["rotacion_producto"], formato=formato)
+    segundos = time.perf_counter() - t
+    pico_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(conteo["rotacion_producto"], segundos, pico_mb, os.path.getsize(destino))
+
+
+def medir(ruta, formato, hasta, destino):
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--hijo", ruta, formato, hasta, destino],
+        check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return int(salida[0]), float(salida[1]), float(salida[2]), int(salida[3])
+
+
+def main():
+    args = sys.argv[1:]
+    if "--hijo" in args:
+        hijo(*args[args.index("--hijo") + 1:][:4])
+        return
+    n_filas = int(args[args.index("--filas") + 1]) if "--filas" in args else 2_000_000
+    formatos = args[args.index("--formatos") + 1].split(",") if "--formatos" in args else ["xlsx", "csv", "parquet"]
+    if "parquet" in formatos and not disponible("pyarrow"):
+        formatos.remove("parquet")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "historial.db")
+        t = time.perf_counter()
+        ultima = generar(ruta, n_filas)
+        print(f"Histórico sintético: {n_filas:,} filas de rotacion_producto ({time.perf_counter() - t:.1f}s)\n")
+        # Décima parte del rango por fecha (las filas se reparten parejo por día)
+        dias = (date.fromisoformat(ultima) - date(2020, 1, 6)).days
+        hasta_decimo = (date(2020, 1, 6) + timedelta(days=dias // 10)).isoformat()
+
+        for formato in formatos:
+            destino = os.path.join(tmp, f"salida.{formato}")
+            chico = medir(ruta, formato, hasta_decimo, destino)
+            grande = medir(ruta, formato, ultima, destino)
+            for filas, segundos, pico, tamaño in (chico, grande):
+                print(
+                    f"{formato:8} {filas:>10,} filas  {segundos:7.1f}s  {filas / segundos:>9,.0f} filas/s  "
+                    f"pico {pico:6.0f} MB  archivo {tamaño / 1024 / 1024:6.1f} MB"
+                )
+            print(f"{'':8} memoria x{grande[2] / chico[2]:.2f} con x{grande[0] / chico[0]:.0f} filas\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+try:
+    import websockets
+except ImportError:
+    raise SystemExit("bench_fragmentos necesita websockets: pip install -r requirements-dev.txt")
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+# Latencia por interacción en los sub-paneles con st.fragment, contra un servidor Streamlit real
+# (AppTest siempre re-ejecuta el script completo). El cliente habla el protocolo del navegador por
+# websocket: cambia un widget y mide hasta el script_finished, una vez como rerun completo (lo que
+# costaba cada interacción antes) y otra como rerun del fragmento que contiene el widget.
+# El protocolo (BackMsg/ForwardMsg) es interno de Streamlit y puede cambiar entre versiones: el
+# script está probado con la versión mínima de requirements.txt y, si el protocolo cambia, falla
+# al no encontrar los widgets en lugar de medir otra cosa.
+#
+#   python benchmarks/bench_fragmentos.py [--db ventas_semanales.db] [--app punto_express.py] [--rondas 15]
+
+NAVEGACION = "📋 Navegación:"
+FECHA_ROTACION, MAQUINA_ROTACION = "2025/09/17", "Motomall"      # una máquina y semana con registros
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def elementos(mensajes):
+    # (tipo, elemento, fragment_id) de cada delta con un elemento nuevo
+    for m in mensajes:
+        if m.HasField("delta") and m.delta.HasField("new_element"):
+            tipo = m.delta.new_element.WhichOneof("type")
+            yield tipo, getattr(m.delta.new_element, tipo), m.delta.fragment_id
+
+
+def buscar(mensajes, tipo, etiqueta=None, clave=None):
+    for t, e, fragmento in elementos(mensajes):
+        if t == tipo and (etiqueta is None or getattr(e, "label", None) == etiqueta) and (clave is None or clave in e.id):
+            return e, fragmento
+    raise AssertionError(f"No se encontró {tipo} {etiqueta or clave}")
+
+
+class Sesion:
+    def __init__(self, ws):
+        self.ws = ws
+        self.estados = {}
+
+    def fijar(self, id_widget, **valor):
+        self.estados[id_widget] = WidgetState(id=id_widget, **valor)
+
+    async def ejecutar(self, fragmento=""):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        msg.rerun_script.fragment_id = fragmento
+        msg.rerun_script.widget_states.widgets.extend(self.estados.values())
+        t = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        mensajes = []
+        while True:
+            m = ForwardMsg()
+            m.ParseFromString(await self.ws.recv())
+            mensajes.append(m)
+            if m.HasField("script_finished"):
+                return (time.perf_counter() - t) * 1000, mensajes
+
+
+async def navegar(sesion, seccion):
+    _, mensajes = await sesion.ejecutar()
+    radio, _ = buscar(mensajes, "radio", NAVEGACION)
+    sesion.fijar(radio.id, string_value=seccion)
+    return (await sesion.ejecutar())[1]
+
+
+async def interaccion(sesion, id_widget, fragmento, valores, rondas):
+    # Alterna valores del widget; cada ronda mide un rerun completo y uno del fragmento
+    completo, parcial = [], []
+    for i in range(rondas):
+        sesion.fijar(id_widget, **valores[i % len(valores)])
+        completo.append((await sesion.ejecutar())[0])
+        sesion.fijar(id_widget, **valores[(i + 1) % len(valores)])
+        parcial.append((await sesion.ejecutar(fragmento))[0])
+    return statistics.median(completo), statistics.median(parcial)
+
+
+def edicion(fila, columna, valor):
+    return {"string_value": json.dumps({"edited_rows": {str(fila): {columna: valor}}, "added_rows": [], "deleted_rows": []})}
+
+
+async def medir(puerto, rondas):
+    resultados = {}
+    url = f"ws://127.0.0.1:{puerto}/_stcore/stream"
+
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        sesion = Sesion(ws)
+        mensajes = await navegar(sesion, "Control Ventas")
+        editor, fragmento = buscar(mensajes, "dataframe", clave="cv_grilla")
+        resultados["Control Ventas · celda de la grilla"] = await interaccion(
+            sesion, editor.id, fragmento, [edicion(0, "Lunes · Ventas", 1000.0), edicion(0, "Lunes · Ventas", 2000.0)], rondas)
+
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        sesion = Sesion(ws)
+        mensajes = await navegar(sesion, "Rotación")
+        fecha, _ = buscar(mensajes, "date_input", "Selecciona una fecha")
+        maquina, _ = buscar(mensajes, "selectbox", "Selecciona la máquina")
+        sesion.fijar(fecha.id, string_array_value={"data": [FECHA_ROTACION]})
+        sesion.fijar(maquina.id, string_value=MAQUINA_ROTACION)
+        _, mensajes = await sesion.ejecutar()
+        cantidad, fragmento = buscar(mensajes, "number_input", "Cantidad vendida")
+        resultados["Rotación · cantidad del registro"] = await interaccion(
+            sesion, cantidad.id, fragmento, [{"int_value": 2}, {"int_value": 3}], rondas)
+        editor, fragmento = buscar(mensajes, "dataframe", clave="rot_editor")
+        resultados["Rotación · celda de la edición"] = await interaccion(
+            sesion, editor.id, fragmento, [edicion(0, "cantidad", 5), edicion(0, "cantidad", 6)], rondas)
+
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        sesion = Sesion(ws)
+        mensajes = await navegar(sesion, "Mantenimiento")
+        costo, fragmento = buscar(mensajes, "number_input", "Costo total")
+        resultados["Mantenimiento · costo del registro"] = await interaccion(
+            sesion, costo.id, fragmento, [{"double_value": 1000.0}, {"double_value": 2000.0}], rondas)
+    return resultados
+
+
+def main():
+    args = sys.argv[1:]
+    db = args[args.index("--db") + 1] if "--db" in args else os.path.join(RAIZ, "ventas_semanales.db")
+    app = os.path.abspath(args[args.index("--app") + 1]) if "--app" in args else os.path.join(RAIZ, "punto_express.py")
+    rondas = int(args[args.index("--rondas") + 1]) if "--rondas" in args else 15
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(db, os.path.join(tmp, "ventas_semanales.db"))
+        puerto = puerto_libre()
+        servidor = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true", "--server.port", str(puerto),
+             "--browser.gatherUsageStats", "false", "--server.fileWatcherType", "none"],
+            cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            env={**os.environ, "HOME": tmp, "PYTHONPATH": os.path.dirname(app)},
+        )
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", puerto), 0.2).close()
+                    break
+                except OSError:
+                    time.sleep(0.2)
+            resultados = asyncio.run(medir(puerto, rondas))
+        finally:
+            servidor.terminate()
+            servidor.wait(30)
+
+    print(f"{os.path.basename(db)}, mediana de {rondas} interacciones\n")
+    print(f"  {'interacción':36} {'script completo':>16} {'fragmento':>10}")
+    for nombre, (completo, parcial) in resultados.items():
+        print(f"  {nombre:36} {completo:13.1f} ms {parcial:7.1f} ms  x{completo / parcial:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
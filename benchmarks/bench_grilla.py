@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grilla
+from bench_indices import poblar
+from consultas import resumen_semana
+from migraciones import aplicar_migraciones
+from operaciones import guardar_celdas_resumen
+
+# Control Ventas con flota grande: armar la grilla de la semana y guardar. Antes: borrar la
+# semana y reinsertar todas las celdas; después: diff de la grilla + UPSERT de lo modificado.
+#
+#   python benchmarks/bench_grilla.py [--maquinas 200] [--años 2] [--editadas 5]
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+
+
+def ms(t):
+    return (time.perf_counter() - t) * 1000
+
+
+def main():
+    args = sys.argv[1:]
+    n_maquinas = int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 200
+    n_años = int(args[args.index("--años") + 1]) if "--años" in args else 2
+    n_editadas = int(args[args.index("--editadas") + 1]) if "--editadas" in args else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"), isolation_level=None)
+        aplicar_migraciones(conn, hasta=1)
+        conn.execute("BEGIN")
+        maquinas, semanas, n_res, _ = poblar(conn, n_maquinas, n_años)
+        aplicar_migraciones(conn)
+        año, sem = semanas[-1]
+        lunes = date.fromisocalendar(año, sem, 1)
+        fechas = [lunes + timedelta(days=i) for i in range(6)]
+        semana_txt = f"Semana {sem}-{año}"
+        print(f"Datos: {n_res:,} filas; semana {sem}-{año} con {n_maquinas} máquinas ({n_maquinas * 12} celdas)\n")
+
+        t = time.perf_counter()
+        df = resumen_semana(conn, año, sem)
+        original = grilla.construir(df, maquinas, fechas, DIAS)
+        t_render = ms(t)
+
+        editada = original.copy()
+        rng = np.random.default_rng(1)
+        for fila, col in zip(rng.integers(0, len(maquinas), n_editadas), rng.integers(0, 12, n_editadas)):
+            editada.iat[fila, col] += 1000
+
+        # Antes: DELETE de la semana + INSERT de cada celda
+        todas = [
+            (semana_txt, str(f), m, DIAS[d], float(editada.iat[i, 2 * d]), float(editada.iat[i, 2 * d + 1]), 1, año, sem)
+            for i, m in enumerate(maquinas) for d, f in enumerate(fechas)
+        ]
+        t = time.perf_counter()
+        conn.execute("BEGIN")
+        conn.execute("DELETE FROM resumen_semanal WHERE iso_year = ? AND iso_week = ?", (año, sem))
+        conn.executemany(
+            "INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, egreso_auto, iso_year, iso_week) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", todas)
+        conn.execute("ROLLBACK")
+        t_antes = ms(t)
+
+        # Después: diff + UPSERT solo de las celdas cambiadas
+        t = time.perf_counter()
+        cambios_v, cambios_e = grilla.cambios(original, editada, fechas, DIAS, semana_txt, año, sem)
+        conn.execute("BEGIN")
+        n = guardar_celdas_resumen(conn, cambios_v, cambios_e)
+        conn.execute("COMMIT")
+        t_despues = ms(t)
+
+        guardada = grilla.construir(resumen_semana(conn, año, sem), maquinas, fechas, DIAS)
+        assert np.allclose(guardada.to_numpy(), editada.to_numpy())
+        total = conn.execute("SELECT SUM(ventas) FROM weekly_machine_totals WHERE iso_year = ? AND iso_week = ?", (año, sem)).fetchone()[0]
+        assert total == editada.iloc[:, 0::2].to_numpy().sum()
+
+        print(f"{'armar grilla (lectura + pivot)':36s} {t_render:8.1f} ms")
+        print(f"{'guardar: DELETE + INSERT semana':36s} {t_antes:8.1f} ms  ({len(todas)} filas)")
+        print(f"{'guardar: diff + UPSERT':36s} {t_despues:8.1f} ms  ({n} celdas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import importacion
+from escritor import Escritor
+from migraciones import aplicar_migraciones
+
+# Importación masiva: genera archivos sintéticos de ventas y de rotación con un pequeño
+# porcentaje de filas sucias (máquinas desconocidas, fechas inválidas, montos con formato local,
+# repetidas) y los importa sobre una base nueva. Luego reimporta (todo debe salir duplicado) y
+# comprueba al azar que los conteos cuadren y que los egresos sumados sean el costo insertado.
+#
+#   python benchmarks/bench_importacion.py [--filas 1000000] [--filas-xlsx 50000] [--maquinas 400] [--semilla 7]
+
+PRODUCTOS = [f"Producto {i}" for i in range(60)]
+
+
+def generar_ventas(ruta, filas, maquinas, rng):
+    # Una fila por (máquina, día): filas / máquinas días seguidos
+    dias = -(-filas // len(maquinas))
+    inicio = date(2026, 1, 5) - timedelta(days=dias)
+    fechas = pd.date_range(inicio, periods=dias).strftime("%Y-%m-%d")
+    df = pd.DataFrame({
+        "Máquina": np.tile(np.asarray(maquinas, dtype=object), dias)[:filas],
+        "Fecha": np.repeat(np.asarray(fechas, dtype=object), len(maquinas))[:filas],
+        "Ventas": rng.integers(10_000, 300_000, filas).astype(str).astype(object),
+        "Egresos": rng.integers(0, 80_000, filas).astype(str).astype(object),
+    })
+    # Formatos locales y variantes de nombre que sí deben aceptarse
+    n = max(1, filas // 200)
+    idx = rng.choice(filas, n, replace=False)
+    df.loc[idx, "Ventas"] = ["$ " + f"{int(v):,}".replace(",", ".") for v in df.loc[idx, "Ventas"]]
+    df.loc[idx[: n // 2], "Máquina"] = df.loc[idx[: n // 2], "Máquina"].str.upper() + " "
+    _ensuciar(df, rng, {"Máquina": "Máquina fantasma", "Fecha": "2025-02-30", "Ventas": "n/d"})
+    df.to_csv(ruta, index=False, sep=";")
+
+
+def generar_rotacion(ruta, filas, maquinas, rng):
+    # Como las descargas diarias de las máquinas: filas en orden de fecha a lo largo de un año
+    df = pd.DataFrame({
+        "maquina": rng.choice(np.asarray(maquinas, dtype=object), filas),
+        "fecha": (pd.Timestamp("2025-01-06") + pd.to_timedelta(np.sort(rng.integers(0, 364, filas)), unit="D")).strftime("%Y-%m-%d"),
+        "producto": rng.choice(np.asarray(PRODUCTOS, dtype=object), filas),
+        "cantidad": rng.integers(1, 40, filas).astype(str).astype(object),
+        "costo_compra": rng.integers(1_000, 60_000, filas).astype(str).astype(object),
+        "unidad_compra": rng.choice(np.asarray(["unidad", "docena", "paquete"], dtype=object), filas),
+        "unidades_por_paquete": rng.choice(np.asarray(["", "6", "12"], dtype=object), filas),
+    })
+    _ensuciar(df, rng, {"maquina": "Sin nombre", "cantidad": "0", "unidad_compra": "caja"})
+    df.to_csv(ruta, index=False)
+
+
+def _ensuciar(df, rng, valores):
+    for columna, valor in valores.items():
+        idx = rng.choice(len(df), max(1, len(df) // 1000), replace=False)
+        df.loc[idx, columna] = valor
+
+
+def correr(nombre, ruta, db, tipo):
+    escritor = Escritor(db)
+    tam = os.path.getsize(ruta) / 1024 / 1024
+    resumen = importacion.importar(ruta, tipo, escritor=escritor)
+    rechazadas = sum(resumen["rechazadas"].values())
+    assert resumen["insertadas"] + resumen["duplicadas"] + rechazadas == resumen["leidas"], resumen
+    print(f"{nombre:28} {resumen['leidas']:>10,} filas ({tam:5.1f} MB)  {resumen['segundos']:6.1f}s  "
+          f"{resumen['leidas'] / resumen['segundos']:>9,.0f} filas/s  insertadas {resumen['insertadas']:,}  "
+          f"duplicadas {resumen['duplicadas']:,}  rechazadas {rechazadas:,}")
+    print(f"    commit p50 {escritor.metricas()['commit_p50_ms']:.0f} ms por lote de {importacion.LOTE:,}")
+    return resumen
+
+
+def verificar(db, rng, triggers):
+    conn = sqlite3.connect(db)
+    # Totales por semana mantenidos por triggers = suma directa de resumen_semanal
+    directo = dict(((a, s, m), (v, e)) for a, s, m, v, e in conn.execute(
+        "SELECT iso_year, iso_week, maquina, SUM(ventas), SUM(egresos) FROM resumen_semanal GROUP BY 1, 2, 3"
+    ))
+    agregado = dict(((a, s, m), (v, e)) for a, s, m, v, e in conn.execute(
+        "SELECT iso_year, iso_week, maquina, ventas, egresos FROM weekly_machine_totals"
+    ))
+    assert directo.keys() == agregado.keys()
+    for clave in rng.sample(sorted(directo), min(200, len(directo))):
+        assert abs(directo[clave][0] - agregado[clave][0]) < 1e-6 and abs(directo[clave][1] - agregado[clave][1]) < 1e-6, clave
+    # La carga no toca el esquema: los triggers siguen ahí y cada semana quedó marcada
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'").fetchone()[0] == triggers
+    for tabla in ("resumen_semanal", "rotacion_producto"):
+        assert conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT DISTINCT iso_year, iso_week FROM {tabla}) d "
+            f"WHERE NOT EXISTS (SELECT 1 FROM snapshot_semana s WHERE s.tabla = '{tabla}' "
+            f"AND s.iso_year = d.iso_year AND s.iso_week = d.iso_week)"
+        ).fetchone()[0] == 0, tabla
+    # Sin claves repetidas en rotación
+    assert conn.execute(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM rotacion_producto GROUP BY maquina, fecha, producto HAVING COUNT(*) > 1)"
+    ).fetchone()[0] == 0
+    conn.close()
+
+
+def main():
+    args = sys.argv[1:]
+    filas = int(args[args.index("--filas") + 1]) if "--filas" in args else 1_000_000
+    filas_xlsx = int(args[args.index("--filas-xlsx") + 1]) if "--filas-xlsx" in args else 50_000
+    n_maquinas = int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 400
+    semilla = int(args[args.index("--semilla") + 1]) if "--semilla" in args else 7
+    rng = np.random.default_rng(semilla)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "importacion.db")
+        conn = sqlite3.connect(db)
+        aplicar_migraciones(conn)
+        maquinas = [f"Máquina {i}" for i in range(n_maquinas)]
+        triggers = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'").fetchone()[0]
+        conn.executemany("INSERT OR IGNORE INTO maquina (nombre_maquina) VALUES (?)", [(m,) for m in maquinas])
+        conn.commit()
+        conn.close()
+
+        t = time.perf_counter()
+        ventas, rotacion = os.path.join(tmp, "ventas.csv"), os.path.join(tmp, "rotacion.csv")
+        generar_ventas(ventas, filas, maquinas, rng)
+        generar_rotacion(rotacion, filas, maquinas, rng)
+        print(f"Archivos generados en {time.perf_counter() - t:.1f}s\n")
+
+        correr("ventas.csv", ventas, db, "ventas")
+        conn = sqlite3.connect(db)
+        egresos_antes = conn.execute("SELECT SUM(egresos) FROM resumen_semanal").fetchone()[0]
+        r = correr("rotacion.csv", rotacion, db, "rotacion")
+        egresos, costo = (conn.execute(f"SELECT SUM({c}) FROM {t}").fetchone()[0]
+                          for c, t in (("egresos", "resumen_semanal"), ("costo_compra", "rotacion_producto")))
+        conn.close()
+        # Todo el costo insertado pasa a egresos (los costos son positivos: no se recorta en cero)
+        assert abs(egresos - egresos_antes - costo) < 1e-3, (egresos, egresos_antes, costo)
+        print(f"    egresos +${egresos - egresos_antes:,.0f} = costo de compra insertado")
+        reimportada = correr("rotacion.csv (reimportada)", rotacion, db, "rotacion")
+        assert reimportada["insertadas"] == 0 and reimportada["duplicadas"] == r["insertadas"] + r["duplicadas"]
+
+        if filas_xlsx:
+            import openpyxl
+
+            libro = openpyxl.Workbook(write_only=True)
+            hoja = libro.create_sheet()
+            hoja.append(["Máquina", "Fecha", "Producto", "Cantidad", "Costo", "Unidad"])
+            inicio = date(2026, 1, 5)
+            for i in range(filas_xlsx):
+                hoja.append([maquinas[i % n_maquinas], inicio + timedelta(days=i // n_maquinas % 300),
+                             PRODUCTOS[i // (n_maquinas * 300) % len(PRODUCTOS)], 1 + i % 9, 1500.0 + i % 700, "unidad"])
+            ruta_xlsx = os.path.join(tmp, "rotacion.xlsx")
+            libro.save(ruta_xlsx)
+            correr("rotacion.xlsx", ruta_xlsx, db, None)
+
+        verificar(db, random.Random(semilla), triggers)
+        print("\nVerificación: conteos cuadran, totales semanales = suma directa, triggers intactos, "
+              "semanas marcadas para el snapshot, sin claves repetidas en rotación")
+
+
+if __name__ == "__main__":
+    main()
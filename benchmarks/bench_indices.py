@@ -0,0 +1,116 @@
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migraciones import aplicar_migraciones
+
+# Latencia de las consultas de Dashboard y Rotación antes y después de la migración
+# de índices, sobre un histórico sintético de 5 años x 200 máquinas.
+#
+#   python benchmarks/bench_indices.py [--maquinas 200] [--años 5]
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+PRODUCTOS = ["Agua", "Galletas", "Chocolatina", "Café", "Jugo", "Papas", "Gaseosa", "Maní", "Chicle", "Barra"]
+
+
+def poblar(conn, n_maquinas, n_años, seed=38):
+    rnd = random.Random(seed)
+    maquinas = [f"Maquina {i}" for i in range(1, n_maquinas + 1)]
+    año_fin = date.today().year
+    semanas = []
+    for año in range(año_fin - n_años + 1, año_fin + 1):
+        for sem in range(1, date(año, 12, 28).isocalendar()[1] + 1):
+            semanas.append((año, sem))
+
+    resumen, rotacion = [], []
+    for año, sem in semanas:
+        lunes = date.fromisocalendar(año, sem, 1)
+        for maquina in maquinas:
+            for i in range(6):
+                resumen.append((f"Semana {sem}-{año}", str(lunes + timedelta(days=i)), maquina, DIAS[i],
+                                rnd.randint(10000, 30000), rnd.randint(2000, 8000), 1))
+            for producto in PRODUCTOS:
+                rotacion.append((str(sem), str(lunes + timedelta(days=rnd.randrange(6))), maquina, producto,
+                                 rnd.randint(1, 30), 0.0, float(rnd.randint(1000, 3000)), "unidad", 6))
+    conn.executemany("INSERT INTO resumen_semanal VALUES (?, ?, ?, ?, ?, ?, ?)", resumen)
+    conn.executemany(
+        "INSERT INTO rotacion_producto (semana, fecha, maquina, producto, cantidad, precio_unitario, costo_compra, unidad_compra, unidades_por_paquete) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rotacion,
+    )
+    conn.commit()
+    return maquinas, semanas, len(resumen), len(rotacion)
+
+
+def consultas(maquinas, semanas):
+    año, sem = semanas[-1]
+    lunes = date.fromisocalendar(año, sem, 1)
+    fecha_ini, fecha_fin = str(lunes), str(lunes + timedelta(days=5))
+    maquina = maquinas[len(maquinas) // 2]
+    return [
+        ("Dashboard: totales por etiqueta",
+         "SELECT COALESCE(SUM(CAST(ventas AS REAL)),0), COALESCE(SUM(CAST(egresos AS REAL)),0) FROM resumen_semanal WHERE semana = ?",
+         (f"Semana {sem}-{año}",)),
+        ("Dashboard: totales por rango de fechas",
+         "SELECT COALESCE(SUM(CAST(ventas AS REAL)),0), COALESCE(SUM(CAST(egresos AS REAL)),0) FROM resumen_semanal WHERE fecha BETWEEN ? AND ?",
+         (fecha_ini, fecha_fin)),
+        ("Dashboard: detalle de la semana",
+         "SELECT * FROM resumen_semanal WHERE semana = ? ORDER BY fecha, maquina",
+         (f"Semana {sem}-{año}",)),
+        ("Reabastecimiento: ventas semana anterior",
+         "SELECT semana, fecha, maquina, COALESCE(ventas,0) AS ventas FROM resumen_semanal WHERE fecha BETWEEN ? AND ?",
+         (fecha_ini, fecha_fin)),
+        ("Rotación: egreso por máquina y fecha",
+         "SELECT egresos FROM resumen_semanal WHERE maquina = ? AND fecha = ?",
+         (maquina, fecha_ini)),
+        ("Rotación: registros de la semana",
+         "SELECT rowid, * FROM rotacion_producto WHERE semana = ? AND maquina = ? ORDER BY fecha, producto",
+         (str(sem), maquina)),
+    ]
+
+
+def medir(conn, sql, params, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    return statistics.median(tiempos)
+
+
+def main():
+    args = sys.argv[1:]
+    n_maquinas = int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 200
+    n_años = int(args[args.index("--años") + 1]) if "--años" in args else 5
+    repeticiones = 15
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        aplicar_migraciones(conn, hasta=1)
+        t = time.perf_counter()
+        maquinas, semanas, n_res, n_rot = poblar(conn, n_maquinas, n_años)
+        print(f"Datos: {n_res:,} filas en resumen_semanal, {n_rot:,} en rotacion_producto "
+              f"({n_maquinas} máquinas x {n_años} años, {time.perf_counter() - t:.1f}s)")
+
+        lista = consultas(maquinas, semanas)
+        antes = [medir(conn, sql, p, repeticiones) for _, sql, p in lista]
+        t = time.perf_counter()
+        aplicar_migraciones(conn)
+        print(f"Migración de índices: {time.perf_counter() - t:.2f}s\n")
+        despues = [medir(conn, sql, p, repeticiones) for _, sql, p in lista]
+
+        print(f"{'consulta':45s} {'antes (ms)':>12s} {'después (ms)':>13s} {'x':>8s}")
+        for (nombre, _, _), a, d in zip(lista, antes, despues):
+            print(f"{nombre:45s} {a:12.2f} {d:13.3f} {a / d if d else float('inf'):8.0f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
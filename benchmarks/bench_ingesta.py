@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from ingesta import aplicar_segmento
+from migraciones import aplicar_migraciones
+
+# Simulador de máquinas para ingesta.py: N clientes keep-alive envían lotes de eventos de venta
+# durante unos segundos contra el servicio en su propio proceso. Fase 1: carga sostenida y
+# parada ordenada; lo sumado en la base debe ser exactamente lo confirmado (202). Fase 2: el
+# servicio se mata con SIGKILL en plena carga y se reinicia; tras recuperar el diario, la base
+# debe tener todo lo confirmado y como mucho lo que quedó sin respuesta. Como referencia se mide
+# también una transacción por evento, el patrón anterior al escritor único.
+#
+#   python benchmarks/bench_ingesta.py [--clientes 16] [--lote 50] [--segundos 5] [--maquinas 40]
+
+PRODUCTOS = [f"Producto {i}" for i in range(30)]
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar(db, diario, puerto):
+    proceso = subprocess.Popen(
+        [sys.executable, os.path.join(RAIZ, "ingesta.py"), "--db", db, "--diario", diario, "--puerto", str(puerto)],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    linea = proceso.stdout.readline()
+    assert "Ingesta en" in linea, linea
+    return proceso, linea.strip()
+
+
+def evento(rng, maquinas, hoy):
+    return {
+        "maquina": rng.choice(maquinas),
+        "producto": rng.choice(PRODUCTOS),
+        "cantidad": rng.randint(1, 3),
+        "monto": rng.randint(1, 20) * 500,
+        "fecha": (hoy - timedelta(days=rng.randint(0, 9))).isoformat(),
+    }
+
+
+async def pedir(lector, escritor, metodo, ruta, cuerpo=b""):
+    escritor.write(
+        f"{metodo} {ruta} HTTP/1.1\r\nHost: local\r\nContent-Type: application/x-ndjson\r\n"
+        f"Content-Length: {len(cuerpo)}\r\n\r\n".encode() + cuerpo
+    )
+    await escritor.drain()
+    estado = int((await lector.readline()).split()[1])
+    largo = 0
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b""):
+            break
+        if linea.lower().startswith(b"content-length:"):
+            largo = int(linea.split(b":")[1])
+    return estado, json.loads(await lector.readexactly(largo))
+
+
+async def cliente(puerto, fin, lote, maquinas, semilla, totales):
+    rng = random.Random(semilla)
+    hoy = date.today()
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    try:
+        while time.perf_counter() < fin:
+            eventos = [evento(rng, maquinas, hoy) for _ in range(lote)]
+            monto, cantidad = sum(e["monto"] for e in eventos), sum(e["cantidad"] for e in eventos)
+            totales["sin_respuesta"] = (totales["sin_respuesta"][0] + monto, totales["sin_respuesta"][1] + cantidad)
+            t = time.perf_counter()
+            estado, _ = await pedir(lector, escritor, "POST", "/eventos", b"\n".join(json.dumps(e).encode() for e in eventos))
+            totales["sin_respuesta"] = (totales["sin_respuesta"][0] - monto, totales["sin_respuesta"][1] - cantidad)
+            totales["latencias"].append(time.perf_counter() - t)
+            if estado == 202:
+                totales["eventos"] += lote
+                totales["confirmado"] = (totales["confirmado"][0] + monto, totales["confirmado"][1] + cantidad)
+            elif estado == 503:
+                totales["503"] += 1
+                await asyncio.sleep(1)
+            else:
+                raise AssertionError(estado)
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+        pass            # el servicio murió con el pedido en vuelo: queda "sin respuesta"
+    finally:
+        escritor.close()
+
+
+async def carga(puerto, clientes, lote, segundos, maquinas, semilla, matar=None):
+    totales = {"eventos": 0, "503": 0, "latencias": [], "confirmado": (0, 0), "sin_respuesta": (0, 0)}
+    fin = time.perf_counter() + segundos
+    tareas = [asyncio.create_task(cliente(puerto, fin, lote, maquinas, semilla * 1000 + i, totales)) for i in range(clientes)]
+    if matar:
+        await asyncio.sleep(segundos / 2)
+        matar()
+    await asyncio.gather(*tareas)
+    return totales
+
+
+async def estado(puerto):
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    try:
+        return (await pedir(lector, escritor, "GET", "/estado"))[1]
+    finally:
+        escritor.close()
+
+
+def en_base(db):
+    conn = sqlite3.connect(db)
+    ventas = conn.execute("SELECT COALESCE(SUM(ventas), 0) FROM resumen_semanal").fetchone()[0]
+    cantidad = conn.execute("SELECT COALESCE(SUM(cantidad), 0) FROM rotacion_producto").fetchone()[0]
+    semanal = conn.execute("SELECT COALESCE(SUM(ventas), 0) FROM weekly_machine_totals").fetchone()[0]
+    conn.close()
+    assert abs(ventas - semanal) < 1e-6, (ventas, semanal)
+    return ventas, cantidad
+
+
+def resumen(nombre, totales, segundos):
+    latencias = sorted(totales["latencias"])
+    print(f"{nombre:34} {totales['eventos'] / segundos:>9,.0f} eventos/s  "
+          f"p50 {latencias[len(latencias) // 2] * 1000:6.1f} ms  p95 {latencias[int(len(latencias) * 0.95)] * 1000:6.1f} ms  "
+          f"503: {totales['503']}")
+
+
+def por_evento(db, maquinas, n):
+    # Referencia: una transacción (BEGIN IMMEDIATE ... COMMIT) por evento recibido
+    rng = random.Random(1)
+    hoy = date.today()
+    conn = sqlite3.connect(db, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    t = time.perf_counter()
+    for i in range(n):
+        e = evento(rng, maquinas, hoy)
+        conn.execute("BEGIN IMMEDIATE")
+        aplicar_segmento(conn, f"ref-{i}", [(e["maquina"], e["fecha"], e["producto"], e["cantidad"], e["monto"])])
+        conn.execute("COMMIT")
+    conn.close()
+    return n / (time.perf_counter() - t)
+
+
+def main():
+    args = sys.argv[1:]
+    clientes = int(args[args.index("--clientes") + 1]) if "--clientes" in args else 16
+    lote = int(args[args.index("--lote") + 1]) if "--lote" in args else 50
+    segundos = float(args[args.index("--segundos") + 1]) if "--segundos" in args else 5.0
+    n_maquinas = int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 40
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db, diario = os.path.join(tmp, "ingesta.db"), os.path.join(tmp, "diario")
+        conn = sqlite3.connect(db)
+        aplicar_migraciones(conn)
+        maquinas = [f"Máquina {i}" for i in range(n_maquinas)]
+        conn.executemany("INSERT OR IGNORE INTO maquina (nombre_maquina) VALUES (?)", [(m,) for m in maquinas])
+        conn.commit()
+        conn.close()
+        print(f"{clientes} clientes keep-alive, lotes de {lote} eventos, {segundos:.0f}s por fase\n")
+
+        # Fase 1: carga sostenida y parada ordenada (SIGTERM vuelca lo pendiente)
+        puerto = puerto_libre()
+        servidor, _ = iniciar(db, diario, puerto)
+        totales = asyncio.run(carga(puerto, clientes, lote, segundos, maquinas, 1))
+        e = asyncio.run(estado(puerto))
+        servidor.send_signal(signal.SIGTERM)
+        servidor.wait(30)
+        resumen("Fase 1: carga sostenida", totales, segundos)
+        print(f"    {e['lotes']} volcados, {e['eventos_por_lote']:,.0f} eventos por volcado, "
+              f"volcado p50 {e['volcado_p50_ms']:.0f} ms / p95 {e['volcado_p95_ms']:.0f} ms")
+        ventas, cantidad = en_base(db)
+        assert (ventas, cantidad) == totales["confirmado"], ((ventas, cantidad), totales["confirmado"])
+        print(f"    base = confirmado: ventas ${ventas:,.0f}, {cantidad:,} unidades")
+
+        # Fase 2: SIGKILL en plena carga, reinicio y recuperación del diario
+        puerto = puerto_libre()
+        servidor, _ = iniciar(db, diario, puerto)
+        totales = asyncio.run(carga(puerto, clientes, lote, segundos, maquinas, 2, matar=servidor.kill))
+        servidor.wait(30)
+        pendientes = sorted(os.listdir(diario))
+        servidor, linea = iniciar(db, diario, puerto_libre())
+        servidor.send_signal(signal.SIGTERM)
+        servidor.wait(30)
+        resumen("Fase 2: SIGKILL a mitad de la carga", totales, segundos / 2)
+        print(f"    {len(pendientes)} segmento(s) en disco al caer; al reiniciar: {linea.split(', ')[-1].rstrip(')')}")
+        nuevo = en_base(db)
+        sumado = (nuevo[0] - ventas, nuevo[1] - cantidad)
+        confirmado, sin_respuesta = totales["confirmado"], totales["sin_respuesta"]
+        assert confirmado[0] <= sumado[0] <= confirmado[0] + sin_respuesta[0], (sumado, confirmado, sin_respuesta)
+        assert confirmado[1] <= sumado[1] <= confirmado[1] + sin_respuesta[1], (sumado, confirmado, sin_respuesta)
+        print(f"    confirmado ${confirmado[0]:,.0f} <= en base ${sumado[0]:,.0f} <= confirmado + sin respuesta "
+              f"${confirmado[0] + sin_respuesta[0]:,.0f}")
+
+        n = 2000
+        print(f"\nReferencia, una transacción por evento: {por_evento(db, maquinas, n):,.0f} eventos/s ({n:,} eventos)")
+
+
+if __name__ == "__main__":
+    main()
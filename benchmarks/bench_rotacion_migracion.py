@@ -0,0 +1,101 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migraciones import rellenar_rotacion
+
+# Relleno de precio_unitario / unidades_por_paquete en rotacion_producto: bucle Python con un
+# UPDATE por rowid (antes) contra el UPDATE ... CASE por conjuntos, entero y por lotes (después).
+#
+#   python benchmarks/bench_rotacion_migracion.py [--filas 2000000] [--lote 100000]
+
+UNIDADES = ["unidad", "docena", "paquete", None]
+
+
+def crear(ruta, n_filas, seed=11):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(ruta)
+    conn.execute("""
+        CREATE TABLE rotacion_producto (
+            semana TEXT, fecha TEXT, maquina TEXT, producto TEXT, cantidad INTEGER,
+            precio_unitario REAL, costo_compra REAL, unidad_compra TEXT, unidades_por_paquete INTEGER
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO rotacion_producto VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?)",
+        (
+            ("38", "2025-09-15", f"Maquina {i % 200}", f"Producto {i % 50}", rnd.randint(1, 30),
+             float(rnd.randint(1000, 30000)), rnd.choice(UNIDADES), rnd.choice([None, 0, 6, 12, 24]))
+            for i in range(n_filas)
+        ),
+    )
+    conn.commit()
+    return conn
+
+
+def rellenar_por_fila(conn):
+    # Migración original (antes en la sección Rotación / migración 1)
+    rows = conn.execute("SELECT rowid, costo_compra, unidad_compra, unidades_por_paquete FROM rotacion_producto").fetchall()
+    for rowid, costo_compra, unidad_compra, unidades_por_paquete in rows:
+        try:
+            c = float(costo_compra) if costo_compra is not None else 0.0
+        except (TypeError, ValueError):
+            c = 0.0
+        up = int(unidades_por_paquete) if unidades_por_paquete not in (None, 0) else 6
+        if unidad_compra == "unidad" or unidad_compra is None:
+            precio = c
+        elif unidad_compra == "docena":
+            precio = c / 12.0
+        elif unidad_compra == "paquete":
+            precio = c / up
+        else:
+            precio = c
+        conn.execute("UPDATE rotacion_producto SET precio_unitario = ?, unidades_por_paquete = ? WHERE rowid = ?", (precio, up, rowid))
+    conn.commit()
+
+
+def resultado(conn):
+    return conn.execute(
+        "SELECT COUNT(*), SUM(unidades_por_paquete), ROUND(SUM(precio_unitario), 4) FROM rotacion_producto"
+    ).fetchone()
+
+
+def main():
+    args = sys.argv[1:]
+    n_filas = int(args[args.index("--filas") + 1]) if "--filas" in args else 2_000_000
+    lote = int(args[args.index("--lote") + 1]) if "--lote" in args else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        crear(os.path.join(tmp, "base.db"), n_filas).close()
+        print(f"rotacion_producto sintética: {n_filas:,} filas ({time.perf_counter() - t:.1f}s)\n")
+
+        resultados = {}
+        for nombre, fn in [
+            ("bucle por fila", rellenar_por_fila),
+            ("UPDATE ... CASE único", lambda c: (rellenar_rotacion(c), c.commit())),
+            (f"UPDATE ... CASE en lotes de {lote:,}", lambda c: rellenar_rotacion(c, lote=lote)),
+        ]:
+            ruta = os.path.join(tmp, "copia.db")
+            with open(os.path.join(tmp, "base.db"), "rb") as origen, open(ruta, "wb") as destino:
+                destino.write(origen.read())
+            conn = sqlite3.connect(ruta)
+            t = time.perf_counter()
+            fn(conn)
+            dt = time.perf_counter() - t
+            resultados[nombre] = resultado(conn)
+            conn.close()
+            os.remove(ruta)
+            print(f"{nombre:36s} {dt:8.2f} s  {n_filas / dt:12,.0f} filas/s")
+
+        assert len(set(resultados.values())) == 1, resultados
+        print(f"\nResultados idénticos: {next(iter(resultados.values()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semanas import en_semanas, etiqueta_semana, lunes_de, lunes_iso, mes_etiqueta
+
+# Derivación de semanas del Dashboard: apply fila a fila (antes) contra operaciones
+# vectorizadas de semanas.py (después), sobre un histórico sintético por semana y máquina.
+#
+#   python benchmarks/bench_semanas.py [--filas 500000]
+
+
+def historico(n_filas, seed=7):
+    rng = np.random.default_rng(seed)
+    años = rng.integers(2015, 2026, n_filas)
+    semanas = rng.integers(1, 53, n_filas)
+    return pd.DataFrame({
+        "semana_num": semanas,
+        "semana_year": años,
+        "maquina": rng.integers(1, 201, n_filas).astype(str),
+        "ventas": rng.integers(10000, 200000, n_filas).astype(float),
+    })
+
+
+def comp_antes(df, claves):
+    return df[df[["semana_num", "semana_year"]].apply(tuple, axis=1).isin(claves)]
+
+
+def comp_despues(df, claves):
+    return df[en_semanas(df, claves)]
+
+
+def derivar_antes(df):
+    d = df.copy()
+    d["fecha"] = pd.to_datetime(d.apply(lambda r: date.fromisocalendar(int(r["semana_year"]), int(r["semana_num"]), 1), axis=1))
+    d["lunes_week"] = d["fecha"].apply(lambda x: (x - pd.Timedelta(days=x.weekday())).date())
+    d["mes_asignado"] = d["lunes_week"].apply(lambda x: pd.to_datetime(x).strftime("%B %Y"))
+    d["sem_label"] = d.apply(lambda r: f"{int(r['semana_num'])}-{int(r['semana_year'])}", axis=1)
+    return d
+
+
+def derivar_despues(df):
+    d = df.copy()
+    d["fecha"] = lunes_iso(d["semana_year"], d["semana_num"])
+    d["lunes_week"] = lunes_de(d["fecha"])
+    d["mes_asignado"] = mes_etiqueta(d["lunes_week"])
+    d["sem_label"] = etiqueta_semana(d["semana_num"], d["semana_year"])
+    return d
+
+
+def medir(fn, *args):
+    t = time.perf_counter()
+    r = fn(*args)
+    return r, (time.perf_counter() - t) * 1000
+
+
+def main():
+    args = sys.argv[1:]
+    n_filas = int(args[args.index("--filas") + 1]) if "--filas" in args else 500_000
+    df = historico(n_filas)
+    claves = [(38, 2025), (37, 2025)]
+    print(f"Histórico sintético: {n_filas:,} filas\n")
+
+    a, ta = medir(comp_antes, df, claves)
+    d, td = medir(comp_despues, df, claves)
+    assert a.index.equals(d.index)
+    print(f"{'comparativa 2 semanas':32s} {ta:10.1f} ms -> {td:8.1f} ms  x{ta / td:.0f}")
+
+    a, ta = medir(derivar_antes, df)
+    d, td = medir(derivar_despues, df)
+    assert (a["fecha"].values == d["fecha"].values).all()
+    assert (a["mes_asignado"] == d["mes_asignado"]).all()
+    assert (a["sem_label"] == d["sem_label"]).all()
+    print(f"{'fecha/mes/etiqueta de semana':32s} {ta:10.1f} ms -> {td:8.1f} ms  x{ta / td:.0f}")
+
+
+if __name__ == "__main__":
+    main()
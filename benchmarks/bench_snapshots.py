@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshots
+from migraciones import aplicar_migraciones
+
+# Snapshots Parquet: sincronización completa e incremental sobre un histórico sintético de varios
+# años, y lectura de rango largo (tendencia semanal de todo el histórico, rotación de un año para
+# algunas máquinas) desde SQLite + pandas contra el snapshot con proyección y poda de particiones.
+#
+#   python benchmarks/bench_snapshots.py [--años 5] [--maquinas 60] [--productos 4]
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+def generar(ruta, años, n_maquinas, productos):
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    aplicar_migraciones(conn)
+    maquinas = [f"Maquina {i}" for i in range(n_maquinas)]
+    inicio = date(2026 - años, 1, 5)
+    dias = [inicio + timedelta(days=i) for i in range(años * 364)]
+
+    def resumen():
+        for d in dias:
+            año, semana, dia = d.isocalendar()
+            for j, m in enumerate(maquinas):
+                ventas = 50000 + (d.toordinal() * 31 + j * 17) % 150000
+                yield (f"Semana {semana}-{año}", d.isoformat(), m, DIAS[dia - 1], ventas, ventas // 3, año, semana)
+
+    def rotacion():
+        for d in dias:
+            año, semana, _ = d.isocalendar()
+            for j, m in enumerate(maquinas):
+                for k in range(productos):
+                    costo = 1000 + (d.toordinal() + j + k * 7) % 30000
+                    yield (f"Semana {semana}-{año}", d.isoformat(), m, f"Producto {k}", 1 + k % 20,
+                           costo, "unidad", 6, float(costo), año, semana)
+
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", resumen(),
+    )
+    conn.executemany(
+        "INSERT INTO rotacion_producto (semana, fecha, maquina, producto, cantidad, costo_compra, "
+        "unidad_compra, unidades_por_paquete, precio_unitario, iso_year, iso_week) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rotacion(),
+    )
+    conn.execute("COMMIT")
+    return conn, maquinas
+
+
+def medir(fn, veces=5):
+    fn()
+    t = time.perf_counter()
+    for _ in range(veces):
+        resultado = fn()
+    return (time.perf_counter() - t) / veces * 1000, resultado
+
+
+def main():
+    args = sys.argv[1:]
+    años = int(args[args.index("--años") + 1]) if "--años" in args else 5
+    n_maquinas = int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 60
+    productos = int(args[args.index("--productos") + 1]) if "--productos" in args else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t = time.perf_counter()
+        conn, maquinas = generar(os.path.join(tmp, "historial.db"), años, n_maquinas, productos)
+        filas = {t_: conn.execute(f"SELECT COUNT(*) FROM {t_}").fetchone()[0] for t_ in ("resumen_semanal", "rotacion_producto")}
+        print(f"Histórico: {años} años, {n_maquinas} máquinas, "
+              f"{filas['resumen_semanal']:,} filas de resumen, {filas['rotacion_producto']:,} de rotación "
+              f"({time.perf_counter() - t:.1f}s)\n")
+
+        raiz = os.path.join(tmp, "snapshots")
+        t = time.perf_counter()
+        escritas = snapshots.sincronizar(conn, raiz)
+        print(f"Sincronización completa: {sum(escritas.values())} particiones en {time.perf_counter() - t:.1f}s")
+
+        conn.execute("UPDATE resumen_semanal SET ventas = ventas + 1 WHERE iso_year = 2025 AND iso_week = 20 AND maquina = ?", (maquinas[0],))
+        conn.execute("DELETE FROM rotacion_producto WHERE iso_year = 2024 AND iso_week = 7 AND maquina = ?", (maquinas[1],))
+        t = time.perf_counter()
+        escritas = snapshots.sincronizar(conn, raiz)
+        print(f"Sincronización incremental (2 semanas tocadas): {escritas} en {(time.perf_counter() - t) * 1000:.0f} ms")
+        t = time.perf_counter()
+        escritas = snapshots.sincronizar(conn, raiz)
+        print(f"Sincronización sin cambios: {sum(escritas.values())} particiones en {(time.perf_counter() - t) * 1000:.0f} ms\n")
+
+        def tendencia_pandas():
+            df = pd.read_sql_query("SELECT iso_year, iso_week, ventas, egresos FROM resumen_semanal", conn)
+            return df.groupby(["iso_year", "iso_week"], as_index=False)[["ventas", "egresos"]].sum()
+
+        def tendencia_sql():
+            return pd.read_sql_query(
+                "SELECT iso_year, iso_week, SUM(ventas) AS ventas, SUM(egresos) AS egresos "
+                "FROM weekly_machine_totals GROUP BY iso_year, iso_week", conn,
+            )
+
+        ms_pandas, df_pandas = medir(tendencia_pandas)
+        ms_sql, _ = medir(tendencia_sql)
+        ms_snap, df_snap = medir(lambda: snapshots._totales_semanales.__wrapped__(raiz, 0, None, None, ()))
+        ms_memo, _ = medir(lambda: snapshots.totales_semanales(raiz=raiz))
+        assert len(df_pandas) == len(df_snap)
+        assert abs(df_pandas["ventas"].sum() - df_snap["ventas"].sum()) < 1e-6
+        print(f"Tendencia de todo el histórico ({len(df_snap)} semanas):")
+        print(f"  resumen_semanal -> pandas    {ms_pandas:8.1f} ms")
+        print(f"  weekly_machine_totals (SQL)  {ms_sql:8.1f} ms")
+        print(f"  snapshot Parquet (Arrow)     {ms_snap:8.1f} ms")
+        print(f"  snapshot memorizado          {ms_memo:8.2f} ms (misma versión del manifiesto)\n")
+
+        elegidas = maquinas[:3]
+        desde, hasta = (2024, 1), (2024, 52)
+
+        def rotacion_pandas():
+            return pd.read_sql_query(
+                f"SELECT producto, cantidad, costo_compra, iso_year, iso_week FROM rotacion_producto "
+                f"WHERE (iso_year, iso_week) BETWEEN (?, ?) AND (?, ?) AND maquina IN ({', '.join('?' * len(elegidas))})",
+                conn, params=(*desde, *hasta, *elegidas),
+            )
+
+        ms_pandas, df_pandas = medir(rotacion_pandas)
+        ms_snap, df_snap = medir(lambda: snapshots.leer(
+            "rotacion_producto", ["producto", "cantidad", "costo_compra", "iso_year", "iso_week"],
+            desde=desde, hasta=hasta, maquinas=elegidas, raiz=raiz,
+        ))
+        assert len(df_pandas) == len(df_snap), (len(df_pandas), len(df_snap))
+        print(f"Rotación 2024 de {len(elegidas)} máquinas ({len(df_snap):,} filas):")
+        print(f"  SQLite -> pandas             {ms_pandas:8.1f} ms")
+        print(f"  snapshot Parquet (poda)      {ms_snap:8.1f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
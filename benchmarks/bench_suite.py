@@ -0,0 +1,245 @@
+import io
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import consultas
+import exportacion
+import grilla
+import reportes
+from costos import agregar_costos
+from escritor import Escritor
+from generador import DIAS, generar
+from operaciones import guardar_celdas_resumen
+from semanas import en_semanas
+
+# Suite de rendimiento de los caminos calientes de la app sobre una flota sintética (generador.py):
+# totales y comparativa del Dashboard, guardado de Control Ventas, carga de Rotación y cálculo de
+# costos, ranking de Reabastecimiento y exportaciones. Cada caso corre una vuelta de calentamiento
+# y N rondas (min / mediana / media / desviación, en ms). La base generada se guarda en
+# .benchmarks/ por parámetros y cada corrida trabaja sobre una copia. Los resultados quedan en
+# .benchmarks/<fecha>-<commit>.json y se comparan con la corrida anterior (o con --comparar,
+# una ruta o un prefijo de commit); una mediana más de 10% peor se marca como regresión.
+#
+#   python benchmarks/bench_suite.py [--maquinas 100] [--años 2] [--productos 40] [--rondas 7]
+#                                    [--db ruta] [--filtro texto] [--comparar ruta|commit] [--no-guardar]
+
+CARPETA = os.path.join(RAIZ, ".benchmarks")
+UMBRAL_REGRESION = 0.10
+
+
+def base_flota(maquinas, años, productos, semilla=38):
+    os.makedirs(CARPETA, exist_ok=True)
+    ruta = os.path.join(CARPETA, f"flota-m{maquinas}-a{años}-p{productos}-s{semilla}.db")
+    if not os.path.exists(ruta):
+        t = time.perf_counter()
+        temporal = ruta + ".tmp"
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        conn = sqlite3.connect(temporal, isolation_level=None)
+        total = generar(conn, maquinas=maquinas, años=años, productos=productos, semilla=semilla)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+        os.replace(temporal, ruta)
+        print(f"Flota generada en {time.perf_counter() - t:.1f}s: {total['resumen_semanal']:,} días, "
+              f"{total['rotacion_producto']:,} compras")
+    return ruta
+
+
+def git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def commit_actual():
+    commit = git("rev-parse", "--short", "HEAD") or "sin-git"
+    return commit + ("-sucio" if git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def medir(fn, rondas):
+    fn()            # calentamiento
+    tiempos = []
+    for _ in range(rondas):
+        t = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t) * 1000)
+    return {
+        "min": min(tiempos),
+        "mediana": statistics.median(tiempos),
+        "media": statistics.fmean(tiempos),
+        "desviacion": statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+        "rondas": rondas,
+    }
+
+
+def casos(conn, escritor):
+    año, semana = consultas.ultima_semana(conn)
+    año_prev, semana_prev = reportes.semana_anterior(año, semana)
+    maquinas = consultas.maquinas(conn)
+    lunes = date.fromisocalendar(año, semana, 1)
+    fechas = [lunes + timedelta(days=i) for i in range(6)]
+    maquina = maquinas[0]
+    desde_rot = reportes.semana_anterior(*reportes.semana_anterior(*reportes.semana_anterior(año, semana)))
+
+    def dashboard_totales():
+        consultas.ultima_semana(conn)
+        consultas.leer_totales_autoritativos(conn, año, semana)
+
+    def dashboard_comparativa():
+        df = consultas.totales_por_maquina_semanas(conn, ((año, semana), (año_prev, semana_prev)))
+        df_sem = df[(df["semana_year"] == año) & (df["semana_num"] == semana)]
+        df_prev = df[(df["semana_year"] == año_prev) & (df["semana_num"] == semana_prev)]
+        df_comp = df[en_semanas(df, [(semana, año), (semana_prev, año_prev)])]
+        df_comp.groupby(["semana_num", "maquina"], sort=False)["ventas"].sum().reset_index()
+        alertas = reportes.alertas_semana(df_sem, df_prev)
+        return reportes.resumen_dashboard(float(df_sem["ventas"].sum()), df_sem, df_prev), alertas
+
+    def dashboard_meses():
+        consultas.ventas_semanales_por_mes(conn, lunes - timedelta(days=365), fechas[-1])
+
+    # Control Ventas: grilla de la semana, un cambio por máquina y guardado por el escritor.
+    # Los valores alternan entre rondas para que cada guardado escriba de verdad.
+    vuelta = [0]
+
+    def control_ventas_guardar():
+        original = grilla.construir(consultas.resumen_semana(conn, año, semana), maquinas, fechas, DIAS)
+        editada = original.copy()
+        vuelta[0] += 1
+        editada.iloc[:, 0] = original.iloc[:, 0] + (100 if vuelta[0] % 2 else -100)
+        cambios_ventas, cambios_egresos = grilla.cambios(original, editada, fechas, DIAS, f"Semana {semana}-{año}", año, semana)
+        escritor.escribir(lambda tx: guardar_celdas_resumen(tx, cambios_ventas, cambios_egresos))
+
+    def rotacion_maquina():
+        reportes.tablas_rotacion(consultas.rotacion_semana(conn, año, semana, maquina).drop(columns="rowid"))
+
+    def rotacion_costos_flota():
+        agregar_costos(consultas.rotacion_flota(conn, *desde_rot, año, semana))
+
+    def reabastecimiento_ranking():
+        df_v = consultas.ventas_semana(conn, año_prev, semana_prev)
+        df_v.groupby("maquina", sort=False)["ventas"].sum().reset_index().sort_values("ventas", ascending=False).head(4)
+
+    def exportar_pdf():
+        resumen, alertas = dashboard_comparativa()
+        exportacion.construir_pdf_resumen(*reportes.argumentos_pdf(año, semana, resumen, alertas), date.today())
+
+    def exportar_reporte():
+        reportes.excel_reporte(conn, año, semana)
+
+    def exportar_rotacion():
+        reportes.excel_rotacion(conn, año, semana, maquina)
+
+    def exportar_rango(formato):
+        return lambda: exportacion.exportar_rango(conn, io.BytesIO(), lunes - timedelta(days=28), fechas[-1], formato=formato)
+
+    return {
+        "dashboard/totales": dashboard_totales,
+        "dashboard/comparativa": dashboard_comparativa,
+        "dashboard/meses": dashboard_meses,
+        "control_ventas/guardar": control_ventas_guardar,
+        "rotacion/maquina": rotacion_maquina,
+        "rotacion/costos_flota_4_semanas": rotacion_costos_flota,
+        "reabastecimiento/ranking": reabastecimiento_ranking,
+        "exportacion/pdf_resumen": exportar_pdf,
+        "exportacion/excel_reporte": exportar_reporte,
+        "exportacion/excel_rotacion": exportar_rotacion,
+        "exportacion/rango_4_semanas_xlsx": exportar_rango("xlsx"),
+        "exportacion/rango_4_semanas_csv": exportar_rango("csv"),
+    }
+
+
+def anterior(referencia, actual):
+    archivos = sorted(f for f in os.listdir(CARPETA) if f.endswith(".json")) if os.path.isdir(CARPETA) else []
+    if referencia:
+        if os.path.exists(referencia):
+            return referencia
+        candidatos = [f for f in archivos if f.split("-", 2)[2].startswith(referencia)]
+        if not candidatos:
+            raise SystemExit(f"No hay resultados guardados para {referencia} en {CARPETA}")
+        return os.path.join(CARPETA, candidatos[-1])
+    archivos = [f for f in archivos if os.path.join(CARPETA, f) != actual]
+    return os.path.join(CARPETA, archivos[-1]) if archivos else None
+
+
+def comparar(resultados, ruta):
+    with open(ruta) as f:
+        previo = json.load(f)
+    print(f"\nContra {previo['commit']} ({os.path.basename(ruta)}):")
+    if previo["parametros"] != resultados["parametros"]:
+        print(f"  ojo: parámetros distintos {previo['parametros']}")
+    regresiones = 0
+    for nombre, r in resultados["casos"].items():
+        if nombre not in previo["casos"]:
+            continue
+        razon = r["mediana"] / previo["casos"][nombre]["mediana"]
+        marca = ""
+        if razon > 1 + UMBRAL_REGRESION:
+            marca, regresiones = "  <- regresión", regresiones + 1
+        elif razon < 1 - UMBRAL_REGRESION:
+            marca = "  mejora"
+        print(f"  {nombre:36} {previo['casos'][nombre]['mediana']:9.2f} -> {r['mediana']:9.2f} ms  x{razon:5.2f}{marca}")
+    return regresiones
+
+
+def main():
+    args = sys.argv[1:]
+    n_maquinas = int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 100
+    años = int(args[args.index("--años") + 1]) if "--años" in args else 2
+    productos = int(args[args.index("--productos") + 1]) if "--productos" in args else 40
+    rondas = int(args[args.index("--rondas") + 1]) if "--rondas" in args else 7
+    filtro = args[args.index("--filtro") + 1] if "--filtro" in args else ""
+    referencia = args[args.index("--comparar") + 1] if "--comparar" in args else None
+
+    origen = args[args.index("--db") + 1] if "--db" in args else base_flota(n_maquinas, años, productos)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "flota.db")
+        shutil.copy(origen, db)
+        conn = sqlite3.connect(db, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        escritor = Escritor(ruta=db)
+        filas = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("resumen_semanal", "rotacion_producto")}
+        print(f"{os.path.basename(origen)}: {filas['resumen_semanal']:,} días, {filas['rotacion_producto']:,} compras; "
+              f"{rondas} rondas por caso\n")
+        print(f"  {'caso':36} {'min':>9} {'mediana':>9} {'media':>9} {'desv':>8}")
+
+        medidos = {}
+        for nombre, fn in casos(conn, escritor).items():
+            if filtro and filtro not in nombre:
+                continue
+            r = medidos[nombre] = medir(fn, rondas)
+            print(f"  {nombre:36} {r['min']:9.2f} {r['mediana']:9.2f} {r['media']:9.2f} {r['desviacion']:8.2f}")
+        conn.close()
+
+    resultados = {
+        "commit": commit_actual(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {"db": os.path.basename(origen), **filas},
+        "casos": medidos,
+    }
+    ruta = None
+    if "--no-guardar" not in args:
+        os.makedirs(CARPETA, exist_ok=True)
+        ruta = os.path.join(CARPETA, f"{datetime.now():%Y%m%d-%H%M%S}-{resultados['commit']}.json")
+        with open(ruta, "w") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nGuardado en {os.path.relpath(ruta, RAIZ)}")
+
+    previo = anterior(referencia, ruta)
+    if previo:
+        comparar(resultados, previo)
+
+
+if __name__ == "__main__":
+    main()
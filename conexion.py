@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+from perfilador import ConexionPerfilada
+
+# Pool de conexiones SQLite: cada hilo (en Streamlit, cada ejecución del script de una sesión)
+# recibe su propia conexión con los mismos PRAGMAs. Al terminar el hilo la conexión vuelve
+# al pool de inactivas y la reutiliza el siguiente hilo; así las sesiones concurrentes leen
+# en paralelo bajo WAL en lugar de competir por un único cursor compartido.
+
+DB_PATH = os.environ.get("PUNTO_EXPRESS_DB", "ventas_semanales.db")
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",      # ~20 MB de caché de páginas por conexión
+    "PRAGMA mmap_size = 268435456",    # 256 MB mapeados en memoria
+    "PRAGMA busy_timeout = 30000",
+)
+
+
+class PoolConexiones:
+    def __init__(self, ruta=DB_PATH, pragmas=PRAGMAS, max_inactivas=32):
+        self.ruta = ruta
+        self.pragmas = pragmas
+        self.max_inactivas = max_inactivas
+        self._local = threading.local()
+        self._inactivas = []
+        self._lock = threading.Lock()
+        self.abiertas = 0
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False, factory=ConexionPerfilada)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        with self._lock:
+            self.abiertas += 1
+        return conn
+
+    def _devolver(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._inactivas) < self.max_inactivas:
+                self._inactivas.append(conn)
+                return
+            self.abiertas -= 1
+        conn.close()
+
+    def conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                conn = self._inactivas.pop() if self._inactivas else None
+            if conn is None:
+                conn = self._abrir()
+            self._local.conn = conn
+            # Cuando el hilo termina (y se recolecta) la conexión vuelve al pool
+            weakref.finalize(threading.current_thread(), self._devolver, conn)
+        return conn
+
+    @contextmanager
+    def transaccion(self):
+        # BEGIN IMMEDIATE toma el bloqueo de escritura al inicio (sin "upgrade" a mitad de
+        # transacción); si ya hay una transacción abierta en el hilo se anida con SAVEPOINT.
+        conn = self.conexion()
+        if conn.in_transaction:
+            conn.execute("SAVEPOINT tx_anidada")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK TO tx_anidada")
+                conn.execute("RELEASE tx_anidada")
+                raise
+            conn.execute("RELEASE tx_anidada")
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def cerrar(self):
+        with self._lock:
+            inactivas, self._inactivas = self._inactivas, []
+            self.abiertas -= len(inactivas)
+        for conn in inactivas:
+            conn.close()
+
+
+pool = PoolConexiones()
+
+
+def obtener_conexion():
+    return pool.conexion()
+
+
+def transaccion():
+    return pool.transaccion()
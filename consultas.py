@@ -0,0 +1,164 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+# Consultas de lectura compartidas por las secciones. Sin dependencia de Streamlit:
+# reciben la conexión y devuelven tuplas o DataFrames. repositorio.py las envuelve con caché.
+
+
+# --- Versión de datos: la incrementa cada escritura, dentro de su misma transacción ---
+def version_datos(conn):
+    fila = conn.execute("SELECT version FROM version_datos WHERE id = 1").fetchone()
+    return fila[0] if fila else 0
+
+
+def marcar_cambio(conn):
+    conn.execute("UPDATE version_datos SET version = version + 1 WHERE id = 1")
+
+
+# --- Resumen semanal ---
+def ultima_semana(conn):
+    fila = conn.execute(
+        "SELECT iso_year, iso_week FROM weekly_machine_totals ORDER BY iso_year DESC, iso_week DESC LIMIT 1"
+    ).fetchone()
+    return (int(fila[0]), int(fila[1])) if fila else None
+
+
+def leer_totales_autoritativos(conn, iso_year, iso_week):
+    r = conn.execute(
+        "SELECT COALESCE(SUM(ventas),0), COALESCE(SUM(egresos),0) "
+        "FROM weekly_machine_totals WHERE iso_year = ? AND iso_week = ?",
+        (iso_year, iso_week),
+    ).fetchone()
+    return float(r[0] or 0), float(r[1] or 0)
+
+
+def totales_por_maquina_semanas(conn, claves):
+    # Solo las semanas pedidas [(iso_year, iso_week), ...]: búsquedas por la clave primaria
+    # dias_semana: fechas distintas con registro en la semana, sin importar qué máquina reportó
+    condicion = " OR ".join(["(iso_year = ? AND iso_week = ?)"] * len(claves)) or "0"
+    condicion_t = " OR ".join(["(t.iso_year = ? AND t.iso_week = ?)"] * len(claves)) or "0"
+    params = [int(v) for clave in claves for v in clave]
+    return pd.read_sql_query(
+        f"WITH dias AS (SELECT iso_year, iso_week, COUNT(DISTINCT fecha) AS dias_semana FROM resumen_semanal "
+        f"WHERE {condicion} GROUP BY iso_year, iso_week) "
+        "SELECT t.iso_week AS semana_num, t.iso_year AS semana_year, t.maquina, t.ventas, t.egresos, t.neto, "
+        "t.dias_activos, t.filas, COALESCE(d.dias_semana, 0) AS dias_semana "
+        "FROM weekly_machine_totals t LEFT JOIN dias d ON d.iso_year = t.iso_year AND d.iso_week = t.iso_week "
+        f"WHERE {condicion_t} ORDER BY t.iso_year, t.iso_week, t.maquina",
+        conn, params=params * 2,
+    )
+
+
+def neto_por_dia(conn, iso_year, iso_week):
+    return pd.read_sql_query(
+        "SELECT dia, SUM(COALESCE(ventas,0) - COALESCE(egresos,0)) AS neto "
+        "FROM resumen_semanal WHERE iso_year = ? AND iso_week = ? GROUP BY dia",
+        conn, params=(iso_year, iso_week),
+    )
+
+
+def totales_maquinas_semana(conn, iso_year, iso_week):
+    return pd.read_sql_query(
+        "SELECT maquina, ventas, egresos, neto, dias_activos "
+        "FROM weekly_machine_totals WHERE iso_year = ? AND iso_week = ? ORDER BY maquina",
+        conn, params=(iso_year, iso_week),
+    )
+
+
+def tendencia_semanal(conn, iso_year, iso_week, semanas=12):
+    filas = conn.execute("""
+        SELECT iso_year, iso_week, SUM(ventas)
+        FROM weekly_machine_totals
+        WHERE (iso_year, iso_week) <= (?, ?)
+        GROUP BY iso_year, iso_week
+        ORDER BY iso_year DESC, iso_week DESC
+        LIMIT ?
+    """, (iso_year, iso_week, semanas)).fetchall()
+    return pd.DataFrame(
+        [(date.fromisocalendar(a, s, 1), v) for a, s, v in reversed(filas)],
+        columns=["fecha", "ventas"],
+    )
+
+
+def resumen_semana(conn, iso_year, iso_week):
+    return pd.read_sql_query(
+        "SELECT semana, fecha, maquina, dia, COALESCE(ventas,0) AS ventas, COALESCE(egresos,0) AS egresos "
+        "FROM resumen_semanal WHERE iso_year = ? AND iso_week = ? ORDER BY maquina, fecha",
+        conn, params=(iso_year, iso_week),
+    )
+
+
+def ventas_semana(conn, iso_year, iso_week):
+    return pd.read_sql_query(
+        "SELECT semana, fecha, maquina, COALESCE(ventas,0) AS ventas FROM resumen_semanal WHERE iso_year = ? AND iso_week = ?",
+        conn, params=(iso_year, iso_week),
+    )
+
+
+def ventas_semanales_por_mes(conn, desde, hasta):
+    # Semanas cuyo lunes cae en [desde, hasta], asignadas al mes de su lunes. variacion compara
+    # con la semana anterior del mismo mes y variacion_mes con el mes anterior (funciones ventana).
+    primera = (desde + timedelta(days=(7 - desde.weekday()) % 7)).isocalendar()[:2]
+    ultima = hasta.isocalendar()[:2]
+    return pd.read_sql_query("""
+        WITH semanas AS (
+            SELECT iso_year, iso_week, SUM(ventas) AS ventas,
+                   strftime('%Y-%m', date(printf('%04d-01-04', iso_year), 'weekday 0', '-6 days',
+                                          printf('+%d days', (iso_week - 1) * 7))) AS mes
+            FROM weekly_machine_totals
+            WHERE (iso_year, iso_week) >= (?, ?) AND (iso_year, iso_week) <= (?, ?)
+            GROUP BY iso_year, iso_week
+        ), meses AS (
+            SELECT mes, ventas_mes,
+                   COALESCE((ventas_mes - LAG(ventas_mes) OVER (ORDER BY mes)) * 100.0
+                            / NULLIF(LAG(ventas_mes) OVER (ORDER BY mes), 0), 0) AS variacion_mes
+            FROM (SELECT mes, SUM(ventas) AS ventas_mes FROM semanas GROUP BY mes)
+        )
+        SELECT s.mes, s.iso_year, s.iso_week, s.ventas,
+               COALESCE((s.ventas - LAG(s.ventas) OVER w) * 100.0 / NULLIF(LAG(s.ventas) OVER w, 0), 0) AS variacion,
+               m.ventas_mes, m.variacion_mes
+        FROM semanas s JOIN meses m USING (mes)
+        WINDOW w AS (PARTITION BY s.mes ORDER BY s.iso_year, s.iso_week)
+        ORDER BY s.iso_year, s.iso_week
+    """, conn, params=(*primera, *ultima))
+
+
+def fechas_registradas(conn, desde, hasta):
+    filas = conn.execute(
+        "SELECT DISTINCT fecha FROM resumen_semanal WHERE fecha BETWEEN ? AND ?", (str(desde), str(hasta))
+    ).fetchall()
+    return [r[0] for r in filas]
+
+
+# --- Catálogos ---
+def maquinas(conn):
+    return sorted(set(r[0] for r in conn.execute("SELECT nombre_maquina FROM maquina").fetchall() if r[0]))
+
+
+def productos_catalogo(conn):
+    return [r[0] for r in conn.execute("SELECT producto FROM producto_catalog ORDER BY producto COLLATE NOCASE").fetchall()]
+
+
+# --- Rotación y mantenimiento ---
+def rotacion_semana(conn, iso_year, iso_week, maquina):
+    return pd.read_sql_query(
+        "SELECT rowid, * FROM rotacion_producto WHERE iso_year = ? AND iso_week = ? AND maquina = ? ORDER BY fecha, producto",
+        conn, params=(iso_year, iso_week, maquina),
+    )
+
+
+def rotacion_flota(conn, desde_año, desde_semana, hasta_año, hasta_semana):
+    return pd.read_sql_query("""
+        SELECT iso_year, iso_week, maquina, producto, cantidad, costo_compra, unidad_compra, unidades_por_paquete
+        FROM rotacion_producto
+        WHERE (iso_year, iso_week) >= (?, ?) AND (iso_year, iso_week) <= (?, ?)
+        ORDER BY iso_year, iso_week, maquina
+    """, conn, params=(desde_año, desde_semana, hasta_año, hasta_semana))
+
+
+def mantenimientos(conn, maquina, iso_year, iso_week):
+    return pd.read_sql_query(
+        "SELECT * FROM mantenimiento WHERE maquina = ? AND iso_year = ? AND iso_week = ? ORDER BY fecha DESC",
+        conn, params=(maquina, iso_year, iso_week),
+    )
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# Motor de costos de Rotación. Las funciones escalares son las de siempre (formularios de
+# registro y edición); agregar_costos() aplica las mismas reglas a un DataFrame completo con
+# np.select sobre unidad_compra, sin apply fila a fila.
+
+UNIDADES_POR_PAQUETE = 6
+
+
+def _unidades_paquete(unidades_por_paquete):
+    # Vacío, 0, NaN o no numérico = UNIDADES_POR_PAQUETE, igual que el relleno SQL de migraciones.py
+    try:
+        unidades = float(unidades_por_paquete)
+    except (TypeError, ValueError):
+        return UNIDADES_POR_PAQUETE
+    return UNIDADES_POR_PAQUETE if unidades == 0 or unidades != unidades else unidades
+
+
+def calcular_precio_unitario(costo_compra, unidad_compra, unidades_por_paquete=UNIDADES_POR_PAQUETE):
+    try:
+        costo = float(costo_compra)
+    except:
+        return 0.0
+    if unidad_compra == "unidad":
+        return costo
+    if unidad_compra == "docena":
+        return costo / 12.0
+    if unidad_compra == "paquete":
+        return costo / _unidades_paquete(unidades_por_paquete)
+    return costo
+
+
+def calcular_gasto(costo_compra, unidad_compra, cantidad_vendida, unidades_por_paquete=UNIDADES_POR_PAQUETE):
+    precio_unit = calcular_precio_unitario(costo_compra, unidad_compra, unidades_por_paquete)
+    try:
+        return precio_unit * float(cantidad_vendida)
+    except:
+        return 0.0
+
+
+def _numerico(serie):
+    # Igual que float(x) en los helpers: lo no convertible (None, texto) no es número,
+    # pero un NaN sí lo es y se propaga. Devuelve (valores, convertible).
+    valores = pd.to_numeric(serie, errors="coerce").astype(float)
+    if serie.dtype == object:
+        convertible = valores.notna() | serie.map(lambda x: isinstance(x, float))
+    else:
+        convertible = pd.Series(True, index=serie.index)
+    return valores, convertible
+
+
+def precio_unitario(costo_compra, unidad_compra, unidades_por_paquete=None):
+    costo, convertible = _numerico(costo_compra)
+    if unidades_por_paquete is None:
+        paquete = pd.Series(float(UNIDADES_POR_PAQUETE), index=costo.index)
+    else:
+        paquete = pd.to_numeric(unidades_por_paquete, errors="coerce").astype(float)
+        paquete = paquete.where(paquete.fillna(0) != 0, float(UNIDADES_POR_PAQUETE))
+    unidad = unidad_compra.to_numpy()
+    precio = np.select(
+        [unidad == "docena", unidad == "paquete"],
+        [costo / 12.0, costo / paquete],
+        costo,
+    )
+    return pd.Series(np.where(convertible, precio, 0.0), index=costo.index)
+
+
+def gasto(precio, cantidad):
+    cant, convertible = _numerico(cantidad)
+    return pd.Series(np.where(convertible, precio * cant, 0.0), index=precio.index)
+
+
+def agregar_costos(df):
+    # Agrega precio_unitario, gasto_total y margen_unitario (valor_unitario - precio_unitario)
+    df = df.copy()
+    paquete = df["unidades_por_paquete"] if "unidades_por_paquete" in df.columns else None
+    df["precio_unitario"] = precio_unitario(df["costo_compra"], df["unidad_compra"], paquete)
+    df["gasto_total"] = gasto(df["precio_unitario"], df["cantidad"])
+    if "valor_unitario" not in df.columns:
+        df["valor_unitario"] = 0.0
+    df["margen_unitario"] = df["valor_unitario"] - df["precio_unitario"]
+    return df
+
+
+def resumen_por_producto(df):
+    # Inversión (costo de compra), gasto de lo vendido y participación por producto y unidad
+    resumen = df.groupby(["producto", "unidad_compra"], as_index=False).agg(
+        costo_compra=("costo_compra", "sum"),
+        cantidad=("cantidad", "sum"),
+        precio_unitario=("precio_unitario", "mean"),
+        gasto_total=("gasto_total", "sum"),
+    )
+    total = resumen["costo_compra"].sum()
+    resumen["porcentaje_inversion"] = resumen["costo_compra"] / total * 100 if total > 0 else 0.0
+    return resumen
@@ -0,0 +1,143 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from conexion import DB_PATH, PRAGMAS
+from consultas import marcar_cambio
+from perfilador import ConexionPerfilada, perfil
+
+# Escritor único: todas las mutaciones se envían a un hilo dedicado que las agrupa en lotes
+# (group commit) con una sola transacción por lote. Cada trabajo corre en su propio SAVEPOINT,
+# así un error solo descarta ese trabajo; el resto del lote se confirma. El llamador recibe un
+# Future que se resuelve después del COMMIT (o con la excepción del trabajo).
+
+ESPERA_ESCRITURA = 60       # segundos que escribir() espera el COMMIT antes de rendirse
+
+
+class Escritor:
+    def __init__(self, ruta=DB_PATH, pragmas=PRAGMAS, max_lote=256, ventana=0.002):
+        self.ruta = ruta
+        self.pragmas = pragmas
+        self.max_lote = max_lote
+        self.ventana = ventana          # espera breve para juntar trabajos que llegan casi a la vez
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=500)
+        self._tamaños = deque(maxlen=500)
+        self.lotes = 0
+        self.trabajos = 0
+        self.errores = 0
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="punto-express-escritor", daemon=True)
+                self._hilo.start()
+
+    def enviar(self, trabajo):
+        # trabajo: función que recibe la conexión del escritor y devuelve un resultado
+        futuro = Future()
+        self._iniciar()
+        # La sección del llamador acompaña al trabajo: el perfilador lo atribuye a ella
+        self._cola.put((trabajo, futuro, perfil.seccion_actual()))
+        return futuro
+
+    def escribir(self, trabajo, timeout=ESPERA_ESCRITURA):
+        return self.enviar(trabajo).result(timeout)
+
+    def ejecutar(self, sql, params=()):
+        return self.enviar(lambda tx: tx.execute(sql, params).rowcount)
+
+    def ejecutar_muchos(self, sql, filas):
+        filas = list(filas)
+        return self.enviar(lambda tx: tx.executemany(sql, filas).rowcount)
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.ruta, timeout=30, isolation_level=None, factory=ConexionPerfilada)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def _bucle(self):
+        conn = self._abrir()
+        while True:
+            lote = [self._cola.get()]
+            if self.ventana:
+                time.sleep(self.ventana)
+            while len(lote) < self.max_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            self._procesar(conn, lote)
+
+    def _procesar(self, conn, lote):
+        inicio = time.perf_counter()
+        resultados = []
+        try:
+            perfil.en_seccion("Escritor")
+            conn.execute("BEGIN IMMEDIATE")
+            for trabajo, futuro, seccion in lote:
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                perfil.en_seccion(seccion)
+                conn.execute("SAVEPOINT trabajo")
+                try:
+                    resultado = trabajo(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO trabajo")
+                    conn.execute("RELEASE trabajo")
+                    resultados.append((futuro, None, e))
+                    continue
+                conn.execute("RELEASE trabajo")
+                resultados.append((futuro, resultado, None))
+            perfil.en_seccion("Escritor")
+            if any(e is None for _, _, e in resultados):
+                marcar_cambio(conn)
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Falló BEGIN/COMMIT: nada del lote quedó escrito. Si falló BEGIN ningún futuro llegó
+            # a marcarse en curso; se resuelven todos los pendientes para no dejar a nadie esperando.
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            resultados = [(f, None, e) for _, f, _ in lote if not f.done()]
+        latencia = (time.perf_counter() - inicio) * 1000
+
+        with self._lock:
+            self.lotes += 1
+            self.trabajos += len(lote)
+            self.errores += sum(1 for _, _, e in resultados if e is not None)
+            self._latencias.append(latencia)
+            self._tamaños.append(len(lote))
+        # Se avisa al llamador solo después del COMMIT: una lectura posterior ya ve el cambio
+        for futuro, resultado, error in resultados:
+            if error is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(error)
+
+    def metricas(self):
+        with self._lock:
+            latencias = sorted(self._latencias)
+            tamaños = list(self._tamaños)
+            return {
+                "profundidad_cola": self._cola.qsize(),
+                "lotes": self.lotes,
+                "trabajos": self.trabajos,
+                "errores": self.errores,
+                "lote_medio": sum(tamaños) / len(tamaños) if tamaños else 0.0,
+                "lote_max": max(tamaños) if tamaños else 0,
+                "commit_p50_ms": latencias[len(latencias) // 2] if latencias else 0.0,
+                "commit_p95_ms": latencias[int(len(latencias) * 0.95)] if latencias else 0.0,
+            }
+
+
+escritor = Escritor()
+
+
+def escribir(trabajo, timeout=ESPERA_ESCRITURA):
+    return escritor.escribir(trabajo, timeout)
@@ -0,0 +1,365 @@
+import csv
+import hashlib
+import importlib.util
+import io
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+
+from conexion import obtener_conexion
+
+# Exportaciones bajo demanda (Excel, PDF, PNG). Cada función devuelve un callable sin argumentos
+# para st.download_button: el archivo se arma recién al hacer clic, no en cada rerun. Los bytes
+# quedan en una caché LRU con tope de tamaño, indexada por el tipo de exportación y un hash del
+# contenido; openpyxl, fpdf y kaleido se importan solo dentro de los constructores.
+# La exportación por rango (historial de varias semanas y máquinas) no pasa por pandas ni por
+# la caché: lee SQLite por lotes y escribe directo a un writer de memoria constante.
+
+MIME_EXCEL = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MAX_BYTES = 64 * 1024 * 1024
+
+
+class CacheLRU:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def obtener(self, clave, construir):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return self._datos[clave]
+            self.fallos += 1
+        # Se construye fuera del lock: dos clics simultáneos sobre lo mismo solo repiten trabajo
+        contenido = bytes(construir())
+        with self._lock:
+            if clave not in self._datos:
+                self._datos[clave] = contenido
+                self.bytes += len(contenido)
+            while self.bytes > self.max_bytes and len(self._datos) > 1:
+                _, viejo = self._datos.popitem(last=False)
+                self.bytes -= len(viejo)
+                self.desalojos += 1
+        return contenido
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "entradas": len(self._datos),
+                "bytes": self.bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+            }
+
+
+cache = CacheLRU()
+
+
+def _actualizar(h, parte):
+    if isinstance(parte, pd.DataFrame):
+        h.update(repr([(str(c), str(t)) for c, t in parte.dtypes.items()]).encode())
+        h.update(pd.util.hash_pandas_object(parte, index=False).to_numpy().tobytes())
+    elif isinstance(parte, dict):
+        for clave, valor in parte.items():
+            h.update(repr(clave).encode())
+            _actualizar(h, valor)
+    elif isinstance(parte, (list, tuple)):
+        h.update(b"[%d]" % len(parte))
+        for valor in parte:
+            _actualizar(h, valor)
+    elif hasattr(parte, "to_plotly_json"):
+        h.update(parte.to_json().encode())
+    else:
+        h.update(repr(parte).encode())
+    h.update(b"\x00")
+
+
+def huella(tipo, *partes):
+    h = hashlib.sha256(tipo.encode())
+    for parte in partes:
+        _actualizar(h, parte)
+    return h.hexdigest()
+
+
+def disponible(modulo):
+    return importlib.util.find_spec(modulo) is not None
+
+
+def _bajo_demanda(tipo, construir, *partes):
+    return lambda: cache.obtener(huella(tipo, *partes), lambda: construir(*partes))
+
+
+# --- Constructores (solo corren al descargar) ---
+
+def construir_excel(hojas):
+    # hojas: {nombre de hoja: DataFrame}
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        for nombre, df in hojas.items():
+            df.to_excel(writer, index=False, sheet_name=nombre)
+    return buf.getvalue()
+
+
+def construir_png(fig):
+    return fig.to_image(format="png")
+
+
+def construir_pdf_resumen(titulo, subtitulo, filas, observaciones, generado):
+    from fpdf import FPDF
+
+    class PDF(FPDF):
+        def header(self):
+            self.set_font("Arial", "B", 16)
+            self.set_text_color(40, 40, 40)
+            self.cell(0, 10, titulo, ln=True, align="C")
+            self.set_font("Arial", "", 12)
+            self.cell(0, 10, subtitulo, ln=True, align="C")
+            self.ln(10)
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font("Arial", "I", 8)
+            self.set_text_color(100)
+            self.cell(0, 10, f"Generado el {generado}", align="C")
+
+    pdf = PDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=11)
+
+    for metrica, valor in filas:
+        pdf.cell(60, 10, str(metrica), border=1)
+        pdf.cell(120, 10, str(valor), border=1, ln=True)
+
+    if observaciones:
+        pdf.ln(10)
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 10, "Observaciones:", ln=True)
+        pdf.set_font("Arial", size=11)
+        for texto in observaciones:
+            pdf.multi_cell(0, 10, f"- {texto}")
+
+    salida = pdf.output(dest="S")
+    return salida.encode("latin-1", errors="replace") if isinstance(salida, str) else bytes(salida)
+
+
+# --- Callables para st.download_button ---
+
+def excel(hojas):
+    return _bajo_demanda("xlsx", construir_excel, dict(hojas))
+
+
+def png(fig):
+    return _bajo_demanda("png", construir_png, fig)
+
+
+def pdf_resumen(titulo, subtitulo, filas, observaciones=()):
+    # filas: pares (métrica, valor); observaciones: textos ya limpios para latin-1.
+    # La fecha de generación entra en la huella para no servir el PDF de otro día.
+    return _bajo_demanda(
+        "pdf", construir_pdf_resumen, titulo, subtitulo, [tuple(f) for f in filas], list(observaciones), date.today()
+    )
+
+
+# --- Exportación por rango (streaming) ---
+
+COLUMNAS_RANGO = {
+    "resumen_semanal": ["semana", "fecha", "maquina", "dia", "ventas", "egresos"],
+    "rotacion_producto": [
+        "semana", "fecha", "maquina", "producto", "cantidad", "valor_unitario",
+        "costo_compra", "unidad_compra", "unidades_por_paquete", "precio_unitario",
+    ],
+    "mantenimiento": ["semana", "fecha", "maquina", "tipo", "descripcion", "costo"],
+}
+FORMATOS_RANGO = ("xlsx", "csv", "parquet")
+LOTE_RANGO = 10_000
+FILAS_HOJA = 1_048_575          # límite de filas de Excel sin contar el encabezado
+
+
+def columnas_rango(conn, tabla):
+    # Las bases creadas desde cero no tienen todas las columnas históricas (valor_unitario)
+    existentes = {fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})")}
+    return [c for c in COLUMNAS_RANGO[tabla] if c in existentes]
+
+
+def filas_rango(conn, tabla, desde, hasta, maquinas=None, lote=LOTE_RANGO):
+    # Generador de lotes de tuplas (fetchmany): nunca hay más de `lote` filas en memoria
+    sql = f"SELECT {', '.join(columnas_rango(conn, tabla))} FROM {tabla} WHERE fecha BETWEEN ? AND ?"
+    params = [str(desde), str(hasta)]
+    if maquinas:
+        sql += f" AND maquina IN ({', '.join('?' * len(maquinas))})"
+        params += list(maquinas)
+    cur = conn.execute(sql + " ORDER BY fecha, maquina", params)
+    try:
+        while True:
+            filas = cur.fetchmany(lote)
+            if not filas:
+                break
+            yield filas
+    finally:
+        cur.close()
+
+
+def _rango_xlsx(conn, destino, tablas, desde, hasta, maquinas, lote):
+    from openpyxl import Workbook
+
+    # write_only: cada fila se vuelca a un temporal del worksheet, no queda en el Workbook.
+    # Una tabla que supera el límite de Excel sigue en hojas tabla_2, tabla_3, ...
+    wb = Workbook(write_only=True)
+    conteo = {}
+    for tabla in tablas:
+        hoja, en_hoja, parte, total = None, FILAS_HOJA, 0, 0
+        for filas in filas_rango(conn, tabla, desde, hasta, maquinas, lote):
+            for fila in filas:
+                if en_hoja == FILAS_HOJA:
+                    parte += 1
+                    hoja = wb.create_sheet(tabla if parte == 1 else f"{tabla}_{parte}")
+                    hoja.append(columnas_rango(conn, tabla))
+                    en_hoja = 0
+                hoja.append(fila)
+                en_hoja += 1
+            total += len(filas)
+        if hoja is None:
+            wb.create_sheet(tabla).append(columnas_rango(conn, tabla))
+        conteo[tabla] = total
+    wb.save(destino)
+    return conteo
+
+
+def _rango_csv(conn, destino, tablas, desde, hasta, maquinas, lote):
+    conteo = {}
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf:
+        for tabla in tablas:
+            total = 0
+            with zf.open(f"{tabla}.csv", "w", force_zip64=True) as f:
+                texto = io.TextIOWrapper(f, encoding="utf-8", newline="")
+                escritor = csv.writer(texto)
+                escritor.writerow(columnas_rango(conn, tabla))
+                for filas in filas_rango(conn, tabla, desde, hasta, maquinas, lote):
+                    escritor.writerows(filas)
+                    total += len(filas)
+                texto.flush()
+                texto.detach()
+            conteo[tabla] = total
+    return conteo
+
+
+def esquema_parquet(conn, tabla):
+    import pyarrow as pa
+
+    # SQLite no impone el tipo declarado (un INTEGER puede guardar 1500.5): lo numérico va como float64
+    declarados = {fila[1]: (fila[2] or "").upper() for fila in conn.execute(f"PRAGMA table_info({tabla})")}
+    return pa.schema([
+        (c, pa.float64() if declarados.get(c) in ("INTEGER", "REAL") else pa.string())
+        for c in columnas_rango(conn, tabla)
+    ])
+
+
+def columna_arrow(valores, tipo):
+    import pyarrow as pa
+
+    try:
+        return pa.array(valores, type=tipo, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if pa.types.is_string(tipo):
+            return pa.array([None if v is None else str(v) for v in valores], type=tipo)
+        # Filas heredadas con texto en una columna numérica: en Parquet quedan nulas
+        # (el xlsx y el csv sí conservan el valor original)
+        return pa.array(pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce"), type=tipo)
+
+
+def _rango_parquet(conn, destino, tablas, desde, hasta, maquinas, lote):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    conteo = {}
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_STORED) as zf:
+        for tabla in tablas:
+            esquema = esquema_parquet(conn, tabla)
+            total = 0
+            with zf.open(f"{tabla}.parquet", "w", force_zip64=True) as f:
+                with pq.ParquetWriter(f, esquema) as escritor:
+                    for filas in filas_rango(conn, tabla, desde, hasta, maquinas, lote):
+                        columnas = list(zip(*filas))
+                        escritor.write_batch(pa.record_batch(
+                            [columna_arrow(col, campo.type) for col, campo in zip(columnas, esquema)],
+                            schema=esquema,
+                        ))
+                        total += len(filas)
+            conteo[tabla] = total
+    return conteo
+
+
+def exportar_rango(conn, destino, desde, hasta, tablas=None, maquinas=None, formato="xlsx", lote=LOTE_RANGO):
+    # destino: ruta o archivo binario. xlsx = una hoja por tabla; csv/parquet = zip con un archivo
+    # por tabla. Devuelve {tabla: filas exportadas}.
+    tablas = list(tablas or COLUMNAS_RANGO)
+    desconocidas = [t for t in tablas if t not in COLUMNAS_RANGO]
+    if desconocidas:
+        raise ValueError(f"Tablas no exportables: {', '.join(desconocidas)}")
+    escritores = {"xlsx": _rango_xlsx, "csv": _rango_csv, "parquet": _rango_parquet}
+    if formato not in escritores:
+        raise ValueError(f"Formato no soportado: {formato} (usa {', '.join(FORMATOS_RANGO)})")
+    return escritores[formato](conn, destino, tablas, desde, hasta, maquinas, lote)
+
+
+def rango(desde, hasta, tablas=None, maquinas=None, formato="xlsx"):
+    # Callable para st.download_button. Corre en otro hilo: usa su propia conexión del pool y
+    # arma el archivo en un temporal en disco; en memoria solo quedan los bytes finales.
+    def construir():
+        with tempfile.TemporaryFile() as tmp:
+            exportar_rango(obtener_conexion(), tmp, desde, hasta, tablas, maquinas, formato)
+            tmp.seek(0)
+            return tmp.read()
+    return construir
+
+
+if __name__ == "__main__":
+    import sqlite3
+    import sys
+    import time
+
+    from conexion import DB_PATH
+
+    # python exportacion.py --desde 2025-01-01 --hasta 2025-12-31 [--tablas resumen_semanal,mantenimiento]
+    #                       [--maquinas Norte,Sur] [--formato xlsx|csv|parquet] [--salida ruta] [--db ruta]
+    args = sys.argv[1:]
+
+    def _opcion(nombre, defecto=None):
+        return args[args.index(nombre) + 1] if nombre in args else defecto
+
+    desde, hasta = _opcion("--desde"), _opcion("--hasta")
+    if not desde or not hasta:
+        sys.exit("Uso: python exportacion.py --desde AAAA-MM-DD --hasta AAAA-MM-DD [--formato xlsx|csv|parquet]")
+    formato = _opcion("--formato", "xlsx")
+    tablas = _opcion("--tablas")
+    maquinas = _opcion("--maquinas")
+    salida = _opcion("--salida", f"historial_{desde}_{hasta}.{'xlsx' if formato == 'xlsx' else 'zip'}")
+
+    conn = sqlite3.connect(_opcion("--db", DB_PATH), timeout=30)
+    inicio = time.perf_counter()
+    conteo = exportar_rango(
+        conn, salida, desde, hasta,
+        tablas.split(",") if tablas else None,
+        maquinas.split(",") if maquinas else None,
+        formato,
+    )
+    for tabla, filas in conteo.items():
+        print(f"  {tabla}: {filas:,} filas")
+    print(f"{salida} ({time.perf_counter() - inicio:.1f}s)")
+    conn.close()
@@ -0,0 +1,261 @@
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from migraciones import aplicar_migraciones
+
+# Flota sintética para pruebas y benchmarks: llena maquina, producto_catalog, resumen_semanal,
+# rotacion_producto y mantenimiento de una base nueva con N máquinas x A años x P productos.
+# Es determinista: la misma semilla y los mismos parámetros dan exactamente las mismas filas.
+# Incluye lo que tienen los datos reales: festivos de Colombia (ventas más bajas y máquinas
+# cerradas), egresos del día = compras registradas en Rotación (y filas solo de egreso, como las
+# crea la sincronización, en días cerrados), y etiquetas heredadas e inconsistentes ("Semana N"
+# en lugar de "Semana N-AAAA", "Semana N" en Rotación, productos con mayúsculas o espacios de más).
+#
+#   python generador.py --db ruta [--maquinas 50] [--años 2] [--productos 40] [--semilla 38]
+#                       [--hasta 2025-09-20] [--inconsistencias 0.02] [--forzar]
+
+HASTA = date(2025, 9, 20)       # sábado de la semana 38 de 2025, la del bloque de simulación de la app
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+ZONAS = ["Norte", "Sur", "Centro", "Terminal", "Aeropuerto", "Clínica", "Universidad", "Hospital",
+         "Motomall", "Paquetex", "Dekohouse", "Caldas", "Unidad", "Buses"]
+PRODUCTOS = ["Agua", "Gaseosa", "Jugo", "Café", "Té frío", "Papas", "Maní", "Galletas", "Chocolatina",
+             "Barra de cereal", "Chicle", "Gomitas", "Ponqué", "Yogur", "Bebida energética", "Agua saborizada",
+             "Avena", "Tostacos", "Platanitos", "Bon bon bum"]
+UNIDADES = [("unidad", 6), ("docena", 6), ("paquete", 6), ("paquete", 12), ("paquete", 24)]
+MANTENIMIENTOS = [("Preventivo", "Limpieza y revisión general"), ("Preventivo", "Cambio de filtros"),
+                  ("Correctivo", "Cambio de monedero"), ("Correctivo", "Falla en la unidad de frío"),
+                  ("Correctivo", "Motor de espiral atascado")]
+FACTOR_DIA = np.array([0.9, 0.95, 1.0, 1.05, 1.2, 1.1])
+SEMANAS_POR_LOTE = 26
+
+
+def _pascua(año):
+    # Domingo de Pascua (algoritmo anónimo gregoriano)
+    a, b, c = año % 19, año // 100, año % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(año, mes, dia + 1)
+
+
+def festivos(año):
+    # Festivos de Colombia: fechas fijas, los trasladables al lunes siguiente (Ley Emiliani) y
+    # los que dependen de la Pascua
+    def lunes(d):
+        return d + timedelta(days=(7 - d.weekday()) % 7)
+
+    pascua = _pascua(año)
+    fijos = [date(año, 1, 1), date(año, 5, 1), date(año, 7, 20), date(año, 8, 7), date(año, 12, 8), date(año, 12, 25),
+             pascua - timedelta(days=3), pascua - timedelta(days=2)]
+    trasladables = [date(año, 1, 6), date(año, 3, 19), date(año, 6, 29), date(año, 8, 15), date(año, 10, 12),
+                    date(año, 11, 1), date(año, 11, 11),
+                    pascua + timedelta(days=39), pascua + timedelta(days=60), pascua + timedelta(days=68)]
+    return set(fijos) | {lunes(d) for d in trasladables}
+
+
+def nombres_maquinas(n):
+    return [f"{ZONAS[i % len(ZONAS)]} {i // len(ZONAS) + 1}" for i in range(n)]
+
+
+def nombres_productos(n):
+    return [PRODUCTOS[i % len(PRODUCTOS)] + (f" x{i // len(PRODUCTOS) + 1}" if i >= len(PRODUCTOS) else "") for i in range(n)]
+
+
+def _lotes_semanas(hasta, años):
+    ultimo = hasta - timedelta(days=hasta.weekday())
+    n = int(round(años * 52))
+    lunes = [ultimo - timedelta(weeks=n - 1 - i) for i in range(n)]
+    for i in range(0, n, SEMANAS_POR_LOTE):
+        yield lunes[i:i + SEMANAS_POR_LOTE]
+
+
+def _insertar(conn, tabla, df):
+    columnas = ", ".join(df.columns)
+    conn.execute(f"DROP TABLE IF EXISTS temp.generador_{tabla}")
+    conn.execute(f"CREATE TEMP TABLE generador_{tabla} AS SELECT {columnas} FROM {tabla} WHERE 0")
+    conn.executemany(f"INSERT INTO temp.generador_{tabla} VALUES ({', '.join('?' * len(df.columns))})",
+                     df.itertuples(index=False, name=None))
+    n = conn.execute(f"INSERT INTO {tabla} ({columnas}) SELECT {columnas} FROM temp.generador_{tabla}").rowcount
+    conn.execute(f"DROP TABLE temp.generador_{tabla}")
+    return n
+
+
+def _etiquetas(rng, normal, variante, inconsistencias):
+    return np.where(rng.random(len(normal)) < inconsistencias, variante, normal)
+
+
+def _lote(rng, flota, lunes, hasta, inconsistencias):
+    maquinas, base, surtido, demanda, productos, costo_unidad, unidad, paquete = flota
+    n_maq = len(maquinas)
+    fechas = pd.DatetimeIndex([l + timedelta(days=d) for l in lunes for d in range(6)])
+    fechas = fechas[fechas <= pd.Timestamp(hasta)]
+    iso = fechas.isocalendar()
+    años = sorted({f.year for f in fechas} | {f.year + 1 for f in fechas})
+    es_festivo = fechas.normalize().isin(pd.to_datetime(sorted(set().union(*(festivos(a) for a in años)))))
+
+    # --- resumen_semanal: una fila por máquina y día (menos las máquinas cerradas en festivos) ---
+    semana_año = fechas.dayofyear.to_numpy() / 365.25
+    factor = FACTOR_DIA[fechas.weekday.to_numpy()] * (1 + 0.15 * np.sin(2 * np.pi * semana_año)) \
+        * 1.05 ** ((fechas - pd.Timestamp(HASTA)).days.to_numpy() / 365.25) * np.where(es_festivo, 0.45, 1.0)
+    ventas = base[:, None] * factor[None, :] * rng.lognormal(0, 0.2, (n_maq, len(fechas)))
+    abierta = ~(es_festivo[None, :] & (rng.random((n_maq, len(fechas))) < 0.3))
+    i_maq, i_dia = np.nonzero(abierta)
+    resumen = pd.DataFrame({
+        "fecha": fechas.strftime("%Y-%m-%d").to_numpy()[i_dia],
+        "maquina": maquinas[i_maq],
+        "dia": np.array(DIAS)[fechas.weekday.to_numpy()][i_dia],
+        "ventas": (np.round(ventas[i_maq, i_dia] / 100) * 100).astype(np.int64),
+        "iso_year": iso["year"].to_numpy()[i_dia].astype(np.int64),
+        "iso_week": iso["week"].to_numpy()[i_dia].astype(np.int64),
+    })
+
+    # --- rotacion_producto: cada semana se repone ~40% del surtido de cada máquina ---
+    s_maq, s_prod = np.nonzero(surtido)
+    n_sem = len(lunes)
+    dia_compra = rng.integers(0, 6, (n_sem, len(s_maq)))
+    i_fecha = (np.arange(n_sem)[:, None] * 6 + dia_compra).ravel()
+    s_maq, s_prod = np.tile(s_maq, n_sem), np.tile(s_prod, n_sem)
+    dentro = (i_fecha < len(fechas)) & (rng.random(len(i_fecha)) < 0.4)
+    i_fecha, s_maq, s_prod = i_fecha[dentro], s_maq[dentro], s_prod[dentro]
+    cantidad = rng.poisson(demanda[s_maq, s_prod]) + 1
+    por_compra = np.where(unidad[s_prod] == "unidad", 1, np.where(unidad[s_prod] == "docena", 12, paquete[s_prod]))
+    # Como en el formulario de Rotación: costo_compra es lo que vale una unidad de compra
+    # (la unidad, la docena o el paquete) y precio_unitario ese costo repartido por unidad
+    costo = (costo_unidad[s_prod] * por_compra).round(-1).astype(np.int64)
+    semana_rot = iso["week"].to_numpy()[i_fecha].astype(np.int64)
+    nombre = productos[s_prod]
+    variante = rng.random(len(nombre)) < inconsistencias
+    nombre = np.where(variante & (rng.random(len(nombre)) < 0.5), np.char.upper(nombre.astype(str)).astype(object), nombre)
+    nombre = np.where(variante, nombre + " ", nombre)
+    rotacion = pd.DataFrame({
+        "semana": _etiquetas(rng, semana_rot.astype(str).astype(object), np.char.add("Semana ", semana_rot.astype(str)).astype(object), inconsistencias),
+        "fecha": fechas.strftime("%Y-%m-%d").to_numpy()[i_fecha],
+        "maquina": maquinas[s_maq],
+        "producto": nombre,
+        "cantidad": cantidad.astype(np.int64),
+        "precio_unitario": costo / por_compra,
+        "costo_compra": costo,
+        "unidad_compra": unidad[s_prod],
+        "unidades_por_paquete": paquete[s_prod].astype(np.int64),
+        "iso_year": iso["year"].to_numpy()[i_fecha].astype(np.int64),
+        "iso_week": semana_rot,
+    })
+
+    # Egreso del día = compras de Rotación; en un día cerrado la compra crea una fila solo de egreso
+    compras = rotacion.groupby(["maquina", "fecha"], as_index=False)["costo_compra"].sum()
+    resumen = resumen.merge(compras, on=["maquina", "fecha"], how="outer")
+    solo_egreso = resumen["ventas"].isna()
+    fechas_egreso = pd.to_datetime(resumen.loc[solo_egreso, "fecha"])
+    resumen.loc[solo_egreso, "dia"] = np.array(DIAS)[fechas_egreso.dt.weekday.to_numpy()]
+    resumen.loc[solo_egreso, "iso_year"] = fechas_egreso.dt.isocalendar()["year"].to_numpy()
+    resumen.loc[solo_egreso, "iso_week"] = fechas_egreso.dt.isocalendar()["week"].to_numpy()
+    resumen["ventas"] = resumen["ventas"].fillna(0).astype(np.int64)
+    resumen["egresos"] = resumen.pop("costo_compra").fillna(0).astype(np.int64)
+    resumen["egreso_auto"] = solo_egreso.astype(np.int64)
+    resumen["iso_year"] = resumen["iso_year"].astype(np.int64)
+    resumen["iso_week"] = resumen["iso_week"].astype(np.int64)
+    completa = "Semana " + resumen["iso_week"].astype(str) + "-" + resumen["iso_year"].astype(str)
+    corta = "Semana " + resumen["iso_week"].astype(str)
+    resumen["semana"] = np.where(solo_egreso, corta, _etiquetas(rng, completa.to_numpy(object), corta.to_numpy(object), inconsistencias))
+    resumen = resumen[["semana", "fecha", "maquina", "dia", "ventas", "egresos", "egreso_auto", "iso_year", "iso_week"]]
+
+    # --- mantenimiento: en promedio una visita cada 8 semanas por máquina ---
+    m_sem, m_maq = np.nonzero(rng.random((n_sem, n_maq)) < 1 / 8)
+    i_fecha = m_sem * 6 + rng.integers(0, 6, len(m_sem))
+    dentro = i_fecha < len(fechas)
+    m_maq, i_fecha = m_maq[dentro], i_fecha[dentro]
+    tipo = rng.integers(0, len(MANTENIMIENTOS), len(m_maq))
+    mantenimiento = pd.DataFrame({
+        "fecha": fechas.strftime("%Y-%m-%d").to_numpy()[i_fecha],
+        "maquina": maquinas[m_maq],
+        "tipo": np.array([t for t, _ in MANTENIMIENTOS], dtype=object)[tipo],
+        "descripcion": np.array([d for _, d in MANTENIMIENTOS], dtype=object)[tipo],
+        "costo": (rng.integers(5, 400, len(m_maq)) * 1000).astype(float),
+        "semana": iso["week"].to_numpy()[i_fecha].astype(str).astype(object),
+        "iso_year": iso["year"].to_numpy()[i_fecha].astype(np.int64),
+        "iso_week": iso["week"].to_numpy()[i_fecha].astype(np.int64),
+    })
+    return resumen, rotacion, mantenimiento
+
+
+def generar(conn, maquinas=50, años=2, productos=40, semilla=38, hasta=HASTA, inconsistencias=0.02, progreso=None):
+    # Llena la base de `conn` (se aplican las migraciones); devuelve las filas insertadas por tabla
+    aplicar_migraciones(conn)
+    rng = np.random.default_rng(semilla)
+    nombres = np.array(nombres_maquinas(maquinas), dtype=object)
+    catalogo = np.array(nombres_productos(productos), dtype=object)
+    popularidad = rng.lognormal(0, 0.6, productos)
+    tamaño = rng.lognormal(0, 0.35, maquinas)
+    n_surtido = rng.integers(min(10, productos), min(25, productos) + 1, maquinas)
+    surtido = np.zeros((maquinas, productos), dtype=bool)
+    for i, n in enumerate(n_surtido):
+        surtido[i, rng.choice(productos, n, replace=False, p=popularidad / popularidad.sum())] = True
+    i_unidad = rng.integers(0, len(UNIDADES), productos)
+    flota = (
+        nombres,
+        rng.lognormal(np.log(20_000), 0.4, maquinas) * tamaño,
+        surtido,
+        4 * tamaño[:, None] * popularidad[None, :],
+        catalogo,
+        rng.integers(6, 30, productos) * 50.0,
+        np.array([UNIDADES[i][0] for i in i_unidad], dtype=object),
+        np.array([UNIDADES[i][1] for i in i_unidad]),
+    )
+
+    total = {"maquina": 0, "producto_catalog": 0, "resumen_semanal": 0, "rotacion_producto": 0, "mantenimiento": 0}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        total["maquina"] = conn.executemany(
+            "INSERT OR IGNORE INTO maquina (nombre_maquina) VALUES (?)", [(m,) for m in nombres]
+        ).rowcount
+        for lunes in _lotes_semanas(hasta, años):
+            resumen, rotacion, mantenimiento = _lote(rng, flota, lunes, hasta, inconsistencias)
+            total["resumen_semanal"] += _insertar(conn, "resumen_semanal", resumen)
+            total["rotacion_producto"] += _insertar(conn, "rotacion_producto", rotacion)
+            total["mantenimiento"] += _insertar(conn, "mantenimiento", mantenimiento)
+            if progreso:
+                progreso(lunes[-1], total)
+        total["producto_catalog"] = conn.execute(
+            "INSERT OR IGNORE INTO producto_catalog (producto) SELECT DISTINCT producto FROM rotacion_producto"
+        ).rowcount
+        conn.execute("UPDATE version_datos SET version = version + 1 WHERE id = 1")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return total
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--db" not in args:
+        raise SystemExit("Uso: python generador.py --db ruta [--maquinas 50] [--años 2] [--productos 40] [--semilla 38] "
+                         "[--hasta 2025-09-20] [--inconsistencias 0.02] [--forzar]")
+    ruta = args[args.index("--db") + 1]
+    conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    aplicar_migraciones(conn)
+    existentes = conn.execute("SELECT COUNT(*) FROM resumen_semanal").fetchone()[0]
+    if existentes and "--forzar" not in args:
+        raise SystemExit(f"{ruta} ya tiene {existentes:,} filas en resumen_semanal; usa --forzar para agregar la flota igual")
+    t = time.perf_counter()
+    total = generar(
+        conn,
+        maquinas=int(args[args.index("--maquinas") + 1]) if "--maquinas" in args else 50,
+        años=float(args[args.index("--años") + 1]) if "--años" in args else 2,
+        productos=int(args[args.index("--productos") + 1]) if "--productos" in args else 40,
+        semilla=int(args[args.index("--semilla") + 1]) if "--semilla" in args else 38,
+        hasta=date.fromisoformat(args[args.index("--hasta") + 1]) if "--hasta" in args else HASTA,
+        inconsistencias=float(args[args.index("--inconsistencias") + 1]) if "--inconsistencias" in args else 0.02,
+        progreso=lambda semana, t: print(f"  hasta {semana}: {t['resumen_semanal']:,} días, {t['rotacion_producto']:,} compras", flush=True),
+    )
+    conn.close()
+    print(f"{ruta}: " + ", ".join(f"{n:,} en {tabla}" for tabla, n in total.items()) + f" ({time.perf_counter() - t:.1f}s)")
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Grillas editables (st.data_editor) y su diff contra lo guardado.
+# Control Ventas: una fila por máquina y dos columnas (ventas, egresos) por día; cambios()
+# devuelve solo las celdas modificadas, listas para operaciones.guardar_celdas_resumen.
+# Rotación: una fila por registro; cambios_rotacion() separa ediciones y borrados.
+
+CAMPOS = ("ventas", "egresos")
+ETIQUETAS = {"ventas": "Ventas", "egresos": "Egresos"}
+
+
+def columnas(dias):
+    return [f"{dia} · {ETIQUETAS[campo]}" for dia in dias for campo in CAMPOS]
+
+
+def construir(df_semana, maquinas, fechas, dias):
+    fechas_str = [str(f) for f in fechas]
+    orden = pd.MultiIndex.from_tuples([(campo, f) for f in fechas_str for campo in CAMPOS])
+    valores = (
+        df_semana.drop_duplicates(["maquina", "fecha"])
+        .set_index(["maquina", "fecha"])[list(CAMPOS)]
+        .astype(float)
+        .unstack("fecha")
+        .reindex(index=maquinas, columns=orden)
+        .fillna(0.0)
+        .to_numpy()
+    )
+    return pd.DataFrame(valores, index=pd.Index(maquinas, name="Máquina"), columns=columnas(dias))
+
+
+def cambios(original, editada, fechas, dias, semana_txt, iso_year, iso_week):
+    a = original.to_numpy(dtype=float)
+    b = editada.reindex(index=original.index, columns=original.columns).astype(float).fillna(0.0).to_numpy()
+    filas, cols = np.nonzero(~np.isclose(a, b))
+
+    maquinas = original.index
+    cambios_ventas, cambios_egresos = [], []
+    for fila, col in zip(filas, cols):
+        d = col // 2
+        registro = (
+            semana_txt, str(fechas[d]), maquinas[fila], dias[d],
+            float(b[fila, 2 * d]), float(b[fila, 2 * d + 1]), int(iso_year), int(iso_week),
+        )
+        (cambios_ventas if col % 2 == 0 else cambios_egresos).append(registro)
+    return cambios_ventas, cambios_egresos
+
+
+COLUMNAS_ROTACION = ["producto", "cantidad", "costo_compra", "unidad_compra", "unidades_por_paquete"]
+
+
+def cambios_rotacion(original, editada):
+    # original/editada indexadas por rowid; editada trae además la columna booleana "quitar".
+    # Devuelve (filas editadas con sus valores nuevos y costo anterior, filas a borrar).
+    quitar = editada["quitar"].fillna(False).astype(bool)
+    borradas = original.loc[quitar[quitar].index]
+
+    antes = original.loc[~quitar, COLUMNAS_ROTACION]
+    despues = editada.loc[~quitar, COLUMNAS_ROTACION]
+    distinto = ~((antes == despues) | (antes.isna() & despues.isna())).all(axis=1)
+    editadas = despues[distinto].copy()
+    editadas["producto"] = editadas["producto"].fillna("").astype(str).str.strip()
+    editadas["maquina"] = original.loc[editadas.index, "maquina"]
+    editadas["fecha"] = original.loc[editadas.index, "fecha"]
+    editadas["costo_anterior"] = original.loc[editadas.index, "costo_compra"].astype(float).fillna(0.0)
+    return editadas, borradas
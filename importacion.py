@@ -0,0 +1,374 @@
+import itertools
+import sqlite3
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from costos import UNIDADES_POR_PAQUETE, precio_unitario
+from escritor import escritor as escritor_app
+from operaciones import DIAS
+
+# Importación masiva de archivos de ventas (resumen_semanal) y de productos vendidos
+# (rotacion_producto) que descargan las máquinas. El archivo se lee por lotes (CSV con
+# pandas, XLSX con openpyxl en modo solo lectura) y cada lote se valida por columnas:
+# máquinas contra la tabla maquina, fechas, montos y cantidades. Las columnas de pocos
+# valores distintos (máquina, fecha, unidad) se normalizan sobre sus valores únicos y se
+# expanden con un take. Cada lote se escribe con executemany a una tabla temporal y de ahí con
+# un único INSERT ... SELECT, en un solo trabajo del escritor (una transacción) mientras se
+# prepara el siguiente. Las claves que ya existen se omiten ((maquina, fecha) en ventas,
+# (maquina, fecha, producto) en rotación), salvo los días que solo tienen egresos (compras de
+# Rotación sin ventas), que reciben las ventas importadas. Reimportar un archivo, entero o tras
+# un corte a mitad de camino, no duplica nada.
+
+LOTE = 100_000
+TIPOS = ("ventas", "rotacion")
+UNIDADES = ("unidad", "docena", "paquete")
+MUESTRAS = 20
+
+# Encabezados aceptados (ya normalizados: minúsculas, sin tildes, "_" en lugar de espacios)
+ALIAS = {
+    "maquina": "maquina", "nombre_maquina": "maquina", "equipo": "maquina",
+    "fecha": "fecha", "dia_venta": "fecha",
+    "ventas": "ventas", "venta": "ventas", "monto": "ventas", "total_ventas": "ventas",
+    "egresos": "egresos", "egreso": "egresos", "gastos": "egresos",
+    "producto": "producto",
+    "cantidad": "cantidad", "cantidad_vendida": "cantidad", "unidades_vendidas": "cantidad",
+    "costo_compra": "costo_compra", "costo": "costo_compra", "costo_total": "costo_compra",
+    "unidad_compra": "unidad_compra", "unidad": "unidad_compra",
+    "unidades_por_paquete": "unidades_por_paquete",
+}
+
+REQUERIDAS = {
+    "ventas": ["maquina", "fecha", "ventas"],
+    "rotacion": ["maquina", "fecha", "producto", "cantidad", "costo_compra"],
+}
+
+_COLUMNAS_VENTAS = "semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week"
+
+# Las ventas nuevas se insertan; un día existente sin ventas (fila solo de egreso creada por
+# sumar_egresos) se completa con las importadas. Un día que ya tiene ventas es un duplicado y
+# no cuenta en rowcount. "WHERE true" evita que SQLite lea el ON CONFLICT como un JOIN.
+_UPSERT_VENTAS_IMPORTADAS = f"""
+    INSERT INTO resumen_semanal ({_COLUMNAS_VENTAS})
+    SELECT {_COLUMNAS_VENTAS} FROM temp.importacion_ventas WHERE true
+    ON CONFLICT (maquina, fecha) DO UPDATE SET ventas = excluded.ventas, egresos = COALESCE(egresos, excluded.egresos)
+    WHERE COALESCE(ventas, 0) = 0
+"""
+
+_COLUMNAS_ROTACION = (
+    "semana, fecha, maquina, producto, cantidad, precio_unitario, costo_compra, "
+    "unidad_compra, unidades_por_paquete, iso_year, iso_week"
+)
+
+# Días nuevos con la etiqueta de Control Ventas ("Semana N-AAAA"), la misma que usa la importación de ventas
+_SUMAR_EGRESOS_IMPORTADOS = """
+    INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, egreso_auto, iso_year, iso_week)
+    SELECT 'Semana ' || iso_week || '-' || iso_year, fecha, maquina, dia, 0, SUM(costo_compra), 1, iso_year, iso_week
+    FROM temp.importacion_rotacion
+    GROUP BY maquina, fecha
+    ORDER BY maquina, fecha
+    ON CONFLICT (maquina, fecha) DO UPDATE SET egresos = MAX(0, COALESCE(egresos, 0) + excluded.egresos)
+"""
+
+
+def clave_nombre(texto):
+    # "Máquina " -> "maquina"; sirve para encabezados y nombres de máquina
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    return "_".join(texto.casefold().split())
+
+
+def _por_unicos(serie, fn):
+    # Aplica fn a los valores distintos y expande con los códigos (los nulos quedan en None)
+    codigos, unicos = pd.factorize(serie)
+    valores = np.array([fn(v) for v in unicos] + [None], dtype=object)
+    return pd.Series(valores[codigos], index=serie.index)
+
+
+def _fechas(serie):
+    def convertir(valor):
+        if isinstance(valor, str):
+            valor = valor.strip()
+            for formato in ("ISO8601", "%d/%m/%Y", "%d-%m-%Y"):
+                fecha = pd.to_datetime(valor, format=formato, errors="coerce")
+                if not pd.isna(fecha):
+                    return fecha.normalize()
+            return None
+        fecha = pd.to_datetime(valor, errors="coerce")
+        return None if pd.isna(fecha) else fecha.normalize()
+    return pd.to_datetime(_por_unicos(serie, convertir))
+
+
+def _numeros(serie):
+    # Montos como los escribe un operador o una planilla: "$ 12.500", "1.200,50", 12500.0.
+    # En el texto, un punto o coma seguido de exactamente tres dígitos es separador de miles
+    # (pesos sin decimales); la coma restante es decimal. Las celdas numéricas de Excel pasan tal cual.
+    if serie.dtype == object:
+        es_texto = serie.map(lambda x: isinstance(x, str))
+        valores = pd.to_numeric(serie.where(~es_texto), errors="coerce").astype(float)
+        texto = serie.where(es_texto).astype("str")
+    else:
+        valores = pd.Series(np.nan, index=serie.index)
+        texto = serie.astype("str")
+    # Solo se limpia lo que no es ya un entero simple (el caso común en descargas de máquina)
+    simple = texto.str.fullmatch(r"-?\d+")
+    valores = valores.fillna(pd.to_numeric(texto.where(simple), errors="coerce"))
+    sucio = texto[~simple.fillna(False).astype(bool) & texto.notna()]
+    if len(sucio):
+        limpio = (
+            sucio.str.replace(r"[$\s]", "", regex=True)
+            .str.replace(r"[.,](?=\d{3}(?:[.,]|$))", "", regex=True)
+            .str.replace(",", ".", regex=False)
+        )
+        valores = valores.fillna(pd.to_numeric(limpio, errors="coerce"))
+    return valores
+
+
+def normalizar_columnas(df):
+    df = df.rename(columns=lambda c: ALIAS.get(clave_nombre(c), clave_nombre(c)))
+    return df.loc[:, ~df.columns.duplicated()]
+
+
+def detectar_tipo(columnas):
+    return "rotacion" if "producto" in columnas else "ventas"
+
+
+def preparar(df, tipo, maquinas):
+    # df: lote crudo con encabezados ya normalizados; maquinas: {clave: nombre en la tabla maquina}.
+    # Devuelve (filas válidas listas para escribir, {motivo: filas rechazadas}, filas repetidas
+    # dentro del lote, muestra de rechazadas con su motivo).
+    faltan = [c for c in REQUERIDAS[tipo] if c not in df.columns]
+    if faltan:
+        raise ValueError(f"Faltan columnas para importar {tipo}: {', '.join(faltan)}")
+
+    datos = pd.DataFrame(index=df.index)
+    motivo = pd.Series(None, index=df.index, dtype=object)
+
+    def rechazar(mascara, texto):
+        motivo[mascara & motivo.isna()] = texto
+
+    datos["maquina"] = _por_unicos(df["maquina"], lambda v: maquinas.get(clave_nombre(v)))
+    rechazar(datos["maquina"].isna(), "máquina desconocida")
+    fechas = _fechas(df["fecha"])
+    rechazar(fechas.isna(), "fecha inválida")
+
+    if tipo == "ventas":
+        datos["ventas"] = _numeros(df["ventas"])
+        datos["egresos"] = _numeros(df["egresos"]).fillna(0.0) if "egresos" in df.columns else 0.0
+        rechazar(datos["ventas"].isna() | (datos["ventas"] < 0) | (datos["egresos"] < 0), "monto inválido")
+        clave = ["maquina", "fecha"]
+    else:
+        datos["producto"] = _por_unicos(df["producto"], lambda v: str(v).strip() or None)
+        rechazar(datos["producto"].isna(), "producto vacío")
+        datos["cantidad"] = _numeros(df["cantidad"])
+        datos["costo_compra"] = _numeros(df["costo_compra"])
+        # Mismas reglas que el formulario "Registrar producto vendido"
+        rechazar(
+            datos["cantidad"].isna() | (datos["cantidad"] <= 0) | (datos["cantidad"] % 1 != 0)
+            | datos["costo_compra"].isna() | (datos["costo_compra"] <= 0),
+            "cantidad o costo inválidos",
+        )
+        if "unidad_compra" in df.columns:
+            datos["unidad_compra"] = _por_unicos(df["unidad_compra"], lambda v: clave_nombre(v) or "unidad")
+            datos["unidad_compra"] = datos["unidad_compra"].fillna("unidad")
+        else:
+            datos["unidad_compra"] = "unidad"
+        rechazar(~datos["unidad_compra"].isin(UNIDADES), "unidad de compra inválida")
+        if "unidades_por_paquete" in df.columns:
+            datos["unidades_por_paquete"] = _numeros(df["unidades_por_paquete"]).fillna(UNIDADES_POR_PAQUETE)
+        else:
+            datos["unidades_por_paquete"] = float(UNIDADES_POR_PAQUETE)
+        rechazar((datos["unidades_por_paquete"] < 1) | (datos["unidades_por_paquete"] % 1 != 0), "unidades por paquete inválidas")
+        clave = ["maquina", "fecha", "producto"]
+
+    validas = motivo.isna()
+    muestra = df.loc[~validas].head(MUESTRAS).assign(motivo=motivo[~validas].head(MUESTRAS))
+    rechazos = motivo[~validas].value_counts().to_dict()
+
+    datos, fechas = datos[validas], fechas[validas]
+    iso = fechas.dt.isocalendar()
+    datos["iso_year"] = iso["year"].astype("int64")
+    datos["iso_week"] = iso["week"].astype("int64")
+    datos["dia"] = np.asarray(DIAS, dtype=object)[fechas.dt.weekday.to_numpy()]
+    datos["fecha"] = _por_unicos(fechas, lambda f: f.date().isoformat())
+    if tipo == "ventas":
+        # Etiqueta de Control Ventas ("Semana N-AAAA")
+        datos["semana"] = "Semana " + datos["iso_week"].astype(str) + "-" + datos["iso_year"].astype(str)
+    else:
+        # Etiqueta del formulario de Rotación (solo el número de semana)
+        datos["semana"] = datos["iso_week"].astype(str)
+        datos["cantidad"] = datos["cantidad"].astype("int64")
+        datos["unidades_por_paquete"] = datos["unidades_por_paquete"].astype("int64")
+        datos["precio_unitario"] = precio_unitario(datos["costo_compra"], datos["unidad_compra"], datos["unidades_por_paquete"])
+
+    # Repetidas dentro del archivo: se conserva la primera
+    repetidas = datos.duplicated(clave)
+    return datos[~repetidas], rechazos, int(repetidas.sum()), muestra
+
+
+def _filas(df, columnas):
+    return list(zip(*(df[c].tolist() for c in columnas)))
+
+
+def _preparar_temporal(tx, nombre, columnas, datos):
+    tx.execute(f"CREATE TEMP TABLE IF NOT EXISTS {nombre} ({columnas})")
+    tx.execute(f"DELETE FROM temp.{nombre}")
+    tx.executemany(
+        f"INSERT INTO temp.{nombre} ({columnas}) VALUES ({', '.join('?' * len(columnas.split(',')))})",
+        _filas(datos, [c.strip() for c in columnas.split(",")]),
+    )
+
+
+def escribir_ventas(tx, datos):
+    # El lote pasa por una tabla temporal y se escribe en bloque contra el índice único
+    # (maquina, fecha); los triggers mantienen totales y marcas de snapshot
+    _preparar_temporal(tx, "importacion_ventas", _COLUMNAS_VENTAS, datos)
+    insertadas = tx.execute(_UPSERT_VENTAS_IMPORTADAS).rowcount
+    tx.execute("DELETE FROM temp.importacion_ventas")
+    return insertadas
+
+
+def escribir_rotacion(tx, datos):
+    # rotacion_producto no tiene índice único: el lote pasa por una tabla temporal y se insertan
+    # solo las filas sin (maquina, fecha, producto) previo (búsqueda por idx_rotacion_iso).
+    _preparar_temporal(tx, "importacion_rotacion", _COLUMNAS_ROTACION + ", dia", datos)
+    tx.execute("""
+        DELETE FROM temp.importacion_rotacion WHERE EXISTS (
+            SELECT 1 FROM rotacion_producto r
+            WHERE r.iso_year = importacion_rotacion.iso_year AND r.iso_week = importacion_rotacion.iso_week
+              AND r.maquina = importacion_rotacion.maquina AND r.fecha = importacion_rotacion.fecha
+              AND r.producto = importacion_rotacion.producto
+        )
+    """)
+    insertadas = tx.execute(
+        f"INSERT INTO rotacion_producto ({_COLUMNAS_ROTACION}) SELECT {_COLUMNAS_ROTACION} FROM temp.importacion_rotacion"
+    ).rowcount
+    tx.execute("INSERT OR IGNORE INTO producto_catalog (producto) SELECT DISTINCT producto FROM temp.importacion_rotacion")
+    # El costo de lo insertado se suma al egreso del día como en sumar_egresos (los costos
+    # importados son siempre positivos), pero con un único UPSERT por conjuntos
+    tx.execute(_SUMAR_EGRESOS_IMPORTADOS)
+    tx.execute("DELETE FROM temp.importacion_rotacion")
+    return insertadas
+
+
+def _separador(encabezado):
+    # Descargas de máquina y planillas regionales usan "," o ";": gana el que más aparece en el encabezado
+    return max(",;\t|", key=encabezado.count)
+
+
+def leer_lotes(archivo, lote=LOTE, nombre=None):
+    # archivo: ruta o archivo binario (p. ej. el de st.file_uploader). Produce DataFrames de
+    # hasta `lote` filas con los valores crudos: texto en CSV, tipos de celda en XLSX.
+    nombre = (nombre or getattr(archivo, "name", None) or str(archivo)).lower()
+    if nombre.endswith((".xlsx", ".xlsm")):
+        import openpyxl
+
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezado = next(filas, None)
+            if encabezado is None:
+                return
+            encabezado = [str(c) if c is not None else f"columna_{i}" for i, c in enumerate(encabezado)]
+            while True:
+                bloque = list(itertools.islice(filas, lote))
+                if not bloque:
+                    break
+                yield pd.DataFrame(bloque, columns=encabezado, dtype=object)
+        finally:
+            libro.close()
+        return
+
+    if isinstance(archivo, str) or hasattr(archivo, "__fspath__"):
+        with open(archivo, "rb") as f:
+            encabezado = f.readline()
+    else:
+        encabezado = archivo.readline()
+        archivo.seek(0)
+    lector = pd.read_csv(
+        archivo, sep=_separador(encabezado.decode("utf-8-sig", errors="replace")), dtype=str, keep_default_na=False, na_values=[""],
+        chunksize=lote, encoding="utf-8-sig", skipinitialspace=True,
+    )
+    with lector:
+        yield from lector
+
+
+def importar(archivo, tipo=None, lote=LOTE, escritor=None, progreso=None, nombre=None):
+    # Importa el archivo completo y devuelve el resumen. Cada lote es un trabajo del escritor
+    # (su propia transacción); un error detiene la importación con los lotes anteriores ya
+    # confirmados: como las claves existentes se omiten, basta con volver a importar el archivo.
+    escritor = escritor or escritor_app
+    if tipo is not None and tipo not in TIPOS:
+        raise ValueError(f"Tipo de importación desconocido: {tipo} (usa {', '.join(TIPOS)})")
+    inicio = time.perf_counter()
+    # Lectura aparte (no como trabajo del escritor, que subiría la versión de datos)
+    conn = sqlite3.connect(escritor.ruta, timeout=30)
+    try:
+        maquinas = {clave_nombre(n): n for (n,) in conn.execute("SELECT nombre_maquina FROM maquina")}
+    finally:
+        conn.close()
+    resumen = {"tipo": tipo, "leidas": 0, "insertadas": 0, "duplicadas": 0, "rechazadas": {}, "muestra": [], "segundos": 0.0}
+    pendiente = None
+
+    def recibir(futuro, enviadas):
+        insertadas = futuro.result()
+        resumen["insertadas"] += insertadas
+        resumen["duplicadas"] += enviadas - insertadas
+        if progreso:
+            progreso(resumen["leidas"], resumen["insertadas"])
+
+    for crudo in leer_lotes(archivo, lote, nombre):
+        # Filas totalmente vacías (las del final de una planilla) no cuentan como leídas
+        crudo = normalizar_columnas(crudo).dropna(how="all")
+        if resumen["tipo"] is None:
+            resumen["tipo"] = detectar_tipo(crudo.columns)
+        datos, rechazos, repetidas, muestra = preparar(crudo, resumen["tipo"], maquinas)
+        resumen["leidas"] += len(crudo)
+        resumen["duplicadas"] += repetidas
+        for motivo, n in rechazos.items():
+            resumen["rechazadas"][motivo] = resumen["rechazadas"].get(motivo, 0) + n
+        if len(resumen["muestra"]) < MUESTRAS:
+            resumen["muestra"].extend(muestra.to_dict("records")[:MUESTRAS - len(resumen["muestra"])])
+        # El lote anterior termina de escribirse mientras se preparaba este
+        if pendiente is not None:
+            recibir(*pendiente)
+        fn = escribir_ventas if resumen["tipo"] == "ventas" else escribir_rotacion
+        pendiente = (escritor.enviar(lambda tx, fn=fn, datos=datos: fn(tx, datos)), len(datos)) if len(datos) else None
+    if pendiente is not None:
+        recibir(*pendiente)
+    resumen["segundos"] = time.perf_counter() - inicio
+    return resumen
+
+
+# Uso fuera de la app:
+#   python importacion.py archivo.csv|archivo.xlsx [--tipo ventas|rotacion] [--lote 100000] [--db ruta]
+if __name__ == "__main__":
+    import sys
+
+    from conexion import DB_PATH
+    from escritor import Escritor
+    from migraciones import aplicar_migraciones
+
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        sys.exit("Uso: python importacion.py archivo.csv|archivo.xlsx [--tipo ventas|rotacion] [--lote 100000] [--db ruta]")
+    ruta = args[args.index("--db") + 1] if "--db" in args else DB_PATH
+    tipo = args[args.index("--tipo") + 1] if "--tipo" in args else None
+    lote = int(args[args.index("--lote") + 1]) if "--lote" in args else LOTE
+
+    conn = sqlite3.connect(ruta, timeout=30)
+    aplicar_migraciones(conn)
+    conn.close()
+
+    def _progreso(leidas, insertadas):
+        print(f"\r  {leidas:,} filas leídas, {insertadas:,} insertadas", end="", flush=True)
+
+    resumen = importar(args[0], tipo, lote, Escritor(ruta), _progreso)
+    print()
+    print(f"Tipo: {resumen['tipo']} · {resumen['leidas']:,} leídas · {resumen['insertadas']:,} insertadas · "
+          f"{resumen['duplicadas']:,} duplicadas omitidas ({resumen['segundos']:.1f}s)")
+    for motivo, n in resumen["rechazadas"].items():
+        print(f"  rechazadas por {motivo}: {n:,}")
+    for fila in resumen["muestra"][:5]:
+        print(f"    {fila}")
@@ -0,0 +1,463 @@
+import asyncio
+import json
+import os
+import signal
+import sqlite3
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from conexion import DB_PATH
+from escritor import Escritor
+from importacion import clave_nombre
+from operaciones import sumar_vendidos, sumar_ventas
+
+# Servicio de ingesta de telemetría (asyncio, HTTP/1.1 keep-alive). Las máquinas (o un simulador)
+# envían eventos de venta por POST /eventos; cada evento aceptado se agrega a un diario en disco
+# (fsync agrupado) antes de responder, y queda en memoria hasta el próximo volcado. El volcado
+# sella el segmento del diario y aplica todos sus eventos, ya acumulados por celda, en un solo
+# trabajo del escritor: ventas del día en resumen_semanal y cantidades en rotacion_producto.
+# El segmento se registra en ingesta_segmento en esa misma transacción y se borra después del
+# COMMIT; al arrancar se reaplican los segmentos que quedaron en disco y los ya registrados se
+# omiten: tras una caída no se pierde ningún evento confirmado al cliente ni se suma dos veces
+# un segmento. El registro de un segmento se olvida recién cuando su archivo ya no está en
+# disco. Un volcado fallido se reintenta desde el segmento sellado en el siguiente ciclo. Con
+# demasiados eventos sin confirmar los POST esperan y, si no se libera espacio, reciben 503
+# con Retry-After.
+#
+# Evento: {"maquina": "Norte", "producto": "Papas", "cantidad": 2, "monto": 3000, "fecha": "2025-10-06"}
+#   producto y monto son opcionales (al menos uno); cantidad = 1 y fecha = hoy por defecto ("ts"
+#   ISO también vale). El cuerpo puede ser un evento, una lista o NDJSON.
+#
+#   python ingesta.py [--host 127.0.0.1] [--puerto 8503] [--db ruta] [--diario carpeta]
+
+DIARIO = os.environ.get("PUNTO_EXPRESS_INGESTA", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "ingesta"))
+FSYNC = os.environ.get("PUNTO_EXPRESS_INGESTA_FSYNC", "1") != "0"
+INTERVALO_VOLCADO = 0.5
+EVENTOS_VOLCADO = 20_000        # volcado anticipado al juntar esta cantidad
+MAX_PENDIENTES = 200_000        # eventos aceptados aún sin COMMIT antes de aplicar contrapresión
+ESPERA_ESPACIO = 5.0
+MAX_CUERPO = 8 * 1024 * 1024
+REFRESCO_MAQUINAS = 30.0
+
+
+class EventoInvalido(ValueError):
+    pass
+
+
+def aplicar_segmento(tx, segmento, eventos, borrados=()):
+    # Trabajo del escritor: eventos (maquina, fecha, producto, cantidad, monto) ya validados.
+    # borrados: segmentos cuyo archivo ya se borró del diario; su registro ya no hace falta.
+    tx.executemany("DELETE FROM ingesta_segmento WHERE segmento = ?", [(b,) for b in borrados])
+    if tx.execute("SELECT 1 FROM ingesta_segmento WHERE segmento = ?", (segmento,)).fetchone():
+        return 0
+    ventas, vendidos = {}, {}
+    for maquina, fecha, producto, cantidad, monto in eventos:
+        if monto:
+            ventas[(maquina, fecha)] = ventas.get((maquina, fecha), 0.0) + monto
+        if producto:
+            vendidos[(maquina, fecha, producto)] = vendidos.get((maquina, fecha, producto), 0) + cantidad
+    sumar_ventas(tx, ventas)
+    sumar_vendidos(tx, vendidos)
+    tx.execute("INSERT INTO ingesta_segmento (segmento, eventos) VALUES (?, ?)", (segmento, len(eventos)))
+    return len(eventos)
+
+
+class Diario:
+    # Segmentos NDJSON: "<id>.abierto" recibe escrituras; al sellarse pasa a "<id>.sellado" y se
+    # borra cuando sus eventos están confirmados en la base. Todo fsync/cierre corre en un único
+    # hilo, en orden: un fsync pedido antes de sellar nunca encuentra el archivo ya cerrado.
+    def __init__(self, carpeta, fsync=FSYNC):
+        self.carpeta = carpeta
+        self.fsync = fsync
+        self._disco = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingesta-diario")
+        os.makedirs(carpeta, exist_ok=True)
+        self._abrir()
+
+    def _ruta(self, segmento, estado):
+        return os.path.join(self.carpeta, f"{segmento}.{estado}")
+
+    def _abrir(self):
+        # El id ordena los segmentos en el tiempo y no se repite entre reinicios
+        self.segmento = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        self.archivo = open(self._ruta(self.segmento, "abierto"), "ab", buffering=0)
+
+    def anteriores(self):
+        # Segmentos de una ejecución previa (sellados o abiertos al caer), en orden
+        return sorted(
+            nombre.rsplit(".", 1) for nombre in os.listdir(self.carpeta)
+            if nombre.endswith((".abierto", ".sellado")) and not nombre.startswith(self.segmento)
+        )
+
+    def leer(self, segmento, estado):
+        eventos = []
+        with open(self._ruta(segmento, estado), "rb") as f:
+            for linea in f:
+                try:
+                    eventos.append(tuple(json.loads(linea)))
+                except ValueError:
+                    break           # última línea cortada por la caída: nunca se confirmó
+        return eventos
+
+    def escribir(self, eventos):
+        self.archivo.write(b"".join(json.dumps(e, ensure_ascii=False).encode() + b"\n" for e in eventos))
+
+    def sincronizar(self):
+        # Futuro de asyncio que se cumple cuando lo escrito hasta ahora está en disco
+        return asyncio.wrap_future(self._disco.submit(os.fsync if self.fsync else int, self.archivo.fileno()))
+
+    def sellar(self):
+        # Cambia de segmento de inmediato (en el hilo del loop) y devuelve (id, futuro del sellado)
+        segmento, archivo = self.segmento, self.archivo
+        self._abrir()
+
+        def cerrar():
+            if self.fsync:
+                os.fsync(archivo.fileno())
+            archivo.close()
+            os.replace(self._ruta(segmento, "abierto"), self._ruta(segmento, "sellado"))
+        return segmento, asyncio.wrap_future(self._disco.submit(cerrar))
+
+    def descartar(self, segmento, estado="sellado"):
+        # Futuro que se cumple cuando el borrado es durable (fsync de la carpeta): recién entonces
+        # se puede olvidar el registro del segmento sin riesgo de que reaparezca tras una caída
+        def borrar():
+            os.remove(self._ruta(segmento, estado))
+            if self.fsync:
+                carpeta = os.open(self.carpeta, os.O_RDONLY)
+                try:
+                    os.fsync(carpeta)
+                finally:
+                    os.close(carpeta)
+        return asyncio.wrap_future(self._disco.submit(borrar))
+
+    def cerrar(self):
+        self._disco.submit(self.archivo.close).result()
+        self._disco.shutdown()
+        if os.path.getsize(self._ruta(self.segmento, "abierto")) == 0:
+            os.remove(self._ruta(self.segmento, "abierto"))
+
+
+class ServicioIngesta:
+    def __init__(self, ruta=DB_PATH, carpeta=DIARIO, escritor=None):
+        self.ruta = ruta
+        self.carpeta = carpeta
+        self.escritor = escritor or Escritor(ruta)
+        self.diario = None
+        self._maquinas = {}
+        self._nombres = {}                # nombre tal como llega -> nombre en la tabla maquina
+        self._maquinas_en = 0.0
+        self._buffer = []
+        self._escritos = 0                # escrituras al diario y hasta cuál está en disco
+        self._sincronizado = 0
+        self._fsync = None                # fsync agrupado en curso
+        self._parar = False
+        self.pendientes = 0               # aceptados aún sin COMMIT (buffer + volcado en curso o fallido)
+        self._reintentos = deque()        # (segmento sellado, eventos) cuyo volcado falló
+        self._borrados = []               # segmentos ya borrados del diario, a olvidar en ingesta_segmento
+        self._lleno = None
+        self._espacio = None
+        self._volcados = deque(maxlen=500)
+        self.recibidos = 0
+        self.aceptados = 0
+        self.rechazados = 0
+        self.confirmados = 0
+        self.lotes = 0
+        self.rechazos_503 = 0
+
+    # --- Validación ---
+    def _cargar_maquinas(self):
+        conn = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            self._maquinas = {clave_nombre(n): n for (n,) in conn.execute("SELECT nombre_maquina FROM maquina")}
+        finally:
+            conn.close()
+        self._nombres = {}
+        self._maquinas_en = time.monotonic()
+
+    def _maquina(self, nombre):
+        if nombre in self._nombres:
+            return self._nombres[nombre]
+        clave = clave_nombre(nombre)
+        if clave not in self._maquinas and time.monotonic() - self._maquinas_en > REFRESCO_MAQUINAS:
+            # Una máquina dada de alta en la app se reconoce sin reiniciar el servicio
+            self._cargar_maquinas()
+        maquina = self._maquinas.get(clave)
+        if maquina is not None:
+            self._nombres[nombre] = maquina
+        return maquina
+
+    def normalizar(self, evento, hoy):
+        if not isinstance(evento, dict):
+            raise EventoInvalido("el evento debe ser un objeto JSON")
+        nombre = evento.get("maquina")
+        maquina = self._maquina(nombre) if isinstance(nombre, str) else None
+        if maquina is None:
+            raise EventoInvalido(f"máquina desconocida: {evento.get('maquina')!r}")
+        fecha = str(evento.get("fecha") or evento.get("ts") or hoy.isoformat())[:10]
+        try:
+            dia = date.fromisoformat(fecha)
+        except ValueError:
+            raise EventoInvalido(f"fecha inválida: {fecha!r}")
+        if dia > hoy + timedelta(days=1):
+            raise EventoInvalido(f"fecha futura: {fecha}")
+        producto = evento.get("producto")
+        producto = str(producto).strip() if producto is not None else ""
+        cantidad, monto = evento.get("cantidad", 1), evento.get("monto", 0)
+        if isinstance(cantidad, bool) or not isinstance(cantidad, int) or cantidad < 1:
+            raise EventoInvalido("cantidad debe ser un entero mayor a cero")
+        if isinstance(monto, bool) or not isinstance(monto, (int, float)) or not 0 <= monto < 1e12:
+            raise EventoInvalido("monto inválido")
+        if not producto and not monto:
+            raise EventoInvalido("el evento no trae producto ni monto")
+        return maquina, dia.isoformat(), producto, cantidad, monto
+
+    # --- Recepción ---
+    async def recibir(self, eventos):
+        # Devuelve (estado HTTP, respuesta). Responde recién cuando los aceptados están en el diario.
+        hoy = date.today()
+        aceptados, rechazos = [], []
+        for i, evento in enumerate(eventos):
+            try:
+                aceptados.append(self.normalizar(evento, hoy))
+            except EventoInvalido as e:
+                rechazos.append({"indice": i, "error": str(e)})
+        self.recibidos += len(eventos)
+        self.rechazados += len(rechazos)
+        if not aceptados:
+            return 422 if rechazos else 400, {"aceptados": 0, "rechazados": rechazos[:20]}
+
+        if self.pendientes + len(aceptados) > MAX_PENDIENTES:
+            limite = time.monotonic() + ESPERA_ESPACIO
+            async with self._espacio:
+                while self.pendientes + len(aceptados) > MAX_PENDIENTES:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self.rechazos_503 += 1
+                        return 503, {"error": "Servicio saturado, reintentar", "pendientes": self.pendientes}
+                    try:
+                        await asyncio.wait_for(self._espacio.wait(), restante)
+                    except asyncio.TimeoutError:
+                        pass
+
+        self.diario.escribir(aceptados)
+        self._escritos += 1
+        marca = self._escritos
+        self._buffer.extend(aceptados)
+        self.pendientes += len(aceptados)
+        self.aceptados += len(aceptados)
+        if len(self._buffer) >= EVENTOS_VOLCADO:
+            self._lleno.set()
+        # fsync agrupado: las solicitudes que llegan mientras corre uno esperan al siguiente
+        while self._sincronizado < marca:
+            if self._fsync is None:
+                self._fsync = asyncio.ensure_future(self._sincronizar())
+            await asyncio.shield(self._fsync)
+        return 202, {"aceptados": len(aceptados), "rechazados": rechazos[:20]}
+
+    async def _sincronizar(self):
+        marca = self._escritos
+        try:
+            await self.diario.sincronizar()
+            self._sincronizado = max(self._sincronizado, marca)
+        finally:
+            self._fsync = None
+
+    # --- Volcado ---
+    async def _aplicar(self, segmento, eventos):
+        inicio = time.perf_counter()
+        borrados, self._borrados = self._borrados, []
+        try:
+            await asyncio.wrap_future(self.escritor.enviar(lambda tx: aplicar_segmento(tx, segmento, eventos, borrados)))
+        except BaseException:
+            self._borrados = borrados + self._borrados
+            raise
+        self._volcados.append((len(eventos), (time.perf_counter() - inicio) * 1000))
+        self.lotes += 1
+        self.confirmados += len(eventos)
+
+    async def _confirmar(self, segmento, eventos):
+        await self._aplicar(segmento, eventos)
+        await self.diario.descartar(segmento)
+        self._borrados.append(segmento)
+        self.pendientes -= len(eventos)
+        async with self._espacio:
+            self._espacio.notify_all()
+
+    async def volcar(self):
+        # Primero los volcados fallidos, en orden: un segmento ya registrado no se suma dos veces
+        while self._reintentos:
+            await self._confirmar(*self._reintentos[0])
+            self._reintentos.popleft()
+        if not self._buffer:
+            return
+        eventos, self._buffer = self._buffer, []
+        self._lleno.clear()
+        segmento, sellado = self.diario.sellar()
+        await sellado
+        try:
+            await self._confirmar(segmento, eventos)
+        except BaseException:
+            # Los eventos siguen contando como pendientes (contrapresión) hasta que el reintento confirme
+            self._reintentos.append((segmento, eventos))
+            raise
+
+    async def _bucle_volcado(self):
+        while not self._parar:
+            try:
+                await asyncio.wait_for(self._lleno.wait(), INTERVALO_VOLCADO)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.volcar()
+            except Exception as e:
+                # Los eventos siguen en el segmento sellado; se reintenta en el próximo ciclo
+                print(f"[ingesta] volcado fallido: {e}", flush=True)
+                await asyncio.sleep(INTERVALO_VOLCADO)
+
+    async def recuperar(self):
+        # Reaplica lo que quedó en disco de una ejecución anterior; devuelve los eventos leídos
+        total = 0
+        for segmento, estado in self.diario.anteriores():
+            eventos = self.diario.leer(segmento, estado)
+            if eventos:
+                await self._aplicar(segmento, eventos)
+                total += len(eventos)
+            await self.diario.descartar(segmento, estado)
+            self._borrados.append(segmento)
+        return total
+
+    async def iniciar(self):
+        self._lleno = asyncio.Event()
+        self._espacio = asyncio.Condition()
+        self._cargar_maquinas()
+        self.diario = Diario(self.carpeta)
+        recuperados = await self.recuperar()
+        self._tarea_volcado = asyncio.create_task(self._bucle_volcado())
+        return recuperados
+
+    async def detener(self):
+        # Termina el volcado en curso y confirma lo que quedaba en memoria
+        self._parar = True
+        self._lleno.set()
+        await self._tarea_volcado
+        await self.volcar()
+        self.diario.cerrar()
+
+    def estado(self):
+        volcados = list(self._volcados)
+        tiempos = sorted(ms for _, ms in volcados)
+        return {
+            "recibidos": self.recibidos,
+            "aceptados": self.aceptados,
+            "rechazados": self.rechazados,
+            "confirmados": self.confirmados,
+            "pendientes": self.pendientes,
+            "en_memoria": len(self._buffer),
+            "lotes": self.lotes,
+            "eventos_por_lote": sum(n for n, _ in volcados) / len(volcados) if volcados else 0.0,
+            "volcado_p50_ms": tiempos[len(tiempos) // 2] if tiempos else 0.0,
+            "volcado_p95_ms": tiempos[int(len(tiempos) * 0.95)] if tiempos else 0.0,
+            "respuestas_503": self.rechazos_503,
+            "escritor": self.escritor.metricas(),
+        }
+
+    # --- HTTP ---
+    async def _atender(self, metodo, ruta, cabeceras, cuerpo):
+        ruta = ruta.split("?", 1)[0].rstrip("/")
+        if ruta == "/estado" and metodo == "GET":
+            return 200, self.estado()
+        if ruta != "/eventos":
+            return 404, {"error": f"Ruta desconocida: {ruta}"}
+        if metodo != "POST":
+            return 405, {"error": "Usa POST"}
+        try:
+            if "ndjson" in cabeceras.get("content-type", ""):
+                eventos = [json.loads(linea) for linea in cuerpo.splitlines() if linea.strip()]
+            else:
+                eventos = json.loads(cuerpo or b"null")
+                eventos = eventos if isinstance(eventos, list) else [eventos]
+        except ValueError as e:
+            return 400, {"error": f"JSON inválido: {e}"}
+        return await self.recibir(eventos)
+
+    async def conexion(self, lector, escritor_red):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                metodo, ruta, _ = linea.decode("latin-1").split(" ", 2)
+                cabeceras = {}
+                while True:
+                    linea = await lector.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+                largo = int(cabeceras.get("content-length", 0))
+                cerrar = cabeceras.get("connection", "").lower() == "close"
+                if largo > MAX_CUERPO:
+                    estado, respuesta, cerrar = 413, {"error": "Cuerpo demasiado grande"}, True
+                else:
+                    cuerpo = await lector.readexactly(largo) if largo else b""
+                    try:
+                        estado, respuesta = await self._atender(metodo, ruta, cabeceras, cuerpo)
+                    except Exception as e:
+                        estado, respuesta = 500, {"error": f"{type(e).__name__}: {e}"}
+                datos = json.dumps(respuesta, ensure_ascii=False).encode()
+                encabezado = (
+                    f"HTTP/1.1 {estado} {_RAZONES.get(estado, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(datos)}\r\n"
+                    + ("Retry-After: 1\r\n" if estado == 503 else "")
+                    + ("Connection: close\r\n" if cerrar else "")
+                    + "\r\n"
+                )
+                escritor_red.write(encabezado.encode() + datos)
+                await escritor_red.drain()
+                if cerrar:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            escritor_red.close()
+
+
+_RAZONES = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+async def servir(host, puerto, ruta=DB_PATH, carpeta=DIARIO):
+    servicio = ServicioIngesta(ruta, carpeta)
+    recuperados = await servicio.iniciar()
+    servidor = await asyncio.start_server(servicio.conexion, host, puerto)
+    print(f"Ingesta en http://{host}:{puerto}/eventos (base: {ruta}, diario: {carpeta}, "
+          f"{recuperados:,} eventos recuperados)", flush=True)
+    fin = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(senal, fin.set)
+    async with servidor:
+        await fin.wait()
+    # Deja de aceptar y confirma lo que quedaba en memoria antes de salir
+    await servicio.detener()
+    print(f"Ingesta detenida: {servicio.confirmados:,} eventos confirmados", flush=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from migraciones import aplicar_migraciones
+
+    args = sys.argv[1:]
+    host = args[args.index("--host") + 1] if "--host" in args else "127.0.0.1"
+    puerto = int(args[args.index("--puerto") + 1]) if "--puerto" in args else 8503
+    ruta = args[args.index("--db") + 1] if "--db" in args else DB_PATH
+    carpeta = args[args.index("--diario") + 1] if "--diario" in args else DIARIO
+
+    conn = sqlite3.connect(ruta, timeout=30)
+    aplicar_migraciones(conn)
+    conn.close()
+    asyncio.run(servir(host, puerto, ruta, carpeta))
@@ -0,0 +1,447 @@
+import sqlite3
+import threading
+
+# Migraciones versionadas del esquema. Cada migración se aplica una sola vez por
+# base de datos (tabla schema_version) y una sola vez por proceso (registro en memoria),
+# de modo que los reruns de Streamlit no repiten CREATE/PRAGMA/ALTER en cada sección.
+
+MIGRACIONES = []
+
+_aplicadas = {}                 # (ruta, hasta) -> versión alcanzada en este proceso
+_lock = threading.Lock()
+
+MAQUINAS_INICIALES = ["Motomall", "Unidad", "Norte", "Buses", "Paquetex", "Dekohouse", "Caldas", "Maquina 8"]
+
+
+def migracion(version, descripcion):
+    def registrar(fn):
+        MIGRACIONES.append((version, descripcion, fn))
+        MIGRACIONES.sort(key=lambda m: m[0])
+        return fn
+    return registrar
+
+
+def _columnas(conn, tabla):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({tabla})").fetchall()]
+
+
+@migracion(1, "Tablas base y columnas agregadas históricamente")
+def _tablas_base(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_semanal (
+            semana TEXT,
+            fecha TEXT,
+            maquina TEXT,
+            dia TEXT,
+            ventas INTEGER,
+            egresos INTEGER,
+            egreso_auto INTEGER DEFAULT 0
+        )
+    """)
+    if "egreso_auto" not in _columnas(conn, "resumen_semanal"):
+        conn.execute("ALTER TABLE resumen_semanal ADD COLUMN egreso_auto INTEGER DEFAULT 0")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rotacion_producto (
+            semana TEXT,
+            fecha TEXT,
+            maquina TEXT,
+            producto TEXT,
+            cantidad INTEGER,
+            precio_unitario REAL,
+            costo_compra REAL,
+            unidad_compra TEXT,
+            unidades_por_paquete INTEGER
+        )
+    """)
+    cols = _columnas(conn, "rotacion_producto")
+    if "unidades_por_paquete" not in cols:
+        conn.execute("ALTER TABLE rotacion_producto ADD COLUMN unidades_por_paquete INTEGER")
+    if "precio_unitario" not in cols:
+        # El relleno de precio_unitario se hace por conjuntos en la migración 8
+        conn.execute("ALTER TABLE rotacion_producto ADD COLUMN precio_unitario REAL")
+
+    conn.execute("CREATE TABLE IF NOT EXISTS producto_catalog (producto TEXT PRIMARY KEY)")
+
+    conn.execute("CREATE TABLE IF NOT EXISTS maquina (nombre_maquina TEXT PRIMARY KEY)")
+    if conn.execute("SELECT COUNT(*) FROM maquina").fetchone()[0] == 0:
+        conn.executemany(
+            "INSERT OR IGNORE INTO maquina (nombre_maquina) VALUES (?)",
+            [(nombre,) for nombre in MAQUINAS_INICIALES],
+        )
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS mantenimiento (
+            fecha TEXT,
+            semana TEXT,
+            maquina TEXT,
+            tipo TEXT,
+            descripcion TEXT,
+            costo REAL
+        )
+    """)
+    if "semana" not in _columnas(conn, "mantenimiento"):
+        conn.execute("ALTER TABLE mantenimiento ADD COLUMN semana TEXT")
+
+
+@migracion(2, "Índices para búsquedas por semana, fecha y máquina")
+def _indices(conn):
+    # Cubrientes para los totales (SUM de ventas/egresos por etiqueta o rango de fechas)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumen_semana ON resumen_semanal(semana, ventas, egresos)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumen_fecha ON resumen_semanal(fecha, maquina, ventas, egresos)")
+    # Búsqueda puntual (maquina, fecha) de sincronizar_egreso_en_ventas
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumen_maquina_fecha ON resumen_semanal(maquina, fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_rotacion_semana_maquina_fecha ON rotacion_producto(semana, maquina, fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mantenimiento_maquina_semana ON mantenimiento(maquina, semana)")
+    conn.execute("ANALYZE")
+
+
+# Semana ISO calculada en SQL: el jueves de la semana de `fecha` fija el año ISO y el número de semana
+_JUEVES_SQL = "date(fecha, '-3 days', 'weekday 4')"
+ISO_AÑO_FECHA_SQL = f"CAST(strftime('%Y', {_JUEVES_SQL}) AS INTEGER)"
+ISO_SEMANA_FECHA_SQL = f"(CAST(strftime('%j', {_JUEVES_SQL}) AS INTEGER) - 1) / 7 + 1"
+
+# Etiquetas históricas: "Semana N-AAAA" (Control Ventas), "Semana N" (sincronización de egresos), "N" (Rotación/Mantenimiento)
+_ETIQUETA_SQL = "TRIM(REPLACE(COALESCE(semana, ''), 'Semana', ''))"
+_SEMANA_ETIQUETA_SQL = f"CAST({_ETIQUETA_SQL} AS INTEGER)"
+_AÑO_ETIQUETA_SQL = f"CASE WHEN {_ETIQUETA_SQL} GLOB '*-[0-9][0-9][0-9][0-9]' THEN CAST(substr({_ETIQUETA_SQL}, -4) AS INTEGER) END"
+
+
+@migracion(3, "Columnas enteras iso_year/iso_week con índice")
+def _claves_iso(conn):
+    for tabla in ("resumen_semanal", "rotacion_producto", "mantenimiento"):
+        cols = _columnas(conn, tabla)
+        if "iso_year" not in cols:
+            conn.execute(f"ALTER TABLE {tabla} ADD COLUMN iso_year INTEGER")
+        if "iso_week" not in cols:
+            conn.execute(f"ALTER TABLE {tabla} ADD COLUMN iso_week INTEGER")
+        # Se prefiere la etiqueta (semana elegida por el operador) y, si no es válida, la fecha
+        conn.execute(f"""
+            UPDATE {tabla} SET
+                iso_week = CASE WHEN {_SEMANA_ETIQUETA_SQL} BETWEEN 1 AND 53
+                                THEN {_SEMANA_ETIQUETA_SQL} ELSE {ISO_SEMANA_FECHA_SQL} END,
+                iso_year = COALESCE({_AÑO_ETIQUETA_SQL}, {ISO_AÑO_FECHA_SQL})
+            WHERE iso_year IS NULL OR iso_week IS NULL
+        """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumen_iso ON resumen_semanal(iso_year, iso_week, maquina, ventas, egresos)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_rotacion_iso ON rotacion_producto(iso_year, iso_week, maquina, fecha)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_mantenimiento_iso ON mantenimiento(maquina, iso_year, iso_week)")
+
+
+@migracion(4, "Colapsar filas duplicadas (maquina, fecha) en resumen_semanal")
+def _colapsar_duplicados(conn):
+    # Con la clave ISO las etiquetas ya no separan "Semana N" de "Semana N-AAAA"; se conserva
+    # la fila guardada por Control Ventas (etiqueta con año) y, a igualdad, la más reciente.
+    # Las descartadas se copian antes a resumen_semanal_duplicados (con su rowid original).
+    conn.execute("DROP TABLE IF EXISTS temp._descartadas")
+    conn.execute("""
+        CREATE TEMP TABLE _descartadas AS
+        SELECT rowid AS id FROM (
+            SELECT rowid, ROW_NUMBER() OVER (
+                PARTITION BY maquina, fecha
+                ORDER BY (semana GLOB '*-[0-9][0-9][0-9][0-9]') DESC, rowid DESC
+            ) AS n
+            FROM resumen_semanal
+            WHERE maquina IS NOT NULL AND fecha IS NOT NULL
+        ) WHERE n > 1
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resumen_semanal_duplicados AS
+        SELECT rowid AS rowid_original, *, datetime('now') AS descartada_en FROM resumen_semanal WHERE 0
+    """)
+    conn.execute("""
+        INSERT INTO resumen_semanal_duplicados
+        SELECT rowid, *, datetime('now') FROM resumen_semanal WHERE rowid IN (SELECT id FROM temp._descartadas)
+    """)
+    descartadas = conn.execute(
+        "DELETE FROM resumen_semanal WHERE rowid IN (SELECT id FROM temp._descartadas)"
+    ).rowcount
+    conn.execute("DROP TABLE temp._descartadas")
+    conn.execute("ANALYZE")
+    return descartadas
+
+
+def duplicados_respaldados(conn):
+    # Filas movidas a resumen_semanal_duplicados hasta ahora (0 si la migración 4 no corrió)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'resumen_semanal_duplicados'").fetchone():
+        return 0
+    return conn.execute("SELECT COUNT(*) FROM resumen_semanal_duplicados").fetchone()[0]
+
+
+_SUMAR_TOTALES_SQL = """
+    INSERT INTO weekly_machine_totals (iso_year, iso_week, maquina, ventas, egresos, neto, dias_activos, filas)
+    SELECT {f}.iso_year, {f}.iso_week, {f}.maquina,
+           COALESCE(CAST({f}.ventas AS REAL), 0), COALESCE(CAST({f}.egresos AS REAL), 0),
+           COALESCE(CAST({f}.ventas AS REAL), 0) - COALESCE(CAST({f}.egresos AS REAL), 0),
+           COALESCE({f}.ventas, 0) > 0, 1
+    WHERE {f}.iso_year IS NOT NULL AND {f}.iso_week IS NOT NULL AND {f}.maquina IS NOT NULL
+    ON CONFLICT (iso_year, iso_week, maquina) DO UPDATE SET
+        ventas = ventas + excluded.ventas,
+        egresos = egresos + excluded.egresos,
+        neto = neto + excluded.neto,
+        dias_activos = dias_activos + excluded.dias_activos,
+        filas = filas + 1;
+"""
+
+_RESTAR_TOTALES_SQL = """
+    UPDATE weekly_machine_totals SET
+        ventas = ventas - COALESCE(CAST(OLD.ventas AS REAL), 0),
+        egresos = egresos - COALESCE(CAST(OLD.egresos AS REAL), 0),
+        neto = neto - (COALESCE(CAST(OLD.ventas AS REAL), 0) - COALESCE(CAST(OLD.egresos AS REAL), 0)),
+        dias_activos = dias_activos - (COALESCE(OLD.ventas, 0) > 0),
+        filas = filas - 1
+    WHERE iso_year = OLD.iso_year AND iso_week = OLD.iso_week AND maquina = OLD.maquina;
+    DELETE FROM weekly_machine_totals
+    WHERE iso_year = OLD.iso_year AND iso_week = OLD.iso_week AND maquina = OLD.maquina AND filas <= 0;
+"""
+
+
+@migracion(5, "Totales semanales por máquina mantenidos por triggers")
+def _totales_semanales(conn):
+    # Agregado (semana ISO, máquina) que leen Dashboard y Reportes; los triggers lo mantienen
+    # al día ante cualquier escritura en resumen_semanal (Guardar semana, sincronización de egresos...)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS weekly_machine_totals (
+            iso_year INTEGER NOT NULL,
+            iso_week INTEGER NOT NULL,
+            maquina TEXT NOT NULL,
+            ventas REAL NOT NULL DEFAULT 0,
+            egresos REAL NOT NULL DEFAULT 0,
+            neto REAL NOT NULL DEFAULT 0,
+            dias_activos INTEGER NOT NULL DEFAULT 0,
+            filas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (iso_year, iso_week, maquina)
+        )
+    """)
+    conn.execute("DELETE FROM weekly_machine_totals")
+    conn.execute("""
+        INSERT INTO weekly_machine_totals (iso_year, iso_week, maquina, ventas, egresos, neto, dias_activos, filas)
+        SELECT iso_year, iso_week, maquina,
+               SUM(COALESCE(CAST(ventas AS REAL), 0)),
+               SUM(COALESCE(CAST(egresos AS REAL), 0)),
+               SUM(COALESCE(CAST(ventas AS REAL), 0) - COALESCE(CAST(egresos AS REAL), 0)),
+               SUM(COALESCE(ventas, 0) > 0),
+               COUNT(*)
+        FROM resumen_semanal
+        WHERE iso_year IS NOT NULL AND iso_week IS NOT NULL AND maquina IS NOT NULL
+        GROUP BY iso_year, iso_week, maquina
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_totales_ins AFTER INSERT ON resumen_semanal
+        BEGIN
+            {_SUMAR_TOTALES_SQL.format(f="NEW")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_totales_del AFTER DELETE ON resumen_semanal
+        BEGIN
+            {_RESTAR_TOTALES_SQL}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_resumen_totales_upd
+        AFTER UPDATE OF ventas, egresos, maquina, iso_year, iso_week ON resumen_semanal
+        BEGIN
+            {_RESTAR_TOTALES_SQL}
+            {_SUMAR_TOTALES_SQL.format(f="NEW")}
+        END
+    """)
+
+
+@migracion(6, "Contador de versión de datos para invalidar cachés")
+def _version_datos(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS version_datos (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO version_datos (id, version) VALUES (1, 0)")
+
+
+@migracion(7, "Índice único (maquina, fecha) en resumen_semanal para UPSERT")
+def _unico_maquina_fecha(conn):
+    # Cualquier duplicado escrito desde la migración 4 se colapsa antes de crear el índice;
+    # el índice único reemplaza al índice simple sobre las mismas columnas.
+    _colapsar_duplicados(conn)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_resumen_maquina_fecha ON resumen_semanal(maquina, fecha)")
+    conn.execute("DROP INDEX IF EXISTS idx_resumen_maquina_fecha")
+
+
+# Precio unitario según la unidad de compra (unidad/docena/paquete); costo no numérico = 0
+# y unidades_por_paquete vacío o 0 = 6, igual que calcular_precio_unitario en la app.
+_UNIDADES_SQL = "CASE WHEN COALESCE(unidades_por_paquete, 0) = 0 THEN 6 ELSE unidades_por_paquete END"
+_COSTO_SQL = "COALESCE(CAST(costo_compra AS REAL), 0)"
+_RELLENAR_ROTACION_SQL = f"""
+    UPDATE rotacion_producto SET
+        unidades_por_paquete = {_UNIDADES_SQL},
+        precio_unitario = CASE unidad_compra
+            WHEN 'docena' THEN {_COSTO_SQL} / 12.0
+            WHEN 'paquete' THEN {_COSTO_SQL} / {_UNIDADES_SQL}
+            ELSE {_COSTO_SQL}
+        END
+    WHERE (precio_unitario IS NULL OR COALESCE(unidades_por_paquete, 0) = 0)
+"""
+
+
+def rellenar_rotacion(conn, lote=None, progreso=None):
+    # Sin lote: un único UPDATE. Con lote: rangos de rowid confirmados uno a uno, para correr
+    # sobre tablas grandes sin retener el bloqueo de escritura (y con progreso).
+    if lote is None:
+        return conn.execute(_RELLENAR_ROTACION_SQL).rowcount
+    minimo, maximo = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM rotacion_producto").fetchone()
+    if minimo is None:
+        return 0
+    actualizadas = 0
+    for desde in range(minimo, maximo + 1, lote):
+        actualizadas += conn.execute(
+            _RELLENAR_ROTACION_SQL + " AND rowid BETWEEN ? AND ?", (desde, desde + lote - 1)
+        ).rowcount
+        conn.commit()
+        if progreso:
+            progreso(min(desde + lote - 1, maximo) - minimo + 1, maximo - minimo + 1, actualizadas)
+    return actualizadas
+
+
+@migracion(8, "Precio unitario y unidades por paquete de rotación por conjuntos")
+def _rellenar_rotacion(conn):
+    rellenar_rotacion(conn)
+
+
+_TABLAS_SNAPSHOT = ("resumen_semanal", "rotacion_producto", "mantenimiento")
+_MARCAR_SEMANA_SQL = """
+    INSERT INTO snapshot_semana (tabla, iso_year, iso_week)
+    SELECT '{tabla}', {f}.iso_year, {f}.iso_week WHERE {f}.iso_year IS NOT NULL AND {f}.iso_week IS NOT NULL
+    ON CONFLICT (tabla, iso_year, iso_week) DO UPDATE SET marca = marca + 1;
+"""
+
+
+@migracion(9, "Marca de cambio por semana ISO para los snapshots Parquet")
+def _marcas_snapshot(conn):
+    # Cada escritura sube la marca de su semana (y de la anterior si cambió de semana);
+    # snapshots.py reescribe solo las particiones cuya marca difiere de la del manifiesto.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_semana (
+            tabla TEXT NOT NULL,
+            iso_year INTEGER NOT NULL,
+            iso_week INTEGER NOT NULL,
+            marca INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (tabla, iso_year, iso_week)
+        ) WITHOUT ROWID
+    """)
+    for tabla in _TABLAS_SNAPSHOT:
+        conn.execute(f"""
+            INSERT OR IGNORE INTO snapshot_semana (tabla, iso_year, iso_week)
+            SELECT DISTINCT '{tabla}', iso_year, iso_week FROM {tabla}
+            WHERE iso_year IS NOT NULL AND iso_week IS NOT NULL
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_snapshot_ins AFTER INSERT ON {tabla}
+            BEGIN
+                {_MARCAR_SEMANA_SQL.format(tabla=tabla, f="NEW")}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_snapshot_del AFTER DELETE ON {tabla}
+            BEGIN
+                {_MARCAR_SEMANA_SQL.format(tabla=tabla, f="OLD")}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_snapshot_upd AFTER UPDATE ON {tabla}
+            BEGIN
+                {_MARCAR_SEMANA_SQL.format(tabla=tabla, f="OLD")}
+                {_MARCAR_SEMANA_SQL.format(tabla=tabla, f="NEW")}
+            END
+        """)
+
+
+@migracion(10, "Segmentos del diario de ingesta ya aplicados")
+def _segmentos_ingesta(conn):
+    # ingesta.py registra cada segmento de su diario en la misma transacción que aplica sus
+    # eventos: al recuperarse de una caída no vuelve a sumar un segmento ya confirmado.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingesta_segmento (
+            segmento TEXT PRIMARY KEY,
+            eventos INTEGER NOT NULL,
+            aplicado_en TEXT NOT NULL DEFAULT (datetime('now'))
+        ) WITHOUT ROWID
+    """)
+
+
+def version_actual(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT,
+            aplicada_en TEXT DEFAULT (datetime('now'))
+        )
+    """)
+    conn.commit()
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def _ruta_db(conn):
+    for _, nombre, archivo in conn.execute("PRAGMA database_list").fetchall():
+        if nombre == "main":
+            return archivo or ":memory:"
+    return ":memory:"
+
+
+def aplicar_migraciones(conn, hasta=None):
+    # Aplica en orden las migraciones pendientes; cada una en su propia transacción
+    # junto con su registro en schema_version. Devuelve la versión final.
+    clave = (_ruta_db(conn), hasta)
+    with _lock:
+        if clave in _aplicadas and clave[0] != ":memory:":
+            return _aplicadas[clave]
+        actual = version_actual(conn)
+        for version, descripcion, fn in MIGRACIONES:
+            if version <= actual or (hasta is not None and version > hasta):
+                continue
+            try:
+                conn.execute("BEGIN")
+                fn(conn)
+                conn.execute(
+                    "INSERT INTO schema_version (version, descripcion) VALUES (?, ?)",
+                    (version, descripcion),
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            actual = version
+        _aplicadas[clave] = actual
+        return actual
+
+
+# Uso fuera de la app (antes de desplegar, sobre bases grandes):
+#   python migraciones.py [--db ruta] [--lote 100000]
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from conexion import DB_PATH
+
+    args = sys.argv[1:]
+    ruta = args[args.index("--db") + 1] if "--db" in args else DB_PATH
+    lote = int(args[args.index("--lote") + 1]) if "--lote" in args else 100_000
+
+    conn = sqlite3.connect(ruta, timeout=30)
+    print(f"Base de datos: {ruta} (versión {version_actual(conn)})")
+    inicio = time.perf_counter()
+    respaldados = duplicados_respaldados(conn)
+    aplicar_migraciones(conn, hasta=7)
+    if duplicados_respaldados(conn) > respaldados:
+        print(f"  resumen_semanal: {duplicados_respaldados(conn) - respaldados:,} fila(s) duplicadas (maquina, fecha) "
+              f"movidas a resumen_semanal_duplicados")
+
+    def _progreso(hechas, total, actualizadas):
+        print(f"\r  rotacion_producto: {hechas:,}/{total:,} filas revisadas, {actualizadas:,} actualizadas", end="", flush=True)
+
+    if version_actual(conn) < 8:
+        rellenar_rotacion(conn, lote=lote, progreso=_progreso)
+        print()
+    version = aplicar_migraciones(conn)
+    print(f"Versión final: {version} ({time.perf_counter() - inicio:.1f}s)")
+    conn.close()
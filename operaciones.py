@@ -0,0 +1,160 @@
+from datetime import date
+
+# Escrituras de dominio. Cada función recibe la conexión del escritor (escritor.escribir)
+# y corre dentro de la transacción de su lote; no hace commit por su cuenta.
+
+_UPSERT_RESUMEN = """
+    INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, egreso_auto, iso_year, iso_week)
+    VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?)
+    ON CONFLICT (maquina, fecha) DO UPDATE SET {campo} = excluded.{campo}
+"""
+
+
+def guardar_celdas_resumen(tx, cambios_ventas, cambios_egresos):
+    # cambios_*: filas (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week).
+    # Solo se sobrescribe el campo que cambió: un egreso sincronizado desde Rotación mientras
+    # se editaban las ventas no se pisa.
+    if cambios_ventas:
+        tx.executemany(_UPSERT_RESUMEN.format(campo="ventas"), cambios_ventas)
+    if cambios_egresos:
+        tx.executemany(_UPSERT_RESUMEN.format(campo="egresos"), cambios_egresos)
+    return len(cambios_ventas) + len(cambios_egresos)
+
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+_UPSERT_EGRESO = """
+    INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, egreso_auto, iso_year, iso_week)
+    SELECT :semana, :fecha, :maquina, :dia, 0, :monto, 1, :iso_year, :iso_week
+    WHERE :monto > 0 OR EXISTS (SELECT 1 FROM resumen_semanal WHERE maquina = :maquina AND fecha = :fecha)
+    ON CONFLICT (maquina, fecha) DO UPDATE SET egresos = MAX(0, COALESCE(egresos, 0) + :monto)
+"""
+
+
+def sumar_egresos(tx, compras):
+    # compras: (maquina, fecha, monto); monto negativo descuenta (edición/borrado de una compra).
+    # Se acumula por (maquina, fecha) y cada celda es un único UPSERT: sin lectura previa ni filas
+    # duplicadas. Un descuento sobre un día sin fila no crea nada y el egreso nunca baja de cero.
+    deltas = {}
+    for maquina, fecha, monto in compras:
+        clave = (maquina, str(fecha))
+        deltas[clave] = deltas.get(clave, 0.0) + float(monto)
+
+    filas = []
+    for (maquina, fecha), monto in deltas.items():
+        if monto == 0:
+            continue
+        dia = date.fromisoformat(fecha)
+        iso_year, iso_week = dia.isocalendar()[:2]
+        filas.append({
+            "semana": f"Semana {iso_week}", "fecha": fecha, "maquina": maquina, "dia": DIAS[dia.weekday()],
+            "monto": monto, "iso_year": iso_year, "iso_week": iso_week,
+        })
+    if filas:
+        tx.executemany(_UPSERT_EGRESO, filas)
+    return len(filas)
+
+
+def aplicar_edicion_rotacion(tx, editadas, borradas):
+    # editadas: DataFrame indexado por rowid (producto, cantidad, costo_compra, unidad_compra,
+    # unidades_por_paquete, precio_unitario, maquina, fecha, costo_anterior); borradas: rowid,
+    # maquina, fecha, costo_compra. Todo en la transacción del llamador; los egresos de cada
+    # (maquina, fecha) se ajustan una sola vez con la suma de sus diferencias.
+    if len(editadas):
+        tx.executemany(
+            "INSERT OR IGNORE INTO producto_catalog (producto) VALUES (?)",
+            [(p,) for p in editadas["producto"].unique()],
+        )
+        tx.executemany("""
+            UPDATE rotacion_producto
+            SET producto = ?, cantidad = ?, costo_compra = ?, unidad_compra = ?, unidades_por_paquete = ?, precio_unitario = ?
+            WHERE rowid = ?
+        """, [
+            (r.producto, int(r.cantidad), float(r.costo_compra), r.unidad_compra, int(r.unidades_por_paquete), float(r.precio_unitario), int(rowid))
+            for rowid, r in zip(editadas.index, editadas.itertuples(index=False))
+        ])
+    if len(borradas):
+        tx.executemany("DELETE FROM rotacion_producto WHERE rowid = ?", [(int(rowid),) for rowid in borradas.index])
+
+    deltas = [(m, f, float(c) - float(a)) for m, f, c, a in zip(
+        editadas["maquina"], editadas["fecha"], editadas["costo_compra"], editadas["costo_anterior"]
+    )] if len(editadas) else []
+    deltas += [(m, f, -float(c or 0.0)) for m, f, c in zip(borradas["maquina"], borradas["fecha"], borradas["costo_compra"])]
+    sumar_egresos(tx, deltas)
+    return len(editadas), len(borradas)
+
+
+_SUMAR_VENTAS = """
+    INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week)
+    VALUES (:semana, :fecha, :maquina, :dia, :monto, 0, :iso_year, :iso_week)
+    ON CONFLICT (maquina, fecha) DO UPDATE SET ventas = COALESCE(ventas, 0) + excluded.ventas
+"""
+
+
+def _dia(fecha):
+    dia = date.fromisoformat(fecha)
+    iso_year, iso_week = dia.isocalendar()[:2]
+    return DIAS[dia.weekday()], iso_year, iso_week
+
+
+def sumar_ventas(tx, ventas):
+    # ventas: {(maquina, fecha): monto} ya acumulado. Un UPSERT por celda de Control Ventas
+    # (etiqueta "Semana N-AAAA"); el egreso del día no se toca.
+    dias = {}
+    filas = []
+    for (maquina, fecha), monto in ventas.items():
+        if fecha not in dias:
+            dias[fecha] = _dia(fecha)
+        dia, iso_year, iso_week = dias[fecha]
+        filas.append({
+            "semana": f"Semana {iso_week}-{iso_year}", "fecha": fecha, "maquina": maquina, "dia": dia,
+            "monto": float(monto), "iso_year": iso_year, "iso_week": iso_week,
+        })
+    if filas:
+        tx.executemany(_SUMAR_VENTAS, filas)
+    return len(filas)
+
+
+def sumar_vendidos(tx, vendidos):
+    # vendidos: {(maquina, fecha, producto): cantidad}. Suma la cantidad a la fila de Rotación
+    # de ese producto en esa máquina y fecha (la primera, si hay varias) o crea una sin costo de
+    # compra: el costo se completa en "Editar registros", que ajusta el egreso del día.
+    if not vendidos:
+        return 0
+    dias = {}
+    filas = []
+    for (maquina, fecha, producto), cantidad in vendidos.items():
+        if fecha not in dias:
+            dias[fecha] = _dia(fecha)
+        _, iso_year, iso_week = dias[fecha]
+        filas.append((maquina, fecha, producto, int(cantidad), iso_year, iso_week))
+    tx.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS vendidos_lote (
+            maquina TEXT, fecha TEXT, producto TEXT, cantidad INTEGER, iso_year INTEGER, iso_week INTEGER
+        )
+    """)
+    tx.execute("DELETE FROM temp.vendidos_lote")
+    tx.executemany("INSERT INTO temp.vendidos_lote VALUES (?, ?, ?, ?, ?, ?)", filas)
+    tx.execute("""
+        UPDATE rotacion_producto SET cantidad = COALESCE(rotacion_producto.cantidad, 0) + v.cantidad
+        FROM temp.vendidos_lote v
+        WHERE rotacion_producto.rowid = (
+            SELECT MIN(r.rowid) FROM rotacion_producto r
+            WHERE r.iso_year = v.iso_year AND r.iso_week = v.iso_week AND r.maquina = v.maquina
+              AND r.fecha = v.fecha AND r.producto = v.producto
+        )
+    """)
+    tx.execute("""
+        INSERT INTO rotacion_producto (semana, fecha, maquina, producto, cantidad, precio_unitario, costo_compra,
+                                       unidad_compra, unidades_por_paquete, iso_year, iso_week)
+        SELECT CAST(iso_week AS TEXT), fecha, maquina, producto, cantidad, 0, 0, 'unidad', 6, iso_year, iso_week
+        FROM temp.vendidos_lote v
+        WHERE NOT EXISTS (
+            SELECT 1 FROM rotacion_producto r
+            WHERE r.iso_year = v.iso_year AND r.iso_week = v.iso_week AND r.maquina = v.maquina
+              AND r.fecha = v.fecha AND r.producto = v.producto
+        )
+    """)
+    tx.execute("INSERT OR IGNORE INTO producto_catalog (producto) SELECT DISTINCT producto FROM temp.vendidos_lote")
+    tx.execute("DELETE FROM temp.vendidos_lote")
+    return len(filas)
@@ -0,0 +1,374 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+import pandas as pd
+
+# Perfilador de la app. SQL: las conexiones del pool y del escritor se crean con ConexionPerfilada, cuyos
+# cursores miden cada sentencia (ejecución + lectura de filas, hasta agotar, cerrar o descartar
+# el cursor) mientras el perfilador está activo. Cada medición se agrupa por sentencia
+# normalizada (literales y listas IN reemplazados) y por la sección de la app que la ejecutó;
+# las que superan el umbral guardan su EXPLAIN QUERY PLAN (una vez por sentencia). Con un
+# archivo configurado cada medición se agrega también como una línea JSON para análisis aparte.
+# Inactivo, el costo es una llamada a Python por cursor: los cursores son los de sqlite3.
+# Ejecuciones: cada rerun del script se mide de iniciar_ejecucion a terminar_ejecucion, partido en
+# tramos con nombre (perfil.tramo("gráficos") cierra el tramo anterior y abre ese); se guardan las
+# últimas duraciones por sección y por (sección, tramo) para los histogramas de "Rendimiento", y
+# en el registro JSONL con la hora de arranque del proceso para comparar entre despliegues.
+# Opcionalmente cada ejecución se perfila con cProfile y se vuelca en un archivo .pstats.
+# Los sub-paneles con st.fragment se miden con fragmento(): dentro de una ejecución completa son un
+# tramo más y, cuando se re-ejecutan solos, cuentan como ejecución propia en "<sección> › <panel>".
+#
+#   PUNTO_EXPRESS_PERFIL=1            activo desde el arranque (también ?perfil=1 o en "Rendimiento")
+#   PUNTO_EXPRESS_CPROFILE=1          cProfile de cada ejecución (también ?perfil=cprofile)
+#   PUNTO_EXPRESS_CPROFILE_DIR=ruta   carpeta de los .pstats (por defecto perfiles/)
+#   PUNTO_EXPRESS_SQL_LENTO=50        umbral en ms para capturar el plan
+#   PUNTO_EXPRESS_SQL_LOG=ruta.jsonl  registro JSONL (por defecto perfil_sql.jsonl)
+
+SIN_SECCION = "—"
+_EXPLICABLES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+@lru_cache(maxsize=2048)
+def normalizar(sql):
+    sql = re.sub(r"--[^\n]*", " ", sql)
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"(?<![\w:@$])\d+(?:\.\d+)?\b", "?", sql)
+    sql = " ".join(sql.split())
+    return re.sub(r"\(\s*\?(?:\s*,\s*\?)+\s*\)", "(?, ...)", sql)
+
+
+def _plan(filas):
+    # Filas (id, padre, _, detalle) de EXPLAIN QUERY PLAN como árbol indentado
+    profundidad = {0: -1}
+    lineas = []
+    for id_, padre, _, detalle in filas:
+        profundidad[id_] = profundidad.get(padre, -1) + 1
+        lineas.append("  " * profundidad[id_] + detalle)
+    return lineas
+
+
+class Perfilador:
+    def __init__(self, activo=False, umbral_ms=50.0, archivo=None, muestras=500, carpeta_cprofile="perfiles", max_volcados=50):
+        self.activo = activo
+        self.umbral_ms = umbral_ms
+        self.archivo = archivo
+        self.muestras = muestras
+        self.carpeta_cprofile = carpeta_cprofile
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sentencias = {}
+        self._ejecuciones = {}            # sección -> últimas duraciones (ms)
+        self._tramos = {}                 # (sección, tramo) -> últimas duraciones (ms)
+        self.volcados = deque(maxlen=max_volcados)
+        self._log = None
+        self.proceso = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.desde = time.time()
+
+    def en_seccion(self, seccion):
+        # Sección a la que se atribuyen las sentencias del hilo actual (una ejecución del script)
+        self._local.seccion = seccion
+
+    def seccion_actual(self):
+        return getattr(self._local, "seccion", None) or SIN_SECCION
+
+    def registrar(self, conn, sql, parametros, segundos, filas):
+        ms = segundos * 1000
+        clave = normalizar(sql)
+        seccion = self.seccion_actual()
+        lenta = ms >= self.umbral_ms
+        with self._lock:
+            e = self._sentencias.get(clave)
+            if e is None:
+                e = self._sentencias[clave] = {
+                    "llamadas": 0, "total_ms": 0.0, "max_ms": 0.0, "filas": 0, "lentas": 0,
+                    "tiempos": deque(maxlen=self.muestras), "secciones": {}, "plan": None,
+                }
+            e["llamadas"] += 1
+            e["total_ms"] += ms
+            e["max_ms"] = max(e["max_ms"], ms)
+            e["filas"] += filas
+            e["lentas"] += lenta
+            e["tiempos"].append(ms)
+            e["secciones"][seccion] = e["secciones"].get(seccion, 0) + 1
+            explicar = lenta and e["plan"] is None and parametros is not None and clave.upper().startswith(_EXPLICABLES)
+        plan = self._explicar(conn, sql, parametros) if explicar else None
+        if plan is not None:
+            with self._lock:
+                e["plan"] = plan
+        if self.archivo:
+            registro = {"ts": round(time.time(), 3), "tipo": "sql", "seccion": seccion, "sql": clave, "ms": round(ms, 3), "filas": filas, "lenta": lenta}
+            if plan is not None:
+                registro["plan"] = plan
+            self._escribir(json.dumps(registro, ensure_ascii=False))
+
+    def _explicar(self, conn, sql, parametros):
+        # Cursor simple de sqlite3: el plan no se mide a sí mismo. EXPLAIN no ejecuta la sentencia.
+        try:
+            return _plan(sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, parametros).fetchall())
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def _escribir(self, linea):
+        with self._lock:
+            if self._log is None or self._log.name != self.archivo:
+                if self._log is not None:
+                    self._log.close()
+                self._log = open(self.archivo, "a", encoding="utf-8", buffering=1)
+            self._log.write(linea + "\n")
+
+    def resumen(self):
+        # Una fila por sentencia normalizada, de la más lenta (p95) a la más rápida
+        with self._lock:
+            filas = []
+            for sql, e in self._sentencias.items():
+                tiempos = sorted(e["tiempos"])
+                filas.append({
+                    "sentencia": sql,
+                    "llamadas": e["llamadas"],
+                    "p50_ms": tiempos[len(tiempos) // 2],
+                    "p95_ms": tiempos[int(len(tiempos) * 0.95)],
+                    "max_ms": e["max_ms"],
+                    "total_ms": e["total_ms"],
+                    "filas_media": e["filas"] / e["llamadas"],
+                    "lentas": e["lentas"],
+                    "secciones": ", ".join(f"{s} ({n})" for s, n in sorted(e["secciones"].items(), key=lambda x: -x[1])),
+                    "plan": "\n".join(e["plan"]) if e["plan"] else "",
+                })
+        columnas = ["sentencia", "llamadas", "p50_ms", "p95_ms", "max_ms", "total_ms", "filas_media", "lentas", "secciones", "plan"]
+        return pd.DataFrame(filas, columns=columnas).sort_values("p95_ms", ascending=False, ignore_index=True)
+
+    def por_seccion(self):
+        # Tiempo de SQL por sección (reparto de total_ms según las llamadas de cada sección)
+        with self._lock:
+            totales = {}
+            for e in self._sentencias.values():
+                por_llamada = e["total_ms"] / e["llamadas"]
+                for seccion, n in e["secciones"].items():
+                    t = totales.setdefault(seccion, [0, 0.0])
+                    t[0] += n
+                    t[1] += n * por_llamada
+        df = pd.DataFrame([(s, n, ms) for s, (n, ms) in totales.items()], columns=["seccion", "sentencias", "total_ms"])
+        return df.sort_values("total_ms", ascending=False, ignore_index=True)
+
+    # --- Ejecuciones del script ---
+    def iniciar_ejecucion(self, cprofile=False):
+        anterior = getattr(self._local, "ejecucion", None)
+        if anterior is not None and anterior["cprofile"] is not None:
+            anterior["cprofile"].disable()      # la ejecución anterior se cortó (rerun) sin terminar
+        self._local.ejecucion = None
+        if not (self.activo or cprofile):
+            return
+        perfil_c = None
+        if cprofile:
+            perfil_c = cProfile.Profile()
+            perfil_c.enable()
+        ahora = time.perf_counter()
+        self._local.ejecucion = {"inicio": ahora, "tramo": None, "tramo_inicio": ahora, "tramos": {}, "cprofile": perfil_c}
+
+    def _cerrar_tramo(self, e, ahora):
+        if e["tramo"] is not None:
+            e["tramos"][e["tramo"]] = e["tramos"].get(e["tramo"], 0.0) + (ahora - e["tramo_inicio"]) * 1000
+
+    def tramo(self, nombre):
+        e = getattr(self._local, "ejecucion", None)
+        if e is None:
+            return
+        ahora = time.perf_counter()
+        self._cerrar_tramo(e, ahora)
+        e["tramo"], e["tramo_inicio"] = nombre, ahora
+
+    @contextmanager
+    def fragmento(self, seccion, nombre, parcial):
+        # parcial: el rerun es solo del fragmento (lo decide la app, que conoce Streamlit)
+        if not parcial:
+            e = getattr(self._local, "ejecucion", None)
+            anterior = e["tramo"] if e is not None else None
+            self.tramo(nombre)
+            try:
+                yield
+            finally:
+                if anterior is not None:
+                    self.tramo(anterior)
+            return
+        self.en_seccion(f"{seccion} › {nombre}")
+        self.iniciar_ejecucion()
+        self.tramo(nombre)
+        try:
+            yield
+        finally:
+            self.terminar_ejecucion()
+
+    def terminar_ejecucion(self):
+        e = getattr(self._local, "ejecucion", None)
+        if e is None:
+            return
+        self._local.ejecucion = None
+        ahora = time.perf_counter()
+        self._cerrar_tramo(e, ahora)
+        ms = (ahora - e["inicio"]) * 1000
+        seccion = self.seccion_actual()
+        if e["cprofile"] is not None:
+            e["cprofile"].disable()
+            self._volcar_cprofile(e["cprofile"], seccion, ms)
+        with self._lock:
+            self._ejecuciones.setdefault(seccion, deque(maxlen=self.muestras)).append(ms)
+            for tramo, ms_tramo in e["tramos"].items():
+                self._tramos.setdefault((seccion, tramo), deque(maxlen=self.muestras)).append(ms_tramo)
+        if self.archivo:
+            self._escribir(json.dumps({
+                "ts": round(time.time(), 3), "tipo": "ejecucion", "proceso": self.proceso, "seccion": seccion,
+                "ms": round(ms, 3), "tramos": {t: round(v, 3) for t, v in e["tramos"].items()},
+            }, ensure_ascii=False))
+
+    def _volcar_cprofile(self, perfil_c, seccion, ms):
+        os.makedirs(self.carpeta_cprofile, exist_ok=True)
+        nombre = re.sub(r"\W+", "_", seccion).strip("_").lower() or "sin_seccion"
+        ruta = os.path.join(self.carpeta_cprofile, f"{time.strftime('%Y%m%d-%H%M%S')}-{nombre}-{ms:.0f}ms.pstats")
+        perfil_c.dump_stats(ruta)
+        with self._lock:
+            if len(self.volcados) == self.volcados.maxlen:
+                try:
+                    os.remove(self.volcados[0]["ruta"])
+                except OSError:
+                    pass
+            self.volcados.append({"ruta": ruta, "seccion": seccion, "ms": ms, "ts": time.time()})
+
+    def ejecuciones(self):
+        # Duraciones de las últimas ejecuciones, una fila por ejecución (para histogramas)
+        with self._lock:
+            filas = [(s, ms) for s, tiempos in self._ejecuciones.items() for ms in tiempos]
+        return pd.DataFrame(filas, columns=["seccion", "ms"])
+
+    def resumen_tramos(self):
+        with self._lock:
+            filas = []
+            for (seccion, tramo), tiempos in self._tramos.items():
+                t = sorted(tiempos)
+                filas.append((seccion, tramo, len(t), t[len(t) // 2], t[int(len(t) * 0.95)], sum(t) / len(t)))
+        df = pd.DataFrame(filas, columns=["seccion", "tramo", "ejecuciones", "p50_ms", "p95_ms", "media_ms"])
+        return df.sort_values(["seccion", "media_ms"], ascending=[True, False], ignore_index=True)
+
+    def reiniciar(self):
+        with self._lock:
+            self._sentencias = {}
+            self._ejecuciones = {}
+            self._tramos = {}
+            self.desde = time.time()
+
+
+def texto_cprofile(ruta, orden="cumulative", limite=40):
+    salida = io.StringIO()
+    pstats.Stats(ruta, stream=salida).strip_dirs().sort_stats(orden).print_stats(limite)
+    return salida.getvalue()
+
+
+perfil = Perfilador(
+    activo=os.environ.get("PUNTO_EXPRESS_PERFIL", "") not in ("", "0"),
+    umbral_ms=float(os.environ.get("PUNTO_EXPRESS_SQL_LENTO", "50")),
+    archivo=os.environ.get("PUNTO_EXPRESS_SQL_LOG", "perfil_sql.jsonl"),
+    carpeta_cprofile=os.environ.get("PUNTO_EXPRESS_CPROFILE_DIR", "perfiles"),
+)
+
+
+class CursorPerfilado(sqlite3.Cursor):
+    # La medición queda abierta tras execute y suma el tiempo de cada fetch hasta que el cursor
+    # se agota, se cierra, ejecuta otra sentencia o se descarta (fetchone() sin agotar).
+    _medicion = None
+
+    def execute(self, sql, parametros=()):
+        self._terminar()
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._medicion = [sql, parametros, time.perf_counter() - inicio, 0]
+
+    def executemany(self, sql, filas):
+        self._terminar()
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, filas)
+        finally:
+            self._medicion = [sql, None, time.perf_counter() - inicio, 0]
+            self._terminar()
+
+    def _sumar(self, inicio, filas):
+        if self._medicion is not None:
+            self._medicion[2] += time.perf_counter() - inicio
+            self._medicion[3] += filas
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._sumar(inicio, fila is not None)
+        if fila is None:
+            self._terminar()
+        return fila
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._sumar(inicio, len(filas))
+        if not filas:
+            self._terminar()
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._sumar(inicio, len(filas))
+        self._terminar()
+        return filas
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            fila = super().__next__()
+        except StopIteration:
+            self._terminar()
+            raise
+        self._sumar(inicio, 1)
+        return fila
+
+    def close(self):
+        self._terminar()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._terminar()
+        except Exception:
+            pass
+
+    def _terminar(self):
+        medicion, self._medicion = self._medicion, None
+        if medicion is None:
+            return
+        sql, parametros, segundos, filas = medicion
+        if not filas and self.description is None:
+            filas = max(self.rowcount, 0)         # INSERT/UPDATE/DELETE: filas afectadas
+        perfil.registrar(self.connection, sql, parametros, segundos, filas)
+
+
+class ConexionPerfilada(sqlite3.Connection):
+    # Factory de sqlite3.connect: Connection.execute de C no pasa por cursor(), por eso se redefine
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = CursorPerfilado if perfil.activo else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, filas):
+        return self.cursor().executemany(sql, filas)
@@ -1,89 +1,8 @@
 import os
-import time
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import sqlite3
-from datetime import date, timedelta
-import io
-import random
-import re
-
-# Ruta absoluta y directorio para la base de datos
-DB_DIR = os.path.join(os.path.expanduser("~"), "vending_data")
-DB_FILENAME = "punto_express.db"
-DB_PATH = os.path.join(DB_DIR, DB_FILENAME)
-
-# Asegurar existencia y permisos del directorio
-if not os.path.isdir(DB_DIR):
-    os.makedirs(DB_DIR, exist_ok=True)
-    try:
-        os.chmod(DB_DIR, 0o775)
-    except Exception:
-        pass
-
-# Conexión SQLite robusta
-try:
-    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
-    conn.execute("PRAGMA journal_mode = WAL;")
-    conn.execute("PRAGMA synchronous = NORMAL;")
-    conn.execute("PRAGMA busy_timeout = 30000;")
-    cursor = conn.cursor()
-except sqlite3.OperationalError as e:
-    raise SystemExit(f"No se pudo abrir o crear la base de datos en '{DB_PATH}': {e}")
-
-# Función de ejecución con reintentos para evitar errors "database is locked"
-def execute_with_retry(sql, params=(), retries=6, base_delay=0.05):
-    for attempt in range(retries):
-        try:
-            with conn:
-                conn.execute(sql, params)
-            return
-        except sqlite3.OperationalError as e:
-            if "locked" in str(e).lower() and attempt < retries - 1:
-                time.sleep(base_delay * (2 ** attempt))
-                continue
-            raise
-
-# Helpers para navegación y limpieza de session_state
-def clear_section_state(prefix):
-    keys = [k for k in list(st.session_state.keys()) if k.startswith(prefix)]
-    for k in keys:
-        del st.session_state[k]
-
-def on_nav_change():
-    prev = st.session_state.get("_prev_section")
-    cur = st.session_state.get("_nav_select")
-    if prev and prev != cur:
-        clear_section_state(prev + "_")
-        st.session_state[f"{cur}_version"] = st.session_state.get(f"{cur}_version", 0)
-        st.experimental_rerun()
 
-# Navegación en sidebar
-secciones = ["Dashboard", "Rotación", "Otra"]
-st.sidebar.selectbox("Sección", secciones, key="_nav_select", on_change=on_nav_change)
-st.session_state["_prev_section"] = st.session_state.get("_nav_select")
-opcion = st.session_state.get("_nav_select")
-
-# import seguro de FPDF (opcional)
-try:
-    from fpdf import FPDF
-    FPDF_AVAILABLE = True
-except Exception:
-    FPDF_AVAILABLE = False
-
-def limpiar_unicode(texto):
-    return re.sub(r'[^\x00-\x7F]+', '', str(texto))
-    
-# Festivos Colombia 2025
-festivos_2025 = {
-    "2025-01-01", "2025-01-06", "2025-03-24", "2025-04-17", "2025-04-18",
-    "2025-05-01", "2025-06-02", "2025-06-23", "2025-06-30", "2025-07-20",
-    "2025-08-07", "2025-08-18", "2025-10-13", "2025-11-03", "2025-11-17",
-    "2025-12-08", "2025-12-25"
-}
-
-# Configuración visual
+# Configuración visual. Va antes que el resto de las importaciones (pandas tarda ~0,6 s en frío):
+# así el navegador recibe la página, los estilos y el menú lateral mientras el proceso termina de cargar
 st.set_page_config(
     page_title="Punto Express | Sistema de Vending",
     page_icon="🟢",
@@ -163,98 +82,368 @@ st.sidebar.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
-# Conexión a la base de datos
-conn = sqlite3.connect("ventas_semanales.db", check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS resumen_semanal (
-        semana TEXT,
-        fecha TEXT,
-        maquina TEXT,
-        dia TEXT,
-        ventas INTEGER,
-        egresos INTEGER
-    )
-""")
-conn.commit()
-
-# 🔧 Mejora: función para sincronizar egresos desde rotación
-def sincronizar_egreso_en_ventas(maquina, fecha, monto):
-    dia_semana = date.fromisoformat(fecha).strftime("%A")
-    dia_map = {
-        "Monday": "Lunes", "Tuesday": "Martes", "Wednesday": "Miércoles",
-        "Thursday": "Jueves", "Friday": "Viernes", "Saturday": "Sábado", "Sunday": "Domingo"
-    }
-    dia = dia_map.get(dia_semana, dia_semana)
-    semana_iso = date.fromisoformat(fecha).isocalendar()[1]
-    semana_txt = f"Semana {semana_iso}"
-
-    cursor.execute("""
-        SELECT egresos FROM resumen_semanal
-        WHERE maquina = ? AND fecha = ?
-    """, (maquina, fecha))
-    resultado = cursor.fetchone()
-
-    if resultado:
-        cursor.execute("""
-            UPDATE resumen_semanal
-            SET egresos = egresos + ?
-            WHERE maquina = ? AND fecha = ?
-        """, (monto, maquina, fecha))
-    else:
-        cursor.execute("""
-            INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (semana_txt, fecha, maquina, dia, 0, monto))
-    conn.commit()
+import pandas as pd
+import numpy as np
+import sqlite3
+from datetime import date, timedelta
+import random
+from migraciones import aplicar_migraciones
+from conexion import DB_PATH, obtener_conexion
+from escritor import escritor, escribir
+from perfilador import perfil, texto_cprofile
+import reportes
+import repositorio
+import snapshots
+import exportacion
+import grilla
+import importacion
+from costos import agregar_costos, calcular_precio_unitario, precio_unitario
+from operaciones import aplicar_edicion_rotacion, guardar_celdas_resumen, sumar_egresos
+from semanas import en_semanas, etiqueta_semana, inicio_ventana, lunes_iso, mes_etiqueta
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Conexión SQLite robusta: cada sesión/hilo toma la suya del pool (WAL, synchronous=NORMAL, busy_timeout...)
+# Modo perfil (?perfil=1, ?perfil=cprofile o PUNTO_EXPRESS_PERFIL): cada ejecución se mide por tramos
+modo_perfil = st.query_params.get("perfil")
+if modo_perfil is not None:
+    perfil.activo = modo_perfil != "0"
+perfil.iniciar_ejecucion(cprofile=modo_perfil == "cprofile" or bool(os.environ.get("PUNTO_EXPRESS_CPROFILE")))
+perfil.tramo("conexión")
+perfil.en_seccion("Inicio")
+try:
+    conn = obtener_conexion()
+    cursor = conn.cursor()
+except sqlite3.OperationalError as e:
+    raise SystemExit(f"No se pudo abrir o crear la base de datos en '{DB_PATH}': {e}")
+
+# Helpers para navegación y limpieza de session_state
+def clear_section_state(prefix):
+    keys = [k for k in list(st.session_state.keys()) if k.startswith(prefix)]
+    for k in keys:
+        del st.session_state[k]
+
+def on_nav_change():
+    prev = st.session_state.get("_prev_section")
+    cur = st.session_state.get("_nav_select")
+    if prev and prev != cur:
+        clear_section_state(prev + "_")
+        st.session_state[f"{cur}_version"] = st.session_state.get(f"{cur}_version", 0)
+        st.experimental_rerun()
+
+def detener():
+    # st.stop() corta el script: la medición de la ejecución se cierra antes
+    perfil.terminar_ejecucion()
+    st.stop()
+
+# Navegación en sidebar
+secciones = ["Dashboard", "Rotación", "Otra"]
+st.sidebar.selectbox("Sección", secciones, key="_nav_select", on_change=on_nav_change)
+st.session_state["_prev_section"] = st.session_state.get("_nav_select")
+opcion = st.session_state.get("_nav_select")
+
+# FPDF y kaleido son opcionales; solo se comprueba que existan (se importan al descargar)
+FPDF_AVAILABLE = exportacion.disponible("fpdf")
+KALEIDO_AVAILABLE = exportacion.disponible("kaleido")
+
+# Ventana de los paneles de totales por mes (meses completos hacia atrás)
+MESES_PANEL = 6
 
-# Simulación de datos si no existen
+# Festivos Colombia 2025
+festivos_2025 = {
+    "2025-01-01", "2025-01-06", "2025-03-24", "2025-04-17", "2025-04-18",
+    "2025-05-01", "2025-06-02", "2025-06-23", "2025-06-30", "2025-07-20",
+    "2025-08-07", "2025-08-18", "2025-10-13", "2025-11-03", "2025-11-17",
+    "2025-12-08", "2025-12-25"
+}
+
+perfil.tramo("preparación")
+# Semana del bloque de simulación (también la usa Reportes)
 semana_sim = "Semana 38"
-cursor.execute("SELECT COUNT(*) FROM resumen_semanal WHERE semana = ?", (semana_sim,))
-if cursor.fetchone()[0] == 0:
-    año_sim = 2025
-    lunes_sim = date.fromisocalendar(año_sim, 38, 1)
-    fechas_sim = [lunes_sim + timedelta(days=i) for i in range(6)]
-    maquinas_sim = ["Motomall", "Unidad", "Norte", "Buses", "Paquetex", "Dekohouse", "Caldas", "Maquina 8"]
-    registros_sim = []
-    for maquina in maquinas_sim:
-        for i, fecha in enumerate(fechas_sim):
-            dia = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"][i]
-            ventas = random.randint(10000, 30000)
-            egresos = random.randint(2000, 8000)
-            registros_sim.append((semana_sim, str(fecha), maquina, dia, ventas, egresos))
-    cursor.executemany("INSERT INTO resumen_semanal VALUES (?, ?, ?, ?, ?, ?)", registros_sim)
-    conn.commit()
+año_sim, num_sim = 2025, 38
+
+@st.cache_resource(show_spinner=False)
+def inicializar_base(ruta):
+    # Una sola vez por proceso (no en cada sesión ni en cada ejecución del script)
+    conn = obtener_conexion()
+    # Esquema e índices: migraciones versionadas
+    aplicar_migraciones(conn)
+    # Snapshot Parquet para los rangos largos, sincronizado en segundo plano
+    snapshots.iniciar_periodico()
+
+    # Simulación de datos si no existen
+    if conn.execute("SELECT COUNT(*) FROM resumen_semanal WHERE iso_year = ? AND iso_week = ?", (año_sim, num_sim)).fetchone()[0] == 0:
+        lunes_sim = date.fromisocalendar(año_sim, num_sim, 1)
+        fechas_sim = [lunes_sim + timedelta(days=i) for i in range(6)]
+        maquinas_sim = ["Motomall", "Unidad", "Norte", "Buses", "Paquetex", "Dekohouse", "Caldas", "Maquina 8"]
+        registros_sim = []
+        for maquina in maquinas_sim:
+            for i, fecha in enumerate(fechas_sim):
+                dia = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"][i]
+                ventas = random.randint(10000, 30000)
+                egresos = random.randint(2000, 8000)
+                registros_sim.append((semana_sim, str(fecha), maquina, dia, ventas, egresos, año_sim, num_sim))
+        def _simular(tx):
+            tx.executemany("INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", registros_sim)
+        escribir(_simular)
+    return ruta
+
+inicializar_base(DB_PATH)
 
 def grafico_tendencia_semanal(df, festivos):
+    import plotly.express as px
     df["fecha"] = pd.to_datetime(df["fecha"])
     df_agrupado = df.groupby("fecha")["ventas"].sum().reset_index()
     df_agrupado["promedio_movil"] = df_agrupado["ventas"].rolling(window=3).mean()
 
     fig = px.line(df_agrupado, x="fecha", y="ventas", title="Tendencia semanal de ventas",
-                  markers=True, labels={"fecha": "Fecha", "ventas": "Ventas ($)"})
+                  markers=True, labels={"fecha": "Semana (lunes)", "ventas": "Ventas ($)"})
     fig.add_scatter(x=df_agrupado["fecha"], y=df_agrupado["promedio_movil"],
-                    mode="lines", name="Promedio móvil (3 días)",
+                    mode="lines", name="Promedio móvil (3 semanas)",
                     line=dict(dash="dash", color="#00c853"))
+    # Marcar los festivos que caen dentro de alguna de las semanas graficadas
     festivos_dt = pd.to_datetime(list(festivos))
     for f in festivos_dt:
-        if f in df_agrupado["fecha"].values:
+        if (f - pd.Timedelta(days=f.weekday())) in df_agrupado["fecha"].values:
             fig.add_vline(x=f, line_width=1, line_dash="dot", line_color="red",
                           annotation_text="Festivo", annotation_position="top left")
-    fig.update_layout(template="plotly_dark", xaxis_title="Día", yaxis_title="Ventas ($)")
+    fig.update_layout(template="plotly_dark", xaxis_title="Semana", yaxis_title="Ventas ($)")
     return fig
 
+def historico_semanal():
+    # Ventas por semana de todo el histórico: del snapshot Parquet si existe (no toca la base
+    # de los operadores); si no, del agregado semanal en SQL
+    if snapshots.existe():
+        df = snapshots.totales_semanales()
+        actualizado = snapshots.leer_manifiesto()["actualizado"]
+        return (
+            pd.DataFrame({"fecha": lunes_iso(df["iso_year"], df["iso_week"]), "ventas": df["ventas"].to_numpy()}),
+            f"Fuente: snapshot Parquet (actualizado {actualizado})",
+        )
+    return repositorio.tendencia_semanal(conn, 9999, 53, 53 * 10), "Fuente: base de datos (snapshot aún no generado)"
+
 def exportar_grafico(fig):
-    buffer = io.BytesIO()
-    fig.write_image(buffer, format="png")
-    buffer.seek(0)
+    if not KALEIDO_AVAILABLE:
+        st.caption("Instala 'kaleido' para descargar la gráfica como PNG.")
+        return
     st.download_button(
         label="📥 Descargar gráfica",
-        data=buffer,
+        data=exportacion.png(fig),
         file_name="tendencia_semanal.png",
         mime="image/png"
     )
 
+def importar_archivo(tipo):
+    # Carga masiva de un archivo descargado de las máquinas (importacion.py). Cada lote se confirma
+    # en el escritor; las filas que ya existen se omiten, así que repetir la carga es seguro.
+    titulo = {"ventas": "ventas diarias", "rotacion": "productos vendidos"}[tipo]
+    with st.expander(f"📤 Importar archivo de {titulo} (CSV/Excel)"):
+        st.caption("Columnas: " + ", ".join(importacion.REQUERIDAS[tipo])
+                   + (" y opcionalmente egresos" if tipo == "ventas" else " y opcionalmente unidad_compra, unidades_por_paquete"))
+        archivo = st.file_uploader("Archivo", type=["csv", "xlsx"], key=f"importar_{tipo}")
+        if archivo is None or not st.button("📤 Importar", key=f"importar_btn_{tipo}"):
+            return
+        estado = st.empty()
+        try:
+            resumen = importacion.importar(
+                archivo, tipo, progreso=lambda leidas, insertadas: estado.caption(f"{leidas:,} filas leídas · {insertadas:,} insertadas")
+            )
+        except Exception as e:
+            st.error(f"Error importando el archivo: {e}")
+            return
+        st.success(f"✅ {resumen['insertadas']:,} fila(s) importadas de {resumen['leidas']:,} ({resumen['segundos']:.1f}s).")
+        if resumen["duplicadas"]:
+            st.info(f"{resumen['duplicadas']:,} fila(s) ya estaban registradas y se omitieron.")
+        if resumen["rechazadas"]:
+            st.warning("Filas rechazadas: " + ", ".join(f"{n:,} por {motivo}" for motivo, n in resumen["rechazadas"].items()))
+            st.dataframe(pd.DataFrame(resumen["muestra"]), use_container_width=True, hide_index=True)
+
+def rerun_parcial():
+    # True cuando Streamlit re-ejecuta solo un fragmento y no el script completo
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+# Sub-paneles interactivos (st.fragment): un cambio en sus widgets re-ejecuta solo el panel, no el
+# script (CSS, menú, lecturas y gráficos del resto de la sección). Cada panel lee lo suyo con la
+# conexión del pool de su hilo; al guardar pide un rerun completo (st.rerun) para que totales y
+# tablas se actualicen, y el mensaje de confirmación pasa por session_state.
+@st.fragment
+def grilla_control_ventas(año, semana_num, fechas, dias_semana, semana_text, maquinas):
+    with perfil.fragmento("Control Ventas", "grilla", rerun_parcial()):
+        df_exist = repositorio.resumen_semana(obtener_conexion(), año, semana_num)
+        mensaje = st.session_state.pop("cv_mensaje", None)
+        if mensaje:
+            st.success(mensaje)
+
+        # Una sola grilla por semana: una fila por máquina, ventas y egresos por día
+        grilla_original = grilla.construir(df_exist, maquinas, fechas, dias_semana)
+        grilla_editada = st.data_editor(
+            grilla_original,
+            key=f"cv_grilla_sem{semana_num}_y{año}",
+            num_rows="fixed",
+            use_container_width=True,
+            column_config={
+                col: st.column_config.NumberColumn(col, min_value=0.0, step=100.0 if col.endswith("Ventas") else 50.0, format="%.2f")
+                for col in grilla_original.columns
+            },
+        )
+
+        # Guardar solo las celdas modificadas (UPSERT por máquina y fecha, en una transacción)
+        if st.button("💾 Guardar semana", key=f"guardar_semana_cv_{semana_num}_{año}"):
+            cambios_ventas, cambios_egresos = grilla.cambios(
+                grilla_original, grilla_editada, fechas, dias_semana, semana_text, año, semana_num
+            )
+            if not cambios_ventas and not cambios_egresos:
+                st.info("No hay cambios por guardar.")
+            else:
+                try:
+                    n_celdas = escribir(lambda tx: guardar_celdas_resumen(tx, cambios_ventas, cambios_egresos))
+                except Exception as e:
+                    st.error(f"Error guardando la semana: {e}")
+                else:
+                    st.session_state["cv_mensaje"] = f"✅ Semana actualizada correctamente ({n_celdas} celda(s) modificada(s))."
+                    st.rerun()
+
+@st.fragment
+def registro_rotacion(maquina_sel, fecha_sel, semana_sel, año_sel):
+    # --- Registrar producto vendido (con catálogo que guarda nombre tal cual) ---
+    with perfil.fragmento("Rotación", "registro", rerun_parcial()), st.expander("➕ Registrar producto vendido"):
+        conn_panel = obtener_conexion()
+        mensaje = st.session_state.pop("rot_registro_mensaje", None)
+        if mensaje:
+            st.success(mensaje)
+        productos_guardados = repositorio.productos_catalogo(conn_panel)
+
+        producto_seleccionado = st.selectbox("Elegir producto (o escribe uno nuevo abajo)", ["-- Nuevo producto --"] + productos_guardados, key=f"select_prod_new_{maquina_sel}_{str(fecha_sel)}")
+        producto_nuevo_text = st.text_input("Producto (nuevo o igual al seleccionado)", value=(producto_seleccionado if producto_seleccionado != "-- Nuevo producto --" else ""), key=f"prod_text_new_{maquina_sel}_{str(fecha_sel)}")
+        producto_nuevo = producto_nuevo_text.strip()
+
+        cantidad_nueva = st.number_input("Cantidad vendida", min_value=1, value=1, step=1, key=f"cantidad_nuevo_{maquina_sel}_{str(fecha_sel)}")
+        costo_compra = st.number_input("Costo total de compra", min_value=0.0, value=1200.0, step=100.0, format="%.2f", key=f"costo_nuevo_{maquina_sel}_{str(fecha_sel)}")
+        unidad_compra = st.selectbox("Unidad de compra", ["unidad", "docena", "paquete"], key=f"unidad_nuevo_{maquina_sel}_{str(fecha_sel)}")
+        unidades_por_paquete = st.number_input("Unidades por paquete", min_value=1, value=6, key=f"up_nuevo_{maquina_sel}_{str(fecha_sel)}") if unidad_compra == "paquete" else 6
+
+        precio_unitario_preview = calcular_precio_unitario(costo_compra, unidad_compra, unidades_por_paquete)
+        st.info(f"💡 Precio unitario calculado: ${precio_unitario_preview:,.2f}")
+
+        if st.button("📌 Guardar producto", key=f"guardar_nuevo_{maquina_sel}_{str(fecha_sel)}"):
+            if not producto_nuevo:
+                st.error("El nombre del producto no puede estar vacío.")
+            elif cantidad_nueva <= 0 or costo_compra <= 0:
+                st.error("Cantidad y costo deben ser mayores a cero.")
+            else:
+                try:
+                    def _guardar_catalogo(tx):
+                        tx.execute("INSERT OR IGNORE INTO producto_catalog (producto) VALUES (?)", (producto_nuevo,))
+                    escribir(_guardar_catalogo)
+                except Exception as e:
+                    st.error(f"Error guardando en catálogo: {e}")
+
+                existe = conn_panel.execute("""
+                    SELECT COUNT(*) FROM rotacion_producto
+                    WHERE fecha = ? AND maquina = ? AND producto = ?
+                """, (str(fecha_sel), maquina_sel, producto_nuevo)).fetchone()[0]
+                if existe > 0:
+                    st.warning("Ya existe un registro para ese producto en esta máquina y fecha. Si necesitas registrar otra venta, ajusta cantidades manualmente.")
+                else:
+                    def _insertar_rotacion(tx):
+                        tx.execute("""
+                            INSERT INTO rotacion_producto (semana, fecha, maquina, producto, cantidad, precio_unitario, costo_compra, unidad_compra, unidades_por_paquete, iso_year, iso_week)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """, (
+                            str(semana_sel), str(fecha_sel), maquina_sel, producto_nuevo,
+                            int(cantidad_nueva), float(precio_unitario_preview), float(costo_compra), unidad_compra, int(unidades_por_paquete),
+                            int(año_sel), int(semana_sel)
+                        ))
+                        # El costo de la compra se suma al egreso del día en la misma transacción
+                        sumar_egresos(tx, [(maquina_sel, fecha_sel, float(costo_compra))])
+                    try:
+                        escribir(_insertar_rotacion)
+                    except Exception as e:
+                        st.error(f"Error registrando el producto: {e}")
+                    else:
+                        st.session_state["rot_registro_mensaje"] = "Producto registrado correctamente y egreso sincronizado."
+                        st.rerun()
+
+@st.fragment
+def edicion_rotacion(maquina_sel, año_sel, semana_sel):
+    # --- Editar registros en una sola tabla: varias ediciones y borrados, una transacción ---
+    with perfil.fragmento("Rotación", "edición", rerun_parcial()), st.expander("✏️ Editar registros"):
+        df_todos = repositorio.rotacion_semana(obtener_conexion(), año_sel, semana_sel, maquina_sel).set_index("rowid")
+
+        if df_todos.empty:
+            st.info("No hay productos registrados para esta máquina en esta semana.")
+            return
+        mensaje = st.session_state.pop("rot_mensaje", None)
+        if mensaje:
+            st.success(mensaje)
+        df_editable = df_todos[["fecha"] + grilla.COLUMNAS_ROTACION].copy()
+        df_editable["unidades_por_paquete"] = df_editable["unidades_por_paquete"].fillna(6).astype(int)
+        df_editable["quitar"] = False
+        # La revisión en la key reinicia el editor tras guardar (los índices de fila cambian al borrar)
+        rev_editor = st.session_state.get("rot_editor_rev", 0)
+        df_editada = st.data_editor(
+            df_editable,
+            key=f"rot_editor_{maquina_sel}_{año_sel}_{semana_sel}_{rev_editor}",
+            num_rows="fixed",
+            use_container_width=True,
+            column_config={
+                "fecha": st.column_config.TextColumn("Fecha", disabled=True),
+                "producto": st.column_config.TextColumn("Producto", required=True),
+                "cantidad": st.column_config.NumberColumn("Cantidad", min_value=1, step=1, required=True),
+                "costo_compra": st.column_config.NumberColumn("Costo compra", min_value=0.0, step=100.0, format="%.2f", required=True),
+                "unidad_compra": st.column_config.SelectboxColumn("Unidad", options=["unidad", "docena", "paquete"], required=True),
+                "unidades_por_paquete": st.column_config.NumberColumn("Unid./paquete", min_value=1, step=1),
+                "quitar": st.column_config.CheckboxColumn("Quitar"),
+            },
+        )
+
+        if st.button("💾 Aplicar cambios", key=f"aplicar_rot_{maquina_sel}_{año_sel}_{semana_sel}"):
+            editadas, borradas = grilla.cambios_rotacion(df_todos, df_editada)
+            invalidas = editadas[(editadas["producto"] == "") | ~(editadas["cantidad"] >= 1) | ~(editadas["costo_compra"] >= 0)]
+            if editadas.empty and borradas.empty:
+                st.info("No hay cambios por aplicar.")
+            elif not invalidas.empty:
+                st.error("Producto no puede quedar vacío, cantidad debe ser >=1 y costo no negativo "
+                         f"(filas: {', '.join(invalidas['fecha'].astype(str) + ' ' + invalidas['producto'])}).")
+            else:
+                editadas["unidades_por_paquete"] = editadas["unidades_por_paquete"].fillna(6)
+                editadas["precio_unitario"] = precio_unitario(
+                    editadas["costo_compra"], editadas["unidad_compra"], editadas["unidades_por_paquete"]
+                )
+                try:
+                    n_editadas, n_borradas = escribir(lambda tx: aplicar_edicion_rotacion(tx, editadas, borradas))
+                    st.session_state["rot_editor_rev"] = rev_editor + 1
+                    st.session_state["rot_mensaje"] = f"Cambios aplicados: {n_editadas} registro(s) editado(s), {n_borradas} eliminado(s); egresos sincronizados."
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error aplicando los cambios: {e}")
+
+@st.fragment
+def registro_mantenimiento(maquina_sel, fecha_mant, semana_mant, año_mant):
+    with perfil.fragmento("Mantenimiento", "registro", rerun_parcial()), st.expander("➕ Registrar mantenimiento"):
+        mensaje = st.session_state.pop("mant_mensaje", None)
+        if mensaje:
+            st.success(mensaje)
+        tipo_mant = st.selectbox("Tipo de mantenimiento", ["Preventivo", "Correctivo", "Otro"], key="tipo_mant")
+        descripcion = st.text_area("Descripción del trabajo realizado", key="descripcion_mant")
+        costo_mant = st.number_input("Costo total", min_value=0.0, value=st.session_state.costo_mant, key="costo_mant")
+
+        if st.button("📌 Guardar mantenimiento"):
+            def _guardar_mantenimiento(tx):
+                tx.execute("""
+                    INSERT INTO mantenimiento (fecha, semana, maquina, tipo, descripcion, costo, iso_year, iso_week)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    str(fecha_mant), str(semana_mant), maquina_sel, tipo_mant, descripcion, costo_mant, int(año_mant), int(semana_mant)
+                ))
+            escribir(_guardar_mantenimiento)
+            st.session_state["mant_mensaje"] = "Mantenimiento registrado correctamente."
+            st.rerun()
+
+perfil.tramo("menú")
+# Modo depuración (?debug=1): paneles de caché/escritor y la sección oculta "Rendimiento"
+depuracion = st.query_params.get("debug") == "1" or bool(os.environ.get("PUNTO_EXPRESS_DEBUG"))
+
 # Menú de navegación
 opcion = st.sidebar.radio("📋 Navegación:", [
     "Dashboard",
@@ -263,7 +452,35 @@ opcion = st.sidebar.radio("📋 Navegación:", [
     "Rotación",
     "Mantenimiento",
     "Reportes"
-], key="menu_navegacion")
+] + (["Rendimiento"] if depuracion else []), key="menu_navegacion")
+perfil.en_seccion(opcion)
+
+# Panel de depuración: aciertos de la caché de datos y métricas del escritor
+if depuracion:
+    with st.sidebar.expander("🐞 Caché de datos"):
+        df_cache, version_cache = repositorio.estadisticas_cache()
+        st.caption(f"Versión de datos: {version_cache}")
+        if df_cache.empty:
+            st.write("Sin lecturas registradas.")
+        else:
+            total_llamadas = int(df_cache["llamadas"].sum())
+            total_aciertos = int(df_cache["aciertos"].sum())
+            st.metric("Aciertos totales", f"{(total_aciertos / total_llamadas * 100) if total_llamadas else 0:.1f}%")
+            st.dataframe(df_cache.sort_values("llamadas", ascending=False), use_container_width=True, hide_index=True)
+    with st.sidebar.expander("✍️ Escritor"):
+        m = escritor.metricas()
+        c1, c2 = st.columns(2)
+        c1.metric("En cola", m["profundidad_cola"])
+        c2.metric("Lote medio", f"{m['lote_medio']:.1f}")
+        c1.metric("Commit p50", f"{m['commit_p50_ms']:.1f} ms")
+        c2.metric("Commit p95", f"{m['commit_p95_ms']:.1f} ms")
+        st.caption(f"{m['trabajos']} trabajos en {m['lotes']} lotes · {m['errores']} con error · lote máx. {m['lote_max']}")
+    with st.sidebar.expander("📥 Exportaciones"):
+        e = exportacion.cache.estadisticas()
+        c1, c2 = st.columns(2)
+        c1.metric("Archivos en caché", e["entradas"])
+        c2.metric("Tamaño", f"{e['bytes'] / 1024:,.0f} KB")
+        st.caption(f"{e['aciertos']} aciertos · {e['fallos']} generados · {e['desalojos']} desalojados")
 
 # Pie de página flotante
 st.markdown(
@@ -276,179 +493,48 @@ st.markdown(
 # ---------------- BLOQUE Dashboard final unificado ----------------
 if opcion == "Dashboard":
     st.header("📊 Dashboard")
+    perfil.tramo("datos")
 
-    # Leer datos crudos
-    df = pd.read_sql_query("SELECT * FROM resumen_semanal ORDER BY fecha DESC", conn)
+    # Semana más reciente: recorrido inverso de la clave (iso_year, iso_week) del agregado semanal
+    ultima = repositorio.ultima_semana(conn)
 
-    if df.empty:
+    if ultima is None:
         st.info("No hay datos registrados aún.")
-        st.stop()
+        detener()
     else:
-        # -----------------------
-        # Normalizaciones y extracción de semana/año
-        # -----------------------
-        df["semana"] = df.get("semana", "").fillna("")
-        df["fecha"] = pd.to_datetime(df.get("fecha", None), errors="coerce")
-        df["ventas"] = pd.to_numeric(df.get("ventas", 0), errors="coerce").fillna(0.0).astype(float)
-        df["egresos"] = pd.to_numeric(df.get("egresos", 0), errors="coerce").fillna(0.0).astype(float)
+        año_actual, semana_actual = ultima
 
-        # Extraer semana/año desde etiqueta "Semana N-AAAA" o "Semana N"
-        m = df["semana"].str.extract(r"Semana\s*(\d{1,2})(?:-(\d{4}))?")
-        df["semana_tag_num"] = pd.to_numeric(m[0], errors="coerce")
-        df["semana_tag_year"] = pd.to_numeric(m[1], errors="coerce")
+        # Semana anterior por aritmética de fechas (años ISO de 52 o 53 semanas)
+        lunes = date.fromisocalendar(año_actual, semana_actual, 1)
+        año_anterior, semana_anterior = (lunes - timedelta(days=7)).isocalendar()[:2]
 
-        # Semana/año desde fecha (compatibilidad con distintas versiones de pandas)
-        try:
-            sem_info = df["fecha"].dt.isocalendar()
-            if hasattr(sem_info, "columns") and {"week", "year"}.issubset(sem_info.columns):
-                df["semana_date_num"] = sem_info["week"].astype("Int64")
-                df["semana_date_year"] = sem_info["year"].astype("Int64")
-            else:
-                df["semana_date_num"] = df["fecha"].dt.week.astype("Int64")
-                df["semana_date_year"] = df["fecha"].dt.year.astype("Int64")
-        except Exception:
-            df["semana_date_num"] = pd.NA
-            df["semana_date_year"] = pd.NA
-
-        # Preferir etiqueta si existe, sino usar fecha
-        df["semana_num"] = df["semana_tag_num"].fillna(df["semana_date_num"]).astype("Int64")
-        df["semana_year"] = df["semana_tag_year"].fillna(df["semana_date_year"]).astype("Int64")
-
-        # Determinar la semana más reciente por (año, semana)
-        df_valid = df.dropna(subset=["semana_num", "semana_year"])
-        if df_valid.empty:
-            st.info("No hay semanas reconocibles en los registros.")
-            st.stop()
-
-        max_pair = df_valid[["semana_year", "semana_num"]].drop_duplicates().sort_values(
-            ["semana_year", "semana_num"]
-        ).iloc[-1]
-        semana_actual = int(max_pair["semana_num"])
-        año_actual = int(max_pair["semana_year"])
-        semana_text = f"Semana {semana_actual}-{año_actual}"
-        semana_text_simple = f"Semana {semana_actual}"
-
-        # -----------------------
-        # Helper: priorizar fuente autoritativa para totales
-        # -----------------------
-        def leer_totales_autoritativos(sem_text, sem_text_simple, fecha_ini=None, fecha_fin=None):
-            try:
-                # 1) tabla control_ventas si existe y tiene valores
-                try:
-                    r = conn.execute(
-                        "SELECT COALESCE(SUM(CAST(ventas AS REAL)),0), COALESCE(SUM(CAST(egresos AS REAL)),0) FROM control_ventas WHERE semana = ?",
-                        (sem_text,),
-                    ).fetchone()
-                    if r and (r[0] or 0) > 0:
-                        return float(r[0] or 0), float(r[1] or 0), "control_ventas"
-                except Exception:
-                    pass
-
-                # 2) etiqueta exacta en resumen_semanal
-                r = conn.execute(
-                    "SELECT COALESCE(SUM(CAST(ventas AS REAL)),0), COALESCE(SUM(CAST(egresos AS REAL)),0) FROM resumen_semanal WHERE semana = ?",
-                    (sem_text,),
-                ).fetchone()
-                if r and (r[0] or 0) > 0:
-                    return float(r[0] or 0), float(r[1] or 0), "resumen_etiqueta_exacta"
-
-                # 3) etiqueta simple
-                r = conn.execute(
-                    "SELECT COALESCE(SUM(CAST(ventas AS REAL)),0), COALESCE(SUM(CAST(egresos AS REAL)),0) FROM resumen_semanal WHERE semana = ?",
-                    (sem_text_simple,),
-                ).fetchone()
-                if r and (r[0] or 0) > 0:
-                    return float(r[0] or 0), float(r[1] or 0), "resumen_etiqueta_simple"
-
-                # 4) fallback rango fecha si se pasan fechas
-                if fecha_ini and fecha_fin:
-                    r = conn.execute(
-                        "SELECT COALESCE(SUM(CAST(ventas AS REAL)),0), COALESCE(SUM(CAST(egresos AS REAL)),0) FROM resumen_semanal WHERE fecha BETWEEN ? AND ?",
-                        (fecha_ini, fecha_fin),
-                    ).fetchone()
-                    if r:
-                        return float(r[0] or 0), float(r[1] or 0), "resumen_rango_fecha"
-            except Exception:
-                pass
-            return 0.0, 0.0, "none"
-
-        # -----------------------
-        # Calcular rango lunes-sábado para fallback
-        # -----------------------
-        try:
-            lunes = date.fromisocalendar(int(año_actual), int(semana_actual), 1)
-            fecha_ini = str(lunes)
-            fecha_fin = str(lunes + timedelta(days=5))
-        except Exception:
-            fecha_ini = fecha_fin = None
-
-        ventas_actual, egresos_actual, fuente_totales = leer_totales_autoritativos(
-            semana_text, semana_text_simple, fecha_ini, fecha_fin
-        )
+        # Totales de la semana por clave ISO (una fila por máquina en weekly_machine_totals)
+        ventas_actual, egresos_actual = repositorio.leer_totales_autoritativos(conn, año_actual, semana_actual)
         margen_actual = ventas_actual - egresos_actual
 
-        # Mostrar métricas autoritativas y fuente usada
+        # Mostrar métricas autoritativas
         c1, c2, c3 = st.columns(3)
         c1.metric("💰 Ventas (semana - autoritativas)", f"${ventas_actual:,.0f}")
         c2.metric("💸 Egresos (semana - autoritativas)", f"${egresos_actual:,.0f}")
         c3.metric("📊 Margen (semana)", f"${margen_actual:,.0f}")
-        st.caption(f"Fuente de totales usada: {fuente_totales}")
 
         # -----------------------
-        # Construir df_sem desde la misma fuente autoritativa
+        # Totales por máquina de la semana actual y la anterior (agregado mantenido por triggers)
         # -----------------------
-        try:
-            if fuente_totales == "resumen_etiqueta_exacta":
-                df_sem = pd.read_sql_query(
-                    "SELECT * FROM resumen_semanal WHERE semana = ? ORDER BY fecha, maquina",
-                    conn,
-                    params=(semana_text,),
-                )
-            elif fuente_totales == "resumen_etiqueta_simple":
-                df_sem = pd.read_sql_query(
-                    "SELECT * FROM resumen_semanal WHERE semana = ? ORDER BY fecha, maquina",
-                    conn,
-                    params=(semana_text_simple,),
-                )
-            elif fuente_totales == "resumen_rango_fecha":
-                df_sem = pd.read_sql_query(
-                    "SELECT * FROM resumen_semanal WHERE fecha BETWEEN ? AND ? ORDER BY fecha, maquina",
-                    conn,
-                    params=(fecha_ini, fecha_fin),
-                )
-            elif fuente_totales == "control_ventas":
-                # intentar leer detalle desde control_ventas; si no existe, fallback a resumen_semanal
-                try:
-                    df_sem = pd.read_sql_query(
-                        "SELECT semana, fecha, maquina, dia, ventas, egresos FROM control_ventas WHERE semana = ? ORDER BY fecha, maquina",
-                        conn,
-                        params=(semana_text,),
-                    )
-                except Exception:
-                    df_sem = pd.read_sql_query(
-                        "SELECT * FROM resumen_semanal WHERE semana = ? ORDER BY fecha, maquina",
-                        conn,
-                        params=(semana_text,),
-                    )
-            else:
-                df_sem = pd.DataFrame(columns=["semana", "fecha", "maquina", "dia", "ventas", "egresos"])
-        except Exception:
-            df_sem = pd.DataFrame(columns=["semana", "fecha", "maquina", "dia", "ventas", "egresos"])
-
-        # Normalizar df_sem
-        if not df_sem.empty:
-            df_sem["fecha"] = pd.to_datetime(df_sem["fecha"], errors="coerce")
-            df_sem["ventas"] = pd.to_numeric(df_sem.get("ventas", 0), errors="coerce").fillna(0.0).astype(float)
-            df_sem["egresos"] = pd.to_numeric(df_sem.get("egresos", 0), errors="coerce").fillna(0.0).astype(float)
-            df_sem["neto"] = df_sem["ventas"] - df_sem["egresos"]
-        else:
-            df_sem = pd.DataFrame(columns=["semana", "fecha", "maquina", "dia", "ventas", "egresos", "neto"])
+        df = repositorio.totales_por_maquina_semanas(conn, ((año_actual, semana_actual), (año_anterior, semana_anterior)))
 
+        es_actual = (df["semana_year"] == año_actual) & (df["semana_num"] == semana_actual)
+        es_anterior = (df["semana_year"] == año_anterior) & (df["semana_num"] == semana_anterior)
+        df_sem = df[es_actual].copy()
+        df_prev = df[es_anterior].copy()
+
+        perfil.tramo("transformación")
         # -----------------------
         # Métricas principales y adicionales
         # -----------------------
         try:
-            dias_unicos = df_sem["fecha"].dt.date.nunique() if not df_sem.empty else 0
+            # fechas distintas de la semana (las máquinas pueden reportar en días diferentes)
+            dias_unicos = int(df_sem["dias_semana"].iloc[0]) if not df_sem.empty else 0
             dias_unicos = dias_unicos if dias_unicos > 0 else 6
             avg_daily = ventas_actual / dias_unicos if dias_unicos else 0.0
         except Exception:
@@ -476,9 +562,9 @@ if opcion == "Dashboard":
         else:
             st.metric("🏆 Top máquina (% ventas)", "Sin datos")
 
-        if fuente_totales == "resumen_rango_fecha":
-            st.warning("Se usó fallback por rango de fechas; verifica que Control Ventas guardó la etiqueta 'Semana N-AAAA'.")
-
+        perfil.tramo("gráficos")
+        # Plotly (~0,2 s en frío) se importa al llegar a los gráficos, no al arrancar el proceso
+        import plotly.express as px
         # -----------------------
         # Gráfica por máquina
         # -----------------------
@@ -498,35 +584,11 @@ if opcion == "Dashboard":
         # -----------------------
         # Comparativa 2 semanas
         # -----------------------
-        semana_anterior = semana_actual - 1
-        año_anterior = año_actual
-        if semana_anterior < 1:
-            semana_anterior = 52
-            año_anterior = año_actual - 1
-
         try:
-            df_comp = df[
-                df[["semana_num", "semana_year"]]
-                .apply(tuple, axis=1)
-                .isin([(semana_actual, año_actual), (semana_anterior, año_anterior)])
-            ]
+            df_comp = df[en_semanas(df, [(semana_actual, año_actual), (semana_anterior, año_anterior)])]
         except Exception:
             df_comp = pd.DataFrame(columns=df.columns)
 
-        if df_comp.empty:
-            try:
-                lunes = date.fromisocalendar(año_actual, semana_actual, 1)
-                fecha_ini = str(lunes)
-                fecha_fin = str(lunes + timedelta(days=5))
-                lunes_prev = date.fromisocalendar(año_anterior, semana_anterior, 1)
-                fecha_ini_prev = str(lunes_prev)
-                fecha_fin_prev = str(lunes_prev + timedelta(days=5))
-                df_comp = df[
-                    df["fecha"].astype(str).between(fecha_ini_prev, fecha_fin) & df["fecha"].notna()
-                ]
-            except Exception:
-                df_comp = pd.DataFrame(columns=df.columns)
-
         if not df_comp.empty:
             df_comp_sum = (
                 df_comp.groupby(["semana_num", "maquina"], sort=False)["ventas"]
@@ -543,156 +605,33 @@ if opcion == "Dashboard":
             )
             st.plotly_chart(fig2, use_container_width=True)
 
+        perfil.tramo("transformación")
         # -----------------------
         # Alertas inteligentes (comparación con semana anterior)
         # -----------------------
-        lista_alertas = []
-        ventas_actual_por_maquina = df_sem.groupby("maquina")["ventas"].sum() if not df_sem.empty else pd.Series(dtype=float)
-
-        # Construir df_prev (priorizar etiqueta)
-        semana_text_prev = f"Semana {semana_anterior}-{año_anterior}"
-        semana_text_prev_simple = f"Semana {semana_anterior}"
-
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT COALESCE(COUNT(*),0) FROM resumen_semanal WHERE semana = ?",
-                (semana_text_prev,),
-            )
-            count_prev_exact = int(cursor.fetchone()[0] or 0)
-        except Exception:
-            count_prev_exact = 0
-
-        if count_prev_exact == 0:
-            try:
-                cursor.execute(
-                    "SELECT COALESCE(COUNT(*),0) FROM resumen_semanal WHERE semana = ?",
-                    (semana_text_prev_simple,),
-                )
-                count_prev_simple = int(cursor.fetchone()[0] or 0)
-            except Exception:
-                count_prev_simple = 0
-        else:
-            count_prev_simple = 0
-
-        if count_prev_exact > 0:
-            df_prev = pd.read_sql_query(
-                "SELECT * FROM resumen_semanal WHERE semana = ? ORDER BY fecha, maquina",
-                conn,
-                params=(semana_text_prev,),
-            )
-        elif count_prev_simple > 0:
-            df_prev = pd.read_sql_query(
-                "SELECT * FROM resumen_semanal WHERE semana = ? ORDER BY fecha, maquina",
-                conn,
-                params=(semana_text_prev_simple,),
-            )
-        else:
-            try:
-                lunes_prev = date.fromisocalendar(año_anterior, semana_anterior, 1)
-                fecha_ini_prev = str(lunes_prev)
-                fecha_fin_prev = str(lunes_prev + timedelta(days=5))
-                df_prev = pd.read_sql_query(
-                    "SELECT * FROM resumen_semanal WHERE fecha BETWEEN ? AND ? ORDER BY fecha, maquina",
-                    conn,
-                    params=(fecha_ini_prev, fecha_fin_prev),
-                )
-            except Exception:
-                df_prev = pd.DataFrame(columns=df.columns)
-
-        ventas_prev_por_maquina = df_prev.groupby("maquina")["ventas"].sum() if not df_prev.empty else pd.Series(dtype=float)
-
-        for maquina in ventas_actual_por_maquina.index:
-            actual = float(ventas_actual_por_maquina.get(maquina, 0.0))
-            anterior = float(ventas_prev_por_maquina.get(maquina, 0.0)) if not ventas_prev_por_maquina.empty else 0.0
-            if anterior > 0:
-                cambio = ((actual - anterior) / anterior) * 100
-                if cambio <= -30:
-                    lista_alertas.append(f"🔴 {maquina} cayó {abs(round(cambio))}% respecto a la semana anterior.")
-                elif cambio >= 20:
-                    lista_alertas.append(f"🟢 {maquina} subió {round(cambio)}% respecto a la semana anterior.")
-            elif actual > 0:
-                lista_alertas.append(f"🟢 {maquina} tuvo ventas esta semana pero estaba en cero la anterior.")
-
-        if float(df_sem["neto"].sum()) < 0:
-            lista_alertas.append("⚠️ Profit negativo esta semana. Revisa egresos y márgenes.")
-        if round(max(0.0, float(df_sem["neto"].sum())) * 0.05) < 50000:
-            lista_alertas.append(f"⚠️ Fondo de emergencia bajo: solo ${round(max(0.0, float(df_sem['neto'].sum())) * 0.05):,.0f}")
+        lista_alertas = reportes.alertas_semana(df_sem, df_prev)
 
         if lista_alertas:
             with st.expander("🚨 Alertas inteligentes"):
                 for alerta in lista_alertas:
                     try:
-                        texto_limpio = limpiar_unicode(alerta)
+                        texto_limpio = reportes.limpiar_unicode(alerta)
                     except Exception:
                         texto_limpio = str(alerta)
                     st.warning(texto_limpio)
 
+        perfil.tramo("exportación")
         # -----------------------
         # Resumen y exportación PDF (opcional)
         # -----------------------
-        ventas_prev = df_prev["ventas"].sum() if not df_prev.empty else 0
-        resumen = pd.DataFrame(
-            {
-                "Métrica": [
-                    "Total Ventas",
-                    "Total Egresos",
-                    "Profit Neto",
-                    "Fondo Emergencia (5%)",
-                    "Variación semanal",
-                ],
-                "Valor": [
-                    f"${ventas_actual:,.0f}",
-                    f"${df_sem['egresos'].sum():,.0f}",
-                    f"${df_sem['neto'].sum():,.0f}",
-                    f"${round(max(0.0, df_sem['neto'].sum()) * 0.05):,.0f}",
-                    f"{(round(((ventas_actual - (ventas_prev if ventas_prev else 0)) / (ventas_prev if ventas_prev else 1)) * 100, 2) if ventas_prev else 0):+.2f}%",
-                ],
-            }
-        )
+        resumen = reportes.resumen_dashboard(ventas_actual, df_sem, df_prev)
 
-        if "FPDF_AVAILABLE" in globals() and FPDF_AVAILABLE:
+        if FPDF_AVAILABLE:
             try:
-                class PDF(FPDF):
-                    def header(self):
-                        self.set_font("Arial", "B", 16)
-                        self.set_text_color(40, 40, 40)
-                        self.cell(0, 10, "Puntoexpress - Resumen Ejecutivo", ln=True, align="C")
-                        self.set_font("Arial", "", 12)
-                        self.cell(0, 10, f"Semana {semana_actual}-{año_actual}", ln=True, align="C")
-                        self.ln(10)
-
-                    def footer(self):
-                        self.set_y(-15)
-                        self.set_font("Arial", "I", 8)
-                        self.set_text_color(100)
-                        self.cell(0, 10, f"Generado el {date.today()}", align="C")
-
-                pdf = PDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=11)
-
-                for _, row in resumen.iterrows():
-                    pdf.cell(60, 10, row["Métrica"], border=1)
-                    pdf.cell(120, 10, str(row["Valor"]), border=1, ln=True)
-
-                if lista_alertas:
-                    pdf.ln(10)
-                    pdf.set_font("Arial", "B", 12)
-                    pdf.cell(0, 10, "Observaciones:", ln=True)
-                    pdf.set_font("Arial", size=11)
-                    for alerta in lista_alertas:
-                        try:
-                            texto_limpio = limpiar_unicode(alerta)
-                        except Exception:
-                            texto_limpio = str(alerta)
-                        pdf.multi_cell(0, 10, f"- {texto_limpio}")
-
-                pdf_bytes = pdf.output(dest="S").encode("latin-1")
                 st.markdown("### 📄 Exportación PDF")
                 st.download_button(
                     label="📄 Exportar resumen en PDF",
-                    data=pdf_bytes,
+                    data=exportacion.pdf_resumen(*reportes.argumentos_pdf(año_actual, semana_actual, resumen, lista_alertas)),
                     file_name=f"resumen_semana_{semana_actual}_{año_actual}.pdf",
                     mime="application/pdf",
                 )
@@ -701,80 +640,53 @@ if opcion == "Dashboard":
         else:
             st.info("La librería FPDF no está disponible; instala 'fpdf' si quieres generar PDF desde el dashboard.")
 
+        perfil.tramo("datos")
         # -----------------------
-        # Panel de métricas semanales por mes (forzar semana actual a usar ventas_actual)
+        # Panel de métricas semanales por mes (agregado en SQL, últimos MESES_PANEL meses)
         # -----------------------
-        df_mensual = pd.read_sql_query("SELECT semana, fecha, COALESCE(ventas,0) AS ventas FROM resumen_semanal", conn)
-        df_mensual["fecha"] = pd.to_datetime(df_mensual["fecha"], errors="coerce")
-        df_mensual = df_mensual.dropna(subset=["fecha"]).copy()
+        lunes_actual = date.fromisocalendar(int(año_actual), int(semana_actual), 1)
+        df_semanal = repositorio.ventas_semanales_por_mes(
+            conn, inicio_ventana(lunes_actual, MESES_PANEL), lunes_actual + timedelta(days=5)
+        ).copy()
+
+        # Si falta la semana actual (sin ventas registradas), mostrarla en cero
+        current_label = f"{int(semana_actual)}-{int(año_actual)}"
+        es_actual = (df_semanal["iso_year"] == int(año_actual)) & (df_semanal["iso_week"] == int(semana_actual))
+        if not df_semanal.empty and not es_actual.any():
+            mes_actual = lunes_actual.strftime("%Y-%m")
+            previas = df_semanal.loc[df_semanal["mes"] == mes_actual, "ventas"]
+            df_semanal = pd.concat(
+                [
+                    df_semanal,
+                    pd.DataFrame([{
+                        "mes": mes_actual,
+                        "iso_year": int(año_actual),
+                        "iso_week": int(semana_actual),
+                        "ventas": float(ventas_actual),
+                        "variacion": -100.0 if not previas.empty and previas.iloc[-1] > 0 else 0.0,
+                        "ventas_mes": float(previas.sum()),
+                        "variacion_mes": 0.0,
+                    }]),
+                ],
+                ignore_index=True,
+            )
 
-        if df_mensual.empty:
+        if df_semanal.empty:
             st.info("No hay datos históricos para mostrar métricas por mes.")
         else:
-            # obtener semana y año ISO (compatible)
-            sem_info = df_mensual["fecha"].dt.isocalendar()
-            if hasattr(sem_info, "columns") and {"week", "year"}.issubset(sem_info.columns):
-                df_mensual["semana_num"] = sem_info["week"].astype(int)
-                df_mensual["semana_year"] = sem_info["year"].astype(int)
-            else:
-                df_mensual["semana_num"] = df_mensual["fecha"].dt.week.astype(int)
-                df_mensual["semana_year"] = df_mensual["fecha"].dt.year.astype(int)
-
-            # calcular el lunes de la semana y asignar mes por ese lunes
-            df_mensual["lunes_week"] = df_mensual["fecha"].apply(lambda d: (d - pd.Timedelta(days=d.weekday())).date())
-            df_mensual["mes_asignado"] = df_mensual["lunes_week"].apply(lambda d: pd.to_datetime(d).strftime("%B %Y"))
-
-            # etiqueta de semana unívoca
-            df_mensual["sem_label"] = df_mensual.apply(lambda r: f"{int(r['semana_num'])}-{int(r['semana_year'])}", axis=1)
-
-            # agrupar ventas por mes_asignado y sem_label
-            df_semanal = df_mensual.groupby(["mes_asignado", "sem_label"], sort=False)["ventas"].sum().reset_index()
-
-            # extraer componentes para ordenar
-            df_semanal[["sem_num_only", "sem_year_only"]] = df_semanal["sem_label"].str.split("-", expand=True).astype(int)
-            df_semanal = df_semanal.sort_values(by=["mes_asignado", "sem_year_only", "sem_num_only"]).reset_index(drop=True)
-
-            # Si falta la semana actual en df_semanal, insertarla con ventas_actual
-            current_label = f"{int(semana_actual)}-{int(año_actual)}"
-            if current_label not in df_semanal["sem_label"].values:
-                # intentar determinar mes_asignado para el lunes de la semana actual
-                try:
-                    monday_current = date.fromisocalendar(int(año_actual), int(semana_actual), 1)
-                    mes_asignado_current = pd.to_datetime(monday_current).strftime("%B %Y")
-                except Exception:
-                    mes_asignado_current = df_semanal["mes_asignado"].iloc[0] if not df_semanal.empty else pd.to_datetime(date.today()).strftime("%B %Y")
-                # insertar fila
-                df_semanal = pd.concat(
-                    [
-                        df_semanal,
-                        pd.DataFrame(
-                            [
-                                {
-                                    "mes_asignado": mes_asignado_current,
-                                    "sem_label": current_label,
-                                    "ventas": float(ventas_actual),
-                                    "sem_num_only": int(semana_actual),
-                                    "sem_year_only": int(año_actual),
-                                }
-                            ]
-                        ),
-                    ],
-                    ignore_index=True,
-                )
-
-            # Reemplazar si existe para forzar el valor autoritativo
-            df_semanal.loc[df_semanal["sem_label"] == current_label, "ventas"] = float(ventas_actual)
-
-            # recalcular variaciones y color después del ajuste
-            df_semanal["variacion"] = df_semanal.groupby("mes_asignado")["ventas"].pct_change().fillna(0) * 100
-            df_semanal["color"] = df_semanal["variacion"].apply(lambda x: "🟢" if x > 0 else ("🔴" if x < 0 else "⚪"))
+            df_semanal["mes_asignado"] = mes_etiqueta(pd.to_datetime(df_semanal["mes"]))
+            df_semanal["sem_label"] = etiqueta_semana(df_semanal["iso_week"], df_semanal["iso_year"])
+            df_semanal["color"] = np.select([df_semanal["variacion"] > 0, df_semanal["variacion"] < 0], ["🟢", "🔴"], "⚪")
 
             # mostrar panel (paginado si hay muchas semanas)
             st.markdown("### 📊 Panel de métricas semanales por mes")
             MAX_COLS = 6
             for mes in df_semanal["mes_asignado"].unique():
-                st.markdown(f"#### 📅 {mes}")
                 semanas_mes = df_semanal[df_semanal["mes_asignado"] == mes].reset_index(drop=True)
+                st.markdown(
+                    f"#### 📅 {mes} — ${semanas_mes['ventas_mes'].iloc[0]:,.0f} "
+                    f"({semanas_mes['variacion_mes'].iloc[0]:+.1f}% vs mes anterior)"
+                )
                 if semanas_mes.empty:
                     st.info("No hay datos para este mes.")
                     continue
@@ -795,7 +707,23 @@ if opcion == "Dashboard":
                                 delta=f"{row['color']} {row['variacion']:+.1f}%",
                                 delta_color="normal",
                             )
-        st.stop()
+
+        perfil.tramo("gráficos")
+        # Comparativa entre años sobre el histórico completo (snapshot Parquet)
+        with st.expander("📆 Histórico multianual"):
+            df_hist, fuente_hist = historico_semanal()
+            if df_hist.empty:
+                st.info("No hay histórico suficiente para comparar años.")
+            else:
+                iso_hist = pd.to_datetime(df_hist["fecha"]).dt.isocalendar()
+                df_hist = df_hist.assign(año=iso_hist["year"].astype(str), semana=iso_hist["week"].astype(int))
+                fig_hist = px.line(df_hist, x="semana", y="ventas", color="año", markers=True,
+                                   title="Ventas por semana ISO y año",
+                                   labels={"semana": "Semana ISO", "ventas": "Ventas ($)", "año": "Año"})
+                fig_hist.update_layout(template="plotly_dark")
+                st.plotly_chart(fig_hist, use_container_width=True)
+                st.caption(fuente_hist)
+        detener()
 #
 # Control Ventas
 # 
@@ -825,7 +753,7 @@ if opcion == "Control Ventas":
         lunes = date.fromisocalendar(int(año), int(semana_num), 1)
     except Exception:
         st.error("Semana o año inválidos. Ajusta los valores.")
-        st.stop()
+        detener()
 
     fechas = [lunes + timedelta(days=i) for i in range(6)]  # lunes a sábado
     dias_semana = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
@@ -834,124 +762,35 @@ if opcion == "Control Ventas":
     # Etiqueta única de semana que incluye año para evitar colisiones
     semana_text = f"Semana {int(semana_num)}-{int(año)}"
 
-    # Asegurar existencia de tabla con tipos numéricos apropiados
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS resumen_semanal (
-            semana TEXT,
-            fecha TEXT,
-            maquina TEXT,
-            dia TEXT,
-            ventas REAL,
-            egresos REAL,
-            egreso_auto INTEGER DEFAULT 0
-        )
-    """)
-    conn.commit()
-
-    # Cargar datos existentes para el rango: preferimos registros con la etiqueta semana_text,
-    # además incluimos aquellas filas sin etiqueta pero dentro del rango (compatibilidad con datos antiguos)
-    df_exist = pd.read_sql_query(
-        "SELECT semana, fecha, maquina, dia, COALESCE(ventas,0) AS ventas, COALESCE(egresos,0) AS egresos "
-        "FROM resumen_semanal WHERE semana = ? OR fecha BETWEEN ? AND ? ORDER BY maquina, fecha",
-        conn, params=(semana_text, str(fechas[0]), str(fechas[-1]))
-    )
+    perfil.tramo("datos")
+    # Cargar datos existentes de la semana por clave ISO (una fila por máquina y fecha, índice único)
+    df_exist = repositorio.resumen_semana(conn, int(año), int(semana_num))
 
-    # Lista de máquinas (mantener consistente en toda la app)
-    maquinas = [
-        "Motomall", "Unidad", "Norte", "Buses",
-        "Paquetex", "Dekohouse", "Caldas", "Maquina 8"
-    ]
+    # Máquinas registradas (tabla maquina) más las que ya tengan datos en la semana
+    maquinas = repositorio.maquinas(conn)
+    maquinas = maquinas + sorted(set(df_exist["maquina"].dropna()) - set(maquinas))
 
     st.markdown("#### Ingresa ventas y egresos por día y máquina")
 
-    # Mostrar inputs por máquina y día, usar keys únicas basadas en máquina/fecha/semana/año
-    for maquina in maquinas:
-        st.markdown(f"### {maquina}")
-        cols = st.columns(6)
-        for i, fecha in enumerate(fechas):
-            dia = dias_semana[i]
-            fecha_str = str(fecha)
-            # Recuperar valores existentes en df_exist (si hay múltiples, preferir fila con semana_text)
-            filas_m = df_exist[(df_exist["maquina"] == maquina) & (df_exist["fecha"] == fecha_str)]
-            if not filas_m.empty:
-                fila_preferida = filas_m[filas_m["semana"] == semana_text]
-                if fila_preferida.empty:
-                    fila_preferida = filas_m.iloc[[0]]
-                else:
-                    fila_preferida = fila_preferida.iloc[[0]]
-                venta_val = float(fila_preferida["ventas"].values[0])
-                egreso_val = float(fila_preferida["egresos"].values[0])
-            else:
-                venta_val = 0.0
-                egreso_val = 0.0
+    perfil.tramo("widgets")
+    grilla_control_ventas(int(año), int(semana_num), fechas, dias_semana, semana_text, maquinas)
 
-            # Keys únicas por input (incluyen semana y año)
-            key_v = f"cv_{maquina}_{fecha_str}_v_sem{semana_num}_y{año}"
-            key_e = f"cv_{maquina}_{fecha_str}_e_sem{semana_num}_y{año}"
-
-            with cols[i]:
-                venta = st.number_input(
-                    f"{dia} Ventas", min_value=0.0, value=venta_val,
-                    step=100.0, format="%.2f", key=key_v
-                )
-                egreso = st.number_input(
-                    f"{dia} Egresos", min_value=0.0, value=egreso_val,
-                    step=50.0, format="%.2f", key=key_e
-                )
+    importar_archivo("ventas")
 
-    # Botón para guardar: leer desde session_state para garantizar consistencia entre dispositivos
-    if st.button("💾 Guardar semana", key=f"guardar_semana_cv_{semana_num}_{año}"):
-        registros_a_insertar = []
-        for maquina in maquinas:
-            for i, fecha in enumerate(fechas):
-                dia = dias_semana[i]
-                fecha_str = str(fecha)
-                key_v = f"cv_{maquina}_{fecha_str}_v_sem{semana_num}_y{año}"
-                key_e = f"cv_{maquina}_{fecha_str}_e_sem{semana_num}_y{año}"
-
-                # Obtener valores desde session_state con fallback
-                venta_val = float(st.session_state.get(key_v, 0.0))
-                egreso_val = float(st.session_state.get(key_e, 0.0))
-
-                registros_a_insertar.append((
-                    semana_text, fecha_str, maquina, dia, venta_val, egreso_val
-                ))
-
-        # Operación atómica: borrar por etiqueta de semana y limpiar filas antiguas sin etiqueta dentro del rango
-        try:
-            # Borrar registros con la etiqueta exacta (seguro)
-            cursor.execute("DELETE FROM resumen_semanal WHERE semana = ?", (semana_text,))
-            # Borrar registros sin etiqueta (NULL o '') dentro el rango para evitar colisiones previas
-            cursor.execute("DELETE FROM resumen_semanal WHERE (semana IS NULL OR semana = '') AND fecha BETWEEN ? AND ?", (str(fechas[0]), str(fechas[-1])))
-            if registros_a_insertar:
-                cursor.executemany(
-                    "INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, egreso_auto) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    [(r[0], r[1], r[2], r[3], r[4], r[5], 1) for r in registros_a_insertar]
-                )
-            conn.commit()
-            st.success("✅ Semana actualizada correctamente.")
-        except Exception as e:
-            conn.rollback()
-            st.error(f"Error guardando la semana: {e}")
-
-    # --- Mostrar totales y gráficos (usar solamente registros con la etiqueta exacta de semana) ---
-    df_actualizada = pd.read_sql_query(
-        "SELECT semana, fecha, maquina, dia, COALESCE(ventas,0) AS ventas, COALESCE(egresos,0) AS egresos FROM resumen_semanal WHERE semana = ? ORDER BY maquina, fecha",
-        conn, params=(semana_text,)
-    )
+    perfil.tramo("datos")
+    # --- Mostrar totales y gráficos de la semana (clave ISO) ---
+    df_actualizada = repositorio.resumen_semana(conn, int(año), int(semana_num))
 
     if df_actualizada.empty:
-        st.info("No se encontraron registros guardados con la etiqueta de semana. Asegúrate de haber guardado la semana (botón Guardar semana).")
+        st.info("No se encontraron registros guardados para esta semana. Asegúrate de haber guardado la semana (botón Guardar semana).")
     else:
+        perfil.tramo("transformación")
         # asegurar tipos numéricos y rellenar NA
         df_actualizada["ventas"] = pd.to_numeric(df_actualizada["ventas"], errors="coerce").fillna(0.0).astype(float)
         df_actualizada["egresos"] = pd.to_numeric(df_actualizada["egresos"], errors="coerce").fillna(0.0).astype(float)
 
-        # Totales por SQL (robusto frente a duplicados)
-        cursor.execute("SELECT COALESCE(SUM(CAST(ventas AS REAL)),0), COALESCE(SUM(CAST(egresos AS REAL)),0) FROM resumen_semanal WHERE semana = ?", (semana_text,))
-        tot_ventas_sql, tot_egresos_sql = cursor.fetchone() or (0.0, 0.0)
-        tv = float(tot_ventas_sql)
-        te = float(tot_egresos_sql)
+        # Totales por SQL (agregado semanal)
+        tv, te = repositorio.leer_totales_autoritativos(conn, int(año), int(semana_num))
 
         # neto y resto de métricas desde el dataframe confiable
         df_actualizada["neto"] = df_actualizada["ventas"] - df_actualizada["egresos"]
@@ -964,7 +803,7 @@ if opcion == "Control Ventas":
 
         ft = round(max(0.0, tn) * 0.05)
 
-        st.markdown("### 📊 Totales Semanales (calculado desde registros con etiqueta exacta)")
+        st.markdown("### 📊 Totales Semanales")
         c1, c2, c3 = st.columns(3)
         c1.metric("🔢 Ventas", f"${tv:,.0f}")
         c2.metric("📉 Egresos", f"${te:,.0f}")
@@ -984,6 +823,8 @@ if opcion == "Control Ventas":
         if set(maquinas_con_ventas) == set(maquinas_ref) and len(maquinas_ref) > 0:
             st.success("🟢 Todas las máquinas registraron ventas esta semana. ¡Buen desempeño!")
 
+        perfil.tramo("gráficos")
+        import plotly.express as px
         # Gráficos: días y máquinas (mantener orden de dias_semana)
         order_dias = dias_semana
         df_d = df_actualizada.groupby("dia", sort=False)["ventas"].sum().reindex(order_dias).fillna(0).reset_index()
@@ -996,6 +837,7 @@ if opcion == "Control Ventas":
         fig2.update_layout(xaxis_tickangle=-45, showlegend=False)
         st.plotly_chart(fig2, use_container_width=True)
 
+        perfil.tramo("transformación")
         # Métricas destacadas protegidas
         if df_actualizada["ventas"].sum() > 0:
             dia_top = df_actualizada.groupby("dia")["ventas"].sum().sort_values(ascending=False).index[0]
@@ -1022,44 +864,40 @@ if opcion == "Control Ventas":
         st.markdown("### 📋 Resumen Ejecutivo")
         st.dataframe(resumen, use_container_width=True)
 
+        perfil.tramo("exportación")
         # 📥 Exportar datos completos (ventas de la semana)
-        buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-            df_actualizada.to_excel(writer, index=False, sheet_name=f"Semana_{semana_num}")
         st.download_button(
             "📥 Exportar Excel",
-            data=buf.getvalue(),
+            data=exportacion.excel({f"Semana_{semana_num}": df_actualizada}),
             file_name=f"ventas_semana_{semana_num}_{año}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=exportacion.MIME_EXCEL
         )
 
         # 📥 Exportar resumen ejecutivo
-        buf_resumen = io.BytesIO()
-        with pd.ExcelWriter(buf_resumen, engine="openpyxl") as writer:
-            resumen.to_excel(writer, index=False, sheet_name="Resumen")
         st.download_button(
             "📥 Exportar resumen",
-            data=buf_resumen.getvalue(),
+            data=exportacion.excel({"Resumen": resumen}),
             file_name=f"resumen_semana_{semana_num}_{año}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=exportacion.MIME_EXCEL
         )
 
+    perfil.tramo("datos")
     # --- Resumen mensual por semana (sujeto a existencia de datos) ---
-    df_mensual = pd.read_sql_query("SELECT semana, fecha, COALESCE(ventas,0) AS ventas FROM resumen_semanal", conn)
-    if not df_mensual.empty:
-        df_mensual["fecha"] = pd.to_datetime(df_mensual["fecha"])
-        df_mensual["mes"] = df_mensual["fecha"].dt.strftime("%B")
-        df_mensual["semana_num"] = df_mensual["fecha"].dt.isocalendar().week
-
-        resumen_semanal = df_mensual.groupby(["mes", "semana_num"])["ventas"].sum().reset_index()
-        resumen_semanal = resumen_semanal.sort_values(by=["mes", "semana_num"])
-
+    resumen_semanal = repositorio.ventas_semanales_por_mes(conn, inicio_ventana(lunes, MESES_PANEL), lunes + timedelta(days=5))
+    if not resumen_semanal.empty:
         st.markdown("### 📅 Totales por semana agrupados por mes")
-        st.dataframe(resumen_semanal.rename(columns={
-            "mes": "Mes",
-            "semana_num": "Semana",
-            "ventas": "Total Ventas"
-        }), use_container_width=True)
+        st.dataframe(
+            pd.DataFrame({
+                "Mes": mes_etiqueta(pd.to_datetime(resumen_semanal["mes"])),
+                "Semana": etiqueta_semana(resumen_semanal["iso_week"], resumen_semanal["iso_year"]),
+                "Total Ventas": resumen_semanal["ventas"],
+                "Variación semanal %": resumen_semanal["variacion"].round(1),
+                "Total Mes": resumen_semanal["ventas_mes"],
+                "Variación mensual %": resumen_semanal["variacion_mes"].round(1),
+            }),
+            use_container_width=True,
+            hide_index=True,
+        )
 
         # Alerta por semanas con ventas bajas
         semanas_bajas = resumen_semanal[resumen_semanal["ventas"] < 10000]
@@ -1072,6 +910,7 @@ if opcion == "Control Ventas":
     # 🧭 Nueva sección: Reabastecimiento Inteligente
 if opcion == "Reabastecimiento":
     st.title("🚚 Reabastecimiento Inteligente")
+    perfil.tramo("datos")
 
     # --- Aviso de próximos festivos (insertado) ---
     try:
@@ -1087,10 +926,10 @@ if opcion == "Reabastecimiento":
         hoy = date.today()
         DAYS_AHEAD = 30
 
-        # Leer fechas registradas en la BD para advertir si ya hay registros
+        # Leer fechas registradas en la BD (solo la ventana de aviso) para advertir si ya hay registros
         try:
-            df_all = pd.read_sql_query("SELECT fecha FROM resumen_semanal", conn)
-            df_dates = set(pd.to_datetime(df_all["fecha"], errors="coerce").dt.date.dropna().unique())
+            fechas_bd = repositorio.fechas_registradas(conn, hoy, hoy + timedelta(days=DAYS_AHEAD))
+            df_dates = set(pd.to_datetime(pd.Series(fechas_bd, dtype=object), errors="coerce").dt.date.dropna().unique())
         except Exception:
             df_dates = set()
 
@@ -1141,15 +980,11 @@ if opcion == "Reabastecimiento":
         lunes_v = date.fromisocalendar(int(año_venta), int(sem_venta), 1)
     except Exception:
         st.error("Semana/anio inválidos para la consulta de ventas anteriores.")
-        st.stop()
+        detener()
 
-    fechas_v = [lunes_v + timedelta(days=i) for i in range(6)]
-    # Leer solo columnas necesarias y proteger la consulta
+    # Leer solo columnas necesarias (clave ISO) y proteger la consulta
     try:
-        df_v = pd.read_sql_query(
-            "SELECT semana, fecha, maquina, COALESCE(ventas,0) AS ventas FROM resumen_semanal WHERE fecha BETWEEN ? AND ?",
-            conn, params=(str(fechas_v[0]), str(fechas_v[-1]))
-        )
+        df_v = repositorio.ventas_semana(conn, int(año_venta), int(sem_venta))
     except Exception:
         df_v = pd.DataFrame(columns=["semana", "fecha", "maquina", "ventas"])
 
@@ -1166,8 +1001,7 @@ if opcion == "Reabastecimiento":
     # si top4 vacío, usar lista de máquinas desde BD o una lista por defecto
     if not top4:
         try:
-            cursor.execute("SELECT nombre_maquina FROM maquina")
-            top4 = [r[0] for r in cursor.fetchall() if r[0]]
+            top4 = repositorio.maquinas(conn)
         except Exception:
             top4 = []
     # Si aún vacío, usar un placeholder para evitar crash
@@ -1175,12 +1009,13 @@ if opcion == "Reabastecimiento":
         st.warning("No hay máquinas disponibles para programar reabastecimiento.")
         top4 = []
 
+    perfil.tramo("transformación")
     # --- Calendario de programación (semana objetivo) ---
     try:
         lunes_p = date.fromisocalendar(int(año_prog), int(semana_prog), 1)
     except Exception:
         st.error("Semana/anio inválidos para la programación.")
-        st.stop()
+        detener()
 
     sched_days = [lunes_p + timedelta(days=i) for i in range(6)]
     dias_nombre = {0: "Lunes", 1: "Martes", 2: "Miércoles", 3: "Jueves", 4: "Viernes", 5: "Sábado"}
@@ -1268,16 +1103,14 @@ if opcion == "Reabastecimiento":
     else:
         st.table(sched_df)
 
+    perfil.tramo("exportación")
     # Exportar Excel (seguro)
     try:
-        buf2 = io.BytesIO()
-        with pd.ExcelWriter(buf2, engine="openpyxl") as writer:
-            sched_df.to_excel(writer, index=False, sheet_name=f"Reab_{semana_prog}")
         st.download_button(
             "📥 Exportar Reabastecimiento a Excel",
-            data=buf2.getvalue(),
+            data=exportacion.excel({f"Reab_{semana_prog}": sched_df}),
             file_name=f"reabastecimiento_semana_{semana_prog}_{año_prog}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=exportacion.MIME_EXCEL
         )
     except Exception as e:
         st.error(f"No se pudo generar el archivo de exportación: {e}")
@@ -1285,299 +1118,54 @@ if opcion == "Reabastecimiento":
 # Rotación
 elif opcion == "Rotación":
     st.title("🔁 Rotación por Máquina")
+    perfil.tramo("datos")
 
-    # --- Migración local y aseguramiento de tablas mínimas (solo dentro de esta sección) ---
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='rotacion_producto'")
-    if not cursor.fetchone():
-        cursor.execute("""
-            CREATE TABLE rotacion_producto (
-                semana TEXT,
-                fecha TEXT,
-                maquina TEXT,
-                producto TEXT,
-                cantidad INTEGER,
-                precio_unitario REAL,
-                costo_compra REAL,
-                unidad_compra TEXT,
-                unidades_por_paquete INTEGER
-            )
-        """)
-        conn.commit()
-    else:
-        cursor.execute("PRAGMA table_info(rotacion_producto)")
-        cols = [r[1] for r in cursor.fetchall()]
-        if "unidades_por_paquete" not in cols:
-            cursor.execute("ALTER TABLE rotacion_producto ADD COLUMN unidades_por_paquete INTEGER")
-            conn.commit()
-        if "precio_unitario" not in cols:
-            cursor.execute("ALTER TABLE rotacion_producto ADD COLUMN precio_unitario REAL")
-            conn.commit()
-            rows = cursor.execute("SELECT rowid, costo_compra, unidad_compra, unidades_por_paquete FROM rotacion_producto").fetchall()
-            for row in rows:
-                rowid, costo_compra, unidad_compra, unidades_por_paquete = row
-                try:
-                    c = float(costo_compra) if costo_compra is not None else 0.0
-                except:
-                    c = 0.0
-                up = int(unidades_por_paquete) if unidades_por_paquete not in (None, 0) else 6
-                if unidad_compra == "unidad" or unidad_compra is None:
-                    precio = c
-                elif unidad_compra == "docena":
-                    precio = c / 12.0
-                elif unidad_compra == "paquete":
-                    precio = c / up
-                else:
-                    precio = c
-                cursor.execute("UPDATE rotacion_producto SET precio_unitario = ?, unidades_por_paquete = ? WHERE rowid = ?", (precio, up, rowid))
-            conn.commit()
-
-    # Asegurar egreso_auto en resumen_semanal si existe la tabla
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='resumen_semanal'")
-    if cursor.fetchone():
-        cursor.execute("PRAGMA table_info(resumen_semanal)")
-        cols_rs = [r[1] for r in cursor.fetchall()]
-        if "egreso_auto" not in cols_rs:
-            cursor.execute("ALTER TABLE resumen_semanal ADD COLUMN egreso_auto INTEGER DEFAULT 0")
-            conn.commit()
-
-    # Crear catálogo de productos si no existe
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='producto_catalog'")
-    if not cursor.fetchone():
-        cursor.execute("CREATE TABLE producto_catalog (producto TEXT PRIMARY KEY)")
-        conn.commit()
-
-    # Asegurar tabla maquina mínima
-    cursor.execute("""CREATE TABLE IF NOT EXISTS maquina (nombre_maquina TEXT PRIMARY KEY)""")
-    conn.commit()
-
-    # Popular máquinas si están vacías
-    cursor.execute("SELECT COUNT(*) FROM maquina")
-    if cursor.fetchone()[0] == 0:
-        maquinas_sim = ["Motomall", "Unidad", "Norte", "Buses", "Paquetex", "Dekohouse", "Caldas", "Maquina 8"]
-        for nombre in maquinas_sim:
-            cursor.execute("INSERT OR IGNORE INTO maquina (nombre_maquina) VALUES (?)", (nombre,))
-        conn.commit()
-
-    cursor.execute("SELECT nombre_maquina FROM maquina")
-    maquinas_disponibles = sorted(set(row[0] for row in cursor.fetchall() if row[0]))
+    # Tablas, columnas y catálogo de máquinas los asegura aplicar_migraciones() al inicio
+    maquinas_disponibles = repositorio.maquinas(conn)
 
     # Selectores
     maquina_sel = st.selectbox("Selecciona la máquina", maquinas_disponibles)
     fecha_sel = st.date_input("Selecciona una fecha", value=date.today())
-    semana_sel = st.number_input("Semana ISO", min_value=1, max_value=52, value=fecha_sel.isocalendar()[1], key=f"sem_iso_{maquina_sel}_{str(fecha_sel)}")
-
-    # Funciones de cálculo
-    def calcular_precio_unitario(costo_compra, unidad_compra, unidades_por_paquete=6):
-        try:
-            costo = float(costo_compra)
-        except:
-            return 0.0
-        if unidad_compra == "unidad":
-            return costo
-        if unidad_compra == "docena":
-            return costo / 12.0
-        if unidad_compra == "paquete":
-            return costo / unidades_por_paquete
-        return costo
-
-    def calcular_gasto(costo_compra, unidad_compra, cantidad_vendida, unidades_por_paquete=6):
-        precio_unit = calcular_precio_unitario(costo_compra, unidad_compra, unidades_por_paquete)
-        try:
-            return precio_unit * float(cantidad_vendida)
-        except:
-            return 0.0
-
-    # --- Registrar producto vendido (con catálogo que guarda nombre tal cual) ---
-    with st.expander("➕ Registrar producto vendido"):
-        cursor.execute("SELECT producto FROM producto_catalog ORDER BY producto COLLATE NOCASE")
-        productos_guardados = [r[0] for r in cursor.fetchall()]
-
-        producto_seleccionado = st.selectbox("Elegir producto (o escribe uno nuevo abajo)", ["-- Nuevo producto --"] + productos_guardados, key=f"select_prod_new_{maquina_sel}_{str(fecha_sel)}")
-        producto_nuevo_text = st.text_input("Producto (nuevo o igual al seleccionado)", value=(producto_seleccionado if producto_seleccionado != "-- Nuevo producto --" else ""), key=f"prod_text_new_{maquina_sel}_{str(fecha_sel)}")
-        producto_nuevo = producto_nuevo_text.strip()
-
-        cantidad_nueva = st.number_input("Cantidad vendida", min_value=1, value=1, step=1, key=f"cantidad_nuevo_{maquina_sel}_{str(fecha_sel)}")
-        costo_compra = st.number_input("Costo total de compra", min_value=0.0, value=1200.0, step=100.0, format="%.2f", key=f"costo_nuevo_{maquina_sel}_{str(fecha_sel)}")
-        unidad_compra = st.selectbox("Unidad de compra", ["unidad", "docena", "paquete"], key=f"unidad_nuevo_{maquina_sel}_{str(fecha_sel)}")
-        unidades_por_paquete = st.number_input("Unidades por paquete", min_value=1, value=6, key=f"up_nuevo_{maquina_sel}_{str(fecha_sel)}") if unidad_compra == "paquete" else 6
-
-        precio_unitario_preview = calcular_precio_unitario(costo_compra, unidad_compra, unidades_por_paquete)
-        st.info(f"💡 Precio unitario calculado: ${precio_unitario_preview:,.2f}")
+    semana_sel = st.number_input("Semana ISO", min_value=1, max_value=53, value=fecha_sel.isocalendar()[1], key=f"sem_iso_{maquina_sel}_{str(fecha_sel)}")
+    año_sel = fecha_sel.isocalendar()[0]
+    # La semana 53 solo existe en los años ISO largos
+    try:
+        date.fromisocalendar(int(año_sel), int(semana_sel), 1)
+    except ValueError:
+        st.error(f"La semana {semana_sel} no existe en {año_sel}.")
+        detener()
 
-        if st.button("📌 Guardar producto", key=f"guardar_nuevo_{maquina_sel}_{str(fecha_sel)}"):
-            if not producto_nuevo:
-                st.error("El nombre del producto no puede estar vacío.")
-            elif cantidad_nueva <= 0 or costo_compra <= 0:
-                st.error("Cantidad y costo deben ser mayores a cero.")
-            else:
-                try:
-                    cursor.execute("INSERT OR IGNORE INTO producto_catalog (producto) VALUES (?)", (producto_nuevo,))
-                    conn.commit()
-                except Exception as e:
-                    st.error(f"Error guardando en catálogo: {e}")
+    perfil.tramo("widgets")
+    registro_rotacion(maquina_sel, fecha_sel, int(semana_sel), int(año_sel))
 
-                cursor.execute("""
-                    SELECT COUNT(*) FROM rotacion_producto
-                    WHERE fecha = ? AND maquina = ? AND producto = ?
-                """, (str(fecha_sel), maquina_sel, producto_nuevo))
-                if cursor.fetchone()[0] > 0:
-                    st.warning("Ya existe un registro para ese producto en esta máquina y fecha. Si necesitas registrar otra venta, ajusta cantidades manualmente.")
-                else:
-                    cursor.execute("""
-                        INSERT INTO rotacion_producto (semana, fecha, maquina, producto, cantidad, precio_unitario, costo_compra, unidad_compra, unidades_por_paquete)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        str(semana_sel), str(fecha_sel), maquina_sel, producto_nuevo,
-                        int(cantidad_nueva), float(precio_unitario_preview), float(costo_compra), unidad_compra, int(unidades_por_paquete)
-                    ))
-                    conn.commit()
-                    try:
-                        sincronizar_egreso_en_ventas(maquina_sel, str(fecha_sel), float(costo_compra))
-                    except Exception:
-                        pass
-                    st.success("Producto registrado correctamente y egreso sincronizado (si aplica).")
-
-    # --- Editar registros por fila directamente en la tabla (sin selector global) ---
-    with st.expander("✏️ Editar registros (edita por fila)"):
-        df_todos = pd.read_sql_query(
-            "SELECT rowid, * FROM rotacion_producto WHERE semana = ? AND maquina = ? ORDER BY fecha, producto",
-            conn, params=(str(semana_sel), maquina_sel)
-        )
+    importar_archivo("rotacion")
 
-        if df_todos.empty:
-            st.info("No hay productos registrados para esta máquina en esta semana.")
-        else:
-            # Mostrar tabla resumida
-            df_mostrar = df_todos[["rowid", "fecha", "producto", "cantidad", "costo_compra", "unidad_compra"]].copy()
-            df_mostrar.columns = ["rowid", "Fecha", "Producto", "Cantidad", "Costo compra", "Unidad"]
-            st.dataframe(df_mostrar.reset_index(drop=True), use_container_width=True)
-
-            st.markdown("**Acciones por fila**")
-            for _, fila in df_todos.iterrows():
-                rowid = int(fila["rowid"])
-                cols = st.columns([2, 3, 2, 2, 2, 2])
-                cols[0].write(fila["fecha"])
-                cols[1].write(fila["producto"])
-                cols[2].write(int(fila["cantidad"]))
-                cols[3].write(f"${float(fila['costo_compra'] or 0):,.0f}")
-                cols[4].write(fila["unidad_compra"])
-
-                # Botón Editar
-                if cols[5].button("Editar", key=f"editar_row_{rowid}"):
-                    # Abrir mini-formulario de edición exclusivo para esta fila (corregido con st.form)
-                    with st.form(key=f"form_edit_{rowid}", clear_on_submit=False):
-                        st.markdown(f"### Editando registro: {fila['producto']} — {fila['fecha']}")
-                        cursor.execute("SELECT producto FROM producto_catalog ORDER BY producto COLLATE NOCASE")
-                        productos_guardados = [r[0] for r in cursor.fetchall()]
-                        producto_text = st.text_input("Producto", value=fila["producto"], key=f"prod_row_{rowid}")
-                        cantidad_val = st.number_input("Cantidad vendida", min_value=1, value=int(fila["cantidad"]), step=1, key=f"cant_row_{rowid}")
-                        costo_val = st.number_input("Costo total de compra", min_value=0.0, value=float(fila["costo_compra"] or 0.0), step=100.0, format="%.2f", key=f"cost_row_{rowid}")
-                        unidad_options = ["unidad", "docena", "paquete"]
-                        unidad_index = unidad_options.index(fila["unidad_compra"]) if fila["unidad_compra"] in unidad_options else 0
-                        unidad_val = st.selectbox("Unidad de compra", unidad_options, index=unidad_index, key=f"unidad_row_{rowid}")
-                        up_val = st.number_input("Unidades por paquete (si aplica)", min_value=1, value=int(fila.get("unidades_por_paquete") or 6), key=f"up_row_{rowid}") if unidad_val == "paquete" else 6
-
-                        submitted = st.form_submit_button("Guardar cambios", use_container_width=True, key=f"submit_row_{rowid}")
-                        if submitted:
-                            if not producto_text.strip():
-                                st.error("El nombre del producto no puede quedar vacío.")
-                            elif cantidad_val <= 0 or costo_val < 0:
-                                st.error("Cantidad debe ser >=1 y costo no negativo.")
-                            else:
-                                # Guardar nombre en catálogo si es nuevo
-                                try:
-                                    cursor.execute("INSERT OR IGNORE INTO producto_catalog (producto) VALUES (?)", (producto_text.strip(),))
-                                except:
-                                    pass
-                                # Actualizar registro
-                                precio_unit = calcular_precio_unitario(costo_val, unidad_val, up_val)
-                                cursor.execute("""
-                                    UPDATE rotacion_producto
-                                    SET producto = ?, cantidad = ?, costo_compra = ?, unidad_compra = ?, unidades_por_paquete = ?, precio_unitario = ?
-                                    WHERE rowid = ?
-                                """, (producto_text.strip(), int(cantidad_val), float(costo_val), unidad_val, int(up_val), float(precio_unit), rowid))
-                                conn.commit()
-
-                                # Ajuste de egreso según diferencia
-                                costo_ant = float(fila["costo_compra"] or 0.0)
-                                diferencia = float(costo_val) - costo_ant
-                                if diferencia != 0:
-                                    cursor.execute("SELECT egresos, egreso_auto FROM resumen_semanal WHERE maquina = ? AND fecha = ?", (fila["maquina"], fila["fecha"]))
-                                    res = cursor.fetchone()
-                                    if res:
-                                        egresos_act = float(res[0] or 0.0)
-                                        nuevo_egreso = max(0.0, egresos_act + diferencia)
-                                        egreso_auto_flag = res[1] if len(res) > 1 else 0
-                                        cursor.execute("UPDATE resumen_semanal SET egresos = ?, egreso_auto = ? WHERE maquina = ? AND fecha = ?", (nuevo_egreso, egreso_auto_flag, fila["maquina"], fila["fecha"]))
-                                        conn.commit()
-                                    else:
-                                        if diferencia > 0:
-                                            dia_semana = date.fromisoformat(fila["fecha"]).strftime("%A")
-                                            dia_map = {"Monday":"Lunes","Tuesday":"Martes","Wednesday":"Miércoles","Thursday":"Jueves","Friday":"Viernes","Saturday":"Sábado","Sunday":"Domingo"}
-                                            dia = dia_map.get(dia_semana, dia_semana)
-                                            semana_iso = date.fromisoformat(fila["fecha"]).isocalendar()[1]
-                                            semana_txt = f"Semana {semana_iso}"
-                                            cursor.execute("INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, egreso_auto) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                                           (semana_txt, fila["fecha"], fila["maquina"], dia, 0, diferencia, 1))
-                                            conn.commit()
-                                # Intentar log y re-sincronizar si corresponde
-                                try:
-                                    log_accion("UPDATE", fila["maquina"], fila["fecha"], producto_text.strip(), float(costo_val), f"Edición inline rowid={rowid}")
-                                except:
-                                    pass
-                                try:
-                                    if diferencia > 0:
-                                        sincronizar_egreso_en_ventas(fila["maquina"], fila["fecha"], diferencia)
-                                except:
-                                    pass
-
-                                st.success("Registro actualizado correctamente.")
-                                st.experimental_rerun()
-
-                # Botón Eliminar por fila (opcional y seguro)
-                with st.columns([1, 1, 4, 2, 2, 2])[1]:
-                    if st.button("Quitar", key=f"eliminar_row_{rowid}"):
-                        cursor.execute("DELETE FROM rotacion_producto WHERE rowid = ?", (rowid,))
-                        conn.commit()
-                        st.warning("Registro eliminado.")
-                        st.rerun()
+    edicion_rotacion(maquina_sel, int(año_sel), int(semana_sel))
 
+    perfil.tramo("datos")
     # --- Cargar y mostrar datos de rotación para la máquina y semana ---
-    df_rotacion = pd.read_sql_query(
-        "SELECT * FROM rotacion_producto WHERE semana = ? AND maquina = ?",
-        conn, params=(str(semana_sel), maquina_sel)
-    )
+    df_rotacion = repositorio.rotacion_semana(conn, int(año_sel), int(semana_sel), maquina_sel).drop(columns="rowid")
 
     if df_rotacion.empty:
         st.warning("No hay datos de rotación para esta máquina en la semana seleccionada.")
     else:
-        df_rotacion["unidades_por_paquete"] = df_rotacion["unidad_compra"].apply(lambda u: 6 if u == "paquete" else None)
-        df_rotacion["precio_unitario"] = df_rotacion.apply(
-            lambda row: calcular_precio_unitario(row["costo_compra"], row["unidad_compra"],
-                                                 row["unidades_por_paquete"] if row["unidad_compra"] == "paquete" else 6),
-            axis=1
-        )
-        df_rotacion["gasto_total"] = df_rotacion.apply(
-            lambda row: calcular_gasto(row["costo_compra"], row["unidad_compra"], row["cantidad"],
-                                       row["unidades_por_paquete"] if row["unidad_compra"] == "paquete" else 6),
-            axis=1
-        )
-        if "valor_unitario" not in df_rotacion.columns:
-            df_rotacion["valor_unitario"] = 0.0
-        df_rotacion["margen_unitario"] = df_rotacion["valor_unitario"] - df_rotacion["precio_unitario"]
+        perfil.tramo("transformación")
+        # Precio unitario, gasto y margen de toda la semana de una vez (costos.py); mismas tablas
+        # que arma la generación por lotes de reportes.py
+        df_rotacion, df_resumen_gasto, df_productos_vendidos = reportes.tablas_rotacion(df_rotacion)
 
         margen_total = df_rotacion["valor_unitario"].sum() - df_rotacion["gasto_total"].sum()
         if margen_total < 0:
             st.error("⚠️ Margen negativo: estás gastando más de lo que vendes en esta máquina.")
 
         st.subheader("📋 Resumen financiero semanal")
-        df_resumen_gasto = df_rotacion.groupby(["producto", "unidad_compra"], as_index=False).agg({"costo_compra":"sum"})
         total_inversion_semana = df_resumen_gasto["costo_compra"].sum()
         st.success(f"🔔 Total invertido en compras esta semana: ${total_inversion_semana:,.0f}")
-        df_resumen_gasto["porcentaje_inversion"] = (df_resumen_gasto["costo_compra"] / total_inversion_semana * 100) if total_inversion_semana > 0 else 0.0
         st.markdown("### 💸 Inversión por producto (según unidad de compra)")
         st.dataframe(df_resumen_gasto.sort_values("costo_compra", ascending=False), use_container_width=True)
 
+        perfil.tramo("gráficos")
+        import plotly.express as px
         # Gráfica de inversión total por producto
         st.markdown("### 📈 Gráfica: Inversión total por producto (esta semana)")
         try:
@@ -1598,40 +1186,42 @@ elif opcion == "Rotación":
 
         # Tabla de productos más vendidos
         st.subheader("🏆 Productos más vendidos esta semana")
-        df_productos_vendidos = df_rotacion.groupby(["producto", "unidad_compra"], as_index=False).agg({
-            "cantidad": "sum",
-            "precio_unitario": "mean"
-        })
-        df_productos_vendidos["cantidad"] = df_productos_vendidos["cantidad"].astype(int)
-        df_productos_vendidos = df_productos_vendidos.sort_values("cantidad", ascending=False)
-        df_productos_vendidos = df_productos_vendidos[["producto", "unidad_compra", "cantidad", "precio_unitario"]]
         st.dataframe(df_productos_vendidos.reset_index(drop=True), use_container_width=True)
 
+        perfil.tramo("exportación")
         # Exportar a Excel
-        buf_rotacion = io.BytesIO()
-        with pd.ExcelWriter(buf_rotacion, engine="openpyxl") as writer:
-            df_rotacion.to_excel(writer, index=False, sheet_name=f"Rotación_{maquina_sel}")
-            df_resumen_gasto.to_excel(writer, index=False, sheet_name="Inversión_por_Producto")
-            df_productos_vendidos.to_excel(writer, index=False, sheet_name="Productos_Vendidos")
         st.download_button(
             "📥 Exportar rotación a Excel",
-            data=buf_rotacion.getvalue(),
+            data=exportacion.excel(reportes.hojas_rotacion(maquina_sel, df_rotacion, df_resumen_gasto, df_productos_vendidos)),
             file_name=f"rotacion_{maquina_sel}_semana_{semana_sel}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=exportacion.MIME_EXCEL
         )
+
+    perfil.tramo("datos")
+    # --- Vista de flota: gasto por máquina en las últimas semanas (mismo motor de costos) ---
+    with st.expander("🌐 Gasto de la flota (últimas 8 semanas)"):
+        try:
+            desde_flota = (date.fromisocalendar(int(año_sel), int(semana_sel), 1) - timedelta(weeks=7)).isocalendar()[:2]
+        except ValueError:
+            desde_flota = (int(año_sel), 1)
+        df_flota = repositorio.rotacion_flota(conn, desde_flota[0], desde_flota[1], int(año_sel), int(semana_sel))
+        if df_flota.empty:
+            st.info("No hay datos de rotación en la flota para estas semanas.")
+        else:
+            df_flota = agregar_costos(df_flota)
+            df_flota["semana"] = etiqueta_semana(df_flota["iso_week"], df_flota["iso_year"])
+            tabla_flota = df_flota.pivot_table(index="maquina", columns="semana", values="gasto_total",
+                                               aggfunc="sum", fill_value=0.0, sort=False)
+            st.dataframe(tabla_flota.style.format("${:,.0f}"), use_container_width=True)
 #
 # Mantenimiento
 #
 elif opcion == "Mantenimiento":
     st.title("🛠️ Mantenimiento por Máquina")
-
-    # Asegurar que la tabla 'maquina' existe
-    cursor.execute("""CREATE TABLE IF NOT EXISTS maquina (nombre_maquina TEXT PRIMARY KEY)""")
-    conn.commit()
+    perfil.tramo("widgets")
 
     # Obtener máquinas disponibles
-    cursor.execute("SELECT nombre_maquina FROM maquina")
-    maquinas_disponibles = sorted(set(row[0] for row in cursor.fetchall() if row[0]))
+    maquinas_disponibles = repositorio.maquinas(conn)
 
     # Detectar cambio de máquina y reiniciar campos
     if "maquina_anterior_mant" not in st.session_state:
@@ -1639,7 +1229,13 @@ elif opcion == "Mantenimiento":
 
     maquina_sel = st.selectbox("Selecciona la máquina", maquinas_disponibles)
     fecha_mant = st.date_input("Fecha del mantenimiento", value=date.today())
-    semana_mant = st.number_input("Semana ISO", min_value=1, max_value=52, value=fecha_mant.isocalendar()[1])
+    semana_mant = st.number_input("Semana ISO", min_value=1, max_value=53, value=fecha_mant.isocalendar()[1])
+    año_mant = fecha_mant.isocalendar()[0]
+    try:
+        date.fromisocalendar(int(año_mant), int(semana_mant), 1)
+    except ValueError:
+        st.error(f"La semana {semana_mant} no existe en {año_mant}.")
+        detener()
 
     if st.session_state.maquina_anterior_mant != maquina_sel:
         st.session_state.maquina_anterior_mant = maquina_sel
@@ -1647,48 +1243,13 @@ elif opcion == "Mantenimiento":
         st.session_state.descripcion_mant = ""
         st.session_state.costo_mant = 0.0
 
-    # Crear tabla de mantenimiento si no existe
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mantenimiento (
-            fecha TEXT,
-            semana TEXT,
-            maquina TEXT,
-            tipo TEXT,
-            descripcion TEXT,
-            costo REAL
-        )
-    """)
-    conn.commit()
-
-    # Verificar si la columna 'semana' existe y agregarla si no
-    try:
-        cursor.execute("SELECT semana FROM mantenimiento LIMIT 1")
-    except:
-        cursor.execute("ALTER TABLE mantenimiento ADD COLUMN semana TEXT")
-        conn.commit()
-
     # Registro de mantenimiento
-    with st.expander("➕ Registrar mantenimiento"):
-        tipo_mant = st.selectbox("Tipo de mantenimiento", ["Preventivo", "Correctivo", "Otro"], key="tipo_mant")
-        descripcion = st.text_area("Descripción del trabajo realizado", key="descripcion_mant")
-        costo_mant = st.number_input("Costo total", min_value=0.0, value=st.session_state.costo_mant, key="costo_mant")
-
-        if st.button("📌 Guardar mantenimiento"):
-            cursor.execute("""
-                INSERT INTO mantenimiento (fecha, semana, maquina, tipo, descripcion, costo)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                str(fecha_mant), str(semana_mant), maquina_sel, tipo_mant, descripcion, costo_mant
-            ))
-            conn.commit()
-            st.success("Mantenimiento registrado correctamente.")
+    registro_mantenimiento(maquina_sel, fecha_mant, int(semana_mant), int(año_mant))
 
+    perfil.tramo("datos")
     # Historial de mantenimientos por semana
     st.subheader("📋 Historial de mantenimientos")
-    df_mantenimiento = pd.read_sql_query(
-        "SELECT * FROM mantenimiento WHERE maquina = ? AND semana = ? ORDER BY fecha DESC",
-        conn, params=(maquina_sel, str(semana_mant))
-    )
+    df_mantenimiento = repositorio.mantenimientos(conn, maquina_sel, int(año_mant), int(semana_mant))
 
     if df_mantenimiento.empty:
         st.warning("No hay mantenimientos registrados para esta máquina en la semana seleccionada.")
@@ -1702,15 +1263,13 @@ elif opcion == "Mantenimiento":
         st.info(f"🔧 Total invertido esta semana: ${total_mantenimiento:,.0f}")
         st.success(f"🧮 Número de mantenimientos realizados: {cantidad_mantenimientos}")
 
+        perfil.tramo("exportación")
         # Exportar historial
-        buf_mant = io.BytesIO()
-        with pd.ExcelWriter(buf_mant, engine="openpyxl") as writer:
-            df_mantenimiento.to_excel(writer, index=False, sheet_name=f"Mantenimiento_{maquina_sel}")
         st.download_button(
             "📥 Exportar historial a Excel",
-            data=buf_mant.getvalue(),
+            data=exportacion.excel({f"Mantenimiento_{maquina_sel}": df_mantenimiento}),
             file_name=f"mantenimiento_{maquina_sel}_semana_{semana_mant}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=exportacion.MIME_EXCEL
         )
 #   
 # Reportes
@@ -1718,66 +1277,162 @@ elif opcion == "Mantenimiento":
 if opcion == "Reportes":
     st.title("📊 Reportes Semanales")
 
-    cursor.execute("SELECT fecha, ventas FROM resumen_semanal WHERE semana = ?", (semana_sim,))
-    df_ventas = pd.DataFrame(cursor.fetchall(), columns=["fecha", "ventas"])
-
-    cursor.execute("""
-        SELECT fecha, dia, maquina, ventas, egresos
-        FROM resumen_semanal
-        WHERE semana = ?
-    """, (semana_sim,))
-    df_detalle = pd.DataFrame(cursor.fetchall(), columns=["fecha", "dia", "maquina", "ventas", "egresos"])
-    df_detalle["neto"] = df_detalle["ventas"] - df_detalle["egresos"]
-
-    tv = df_detalle["ventas"].sum()
-    te = df_detalle["egresos"].sum()
-    tn = df_detalle["neto"].sum()
-    dv = df_detalle[df_detalle["ventas"] > 0]["fecha"].nunique()
-    pdia = round(tv / dv, 2) if dv else 0
-    ft = round(tn * 0.05)
-    dia_top = df_detalle.groupby("dia")["neto"].sum().sort_values(ascending=False).index[0]
+    perfil.tramo("datos")
+    # Tendencia: total por semana de las últimas 12 semanas hasta la del reporte (agregado semanal)
+    df_ventas = repositorio.tendencia_semanal(conn, año_sim, num_sim, 12)
+    df_detalle = repositorio.totales_maquinas_semana(conn, año_sim, num_sim)
 
+    perfil.tramo("gráficos")
+    import plotly.express as px
     st.subheader("📈 Tendencia de ventas semanales")
     fig1 = grafico_tendencia_semanal(df_ventas, festivos_2025)
     st.plotly_chart(fig1, use_container_width=True)
     exportar_grafico(fig1)
 
+    st.subheader("🗓️ Tendencia histórica")
+    df_hist, fuente_hist = historico_semanal()
+    if df_hist.empty:
+        st.info("No hay histórico para graficar.")
+    else:
+        df_hist["promedio_movil"] = df_hist["ventas"].rolling(window=12, min_periods=1).mean()
+        fig_hist = px.line(df_hist, x="fecha", y="ventas", title="Ventas semanales (todo el histórico)",
+                           labels={"fecha": "Semana (lunes)", "ventas": "Ventas ($)"})
+        fig_hist.add_scatter(x=df_hist["fecha"], y=df_hist["promedio_movil"], mode="lines",
+                             name="Promedio móvil (12 semanas)", line=dict(dash="dash", color="#00c853"))
+        fig_hist.update_layout(template="plotly_dark")
+        st.plotly_chart(fig_hist, use_container_width=True)
+        st.caption(fuente_hist)
+
     st.subheader("🏭 Comparativa por máquina")
-    df_m = df_detalle.groupby("maquina")["ventas"].sum().reset_index()
+    df_m = df_detalle[["maquina", "ventas"]]
     fig2 = px.bar(df_m, x="maquina", y="ventas", title="Ventas por máquina", color="maquina")
     fig2.update_layout(template="plotly_dark")
     st.plotly_chart(fig2, use_container_width=True)
 
+    perfil.tramo("transformación")
     st.subheader("📋 Resumen ejecutivo")
-    resumen = pd.DataFrame({
-        "Indicador": [
-            "🔢 Total Ventas", "📉 Total Egresos", "💰 Profit Neto",
-            "📈 Promedio Diario", "🛟 Fondo Emergencia (5%)",
-            "📆 Día más rentable"
-        ],
-        "Valor": [
-            f"${tv:,}", f"${te:,}", f"${tn:,}",
-            f"${pdia:,}", f"${ft:,}", dia_top
-        ]
-    })
+    resumen = reportes.resumen_reporte(df_detalle, repositorio.neto_por_dia(conn, año_sim, num_sim))
     st.dataframe(resumen, use_container_width=True)
 
-    buf_reportes = io.BytesIO()
-    with pd.ExcelWriter(buf_reportes, engine="openpyxl") as writer:
-        df_ventas.to_excel(writer, index=False, sheet_name="Tendencia")
-        df_m.to_excel(writer, index=False, sheet_name="Por Máquina")
-        df_detalle.to_excel(writer, index=False, sheet_name="Detalle")
-        resumen.to_excel(writer, index=False, sheet_name="Resumen")
+    perfil.tramo("exportación")
     st.download_button(
         "📥 Exportar Reporte a Excel",
-        data=buf_reportes.getvalue(),
+        data=exportacion.excel(reportes.hojas_reporte(df_ventas, df_detalle, resumen)),
         file_name=f"reporte_semanal_{semana_sim}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        mime=exportacion.MIME_EXCEL
     )
 
+    perfil.tramo("widgets")
+    # --- Historial por rango (varias semanas y máquinas): se lee y escribe en streaming al descargar ---
+    with st.expander("📦 Exportar historial por rango"):
+        hoy_rango = date.today()
+        rango_fechas = st.date_input("Rango de fechas", value=(date(hoy_rango.year, 1, 1), hoy_rango), key="rango_fechas")
+        tablas_rango = st.multiselect(
+            "Tablas", list(exportacion.COLUMNAS_RANGO), default=list(exportacion.COLUMNAS_RANGO), key="rango_tablas"
+        )
+        maquinas_rango = st.multiselect("Máquinas (vacío = todas)", repositorio.maquinas(conn), key="rango_maquinas")
+        formato_rango = st.radio(
+            "Formato", exportacion.FORMATOS_RANGO, horizontal=True, key="rango_formato",
+            format_func={"xlsx": "Excel", "csv": "CSV (zip)", "parquet": "Parquet (zip)"}.get,
+        )
+        if formato_rango == "parquet" and not exportacion.disponible("pyarrow"):
+            st.info("Instala 'pyarrow' para exportar en Parquet.")
+        elif len(rango_fechas) == 2 and tablas_rango:
+            desde_rango, hasta_rango = rango_fechas
+            st.download_button(
+                "📦 Descargar historial",
+                data=exportacion.rango(desde_rango, hasta_rango, tablas_rango, maquinas_rango, formato_rango),
+                file_name=f"historial_{desde_rango}_{hasta_rango}.{'xlsx' if formato_rango == 'xlsx' else 'zip'}",
+                mime=exportacion.MIME_EXCEL if formato_rango == "xlsx" else "application/zip",
+            )
+
+#
+# Rendimiento (solo con ?debug=1): sentencias SQL más lentas por sección
+#
+if opcion == "Rendimiento":
+    st.header("⏱️ Rendimiento SQL")
+    st.caption(
+        "Tiempo de cada sentencia (ejecución + lectura de filas) agrupado por sentencia normalizada. "
+        "El perfilado es global: afecta a todas las sesiones mientras esté activo."
+    )
+    c1, c2, c3 = st.columns(3)
+    perfil.activo = c1.toggle("Perfilar consultas", value=perfil.activo)
+    perfil.umbral_ms = c2.number_input("Umbral lento (ms)", min_value=1.0, value=float(perfil.umbral_ms), step=10.0,
+                                       help="Sobre este tiempo se guarda el EXPLAIN QUERY PLAN de la sentencia")
+    if c3.button("🧹 Reiniciar mediciones"):
+        perfil.reiniciar()
+
+    df_sql = perfil.resumen()
+    if df_sql.empty:
+        st.info("Sin sentencias medidas. Activa el perfilado y recorre las secciones.")
+    else:
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Sentencias distintas", len(df_sql))
+        m2.metric("Ejecuciones", f"{int(df_sql['llamadas'].sum()):,}")
+        m3.metric("Sobre el umbral", f"{int(df_sql['lentas'].sum()):,}")
+
+        st.subheader("Por sección")
+        st.dataframe(perfil.por_seccion(), use_container_width=True, hide_index=True,
+                     column_config={"total_ms": st.column_config.NumberColumn("total (ms)", format="%.1f")})
+
+        st.subheader("Sentencias más lentas (p95)")
+        limite_sql = st.slider("Mostrar", 10, 200, 25, step=5)
+        st.dataframe(
+            df_sql.drop(columns="plan").head(limite_sql), use_container_width=True, hide_index=True,
+            column_config={c: st.column_config.NumberColumn(format="%.2f") for c in ("p50_ms", "p95_ms", "max_ms", "total_ms", "filas_media")},
+        )
+
+        con_plan = df_sql[df_sql["plan"] != ""].head(10)
+        if not con_plan.empty:
+            st.subheader("Planes de las sentencias lentas")
+            for _, fila in con_plan.iterrows():
+                with st.expander(f"{fila['p95_ms']:.1f} ms · {fila['sentencia'][:90]}"):
+                    st.code(fila["sentencia"], language="sql")
+                    st.code(fila["plan"], language="text")
+
+    if perfil.archivo and os.path.exists(perfil.archivo):
+        with open(perfil.archivo, "rb") as f:
+            registro_sql = f.read()
+        st.download_button("📥 Descargar registro JSONL", data=registro_sql, file_name=os.path.basename(perfil.archivo),
+                           mime="application/x-ndjson")
+        st.caption(f"{perfil.archivo} · {len(registro_sql) / 1024:,.0f} KB (una línea por sentencia medida y por ejecución)")
+
+    st.header("⏱️ Ejecuciones por sección")
+    st.caption("Cada rerun del script, de principio a fin, partido en tramos (datos, transformación, gráficos, exportación...).")
+    df_ejec = perfil.ejecuciones()
+    if df_ejec.empty:
+        st.info("Sin ejecuciones medidas. Activa el perfilado (o abre la app con ?perfil=1) y recorre las secciones.")
+    else:
+        st.dataframe(
+            df_ejec.groupby("seccion")["ms"].describe(percentiles=[0.5, 0.95])[["count", "50%", "95%", "max"]]
+            .rename(columns={"count": "ejecuciones", "50%": "p50_ms", "95%": "p95_ms", "max": "max_ms"}),
+            use_container_width=True,
+        )
+        import plotly.express as px
+        fig_ejec = px.histogram(df_ejec, x="ms", color="seccion", nbins=40, barmode="overlay", opacity=0.6,
+                                title="Duración de las últimas ejecuciones", labels={"ms": "ms por ejecución"})
+        fig_ejec.update_layout(template="plotly_dark")
+        st.plotly_chart(fig_ejec, use_container_width=True)
+        st.dataframe(perfil.resumen_tramos(), use_container_width=True, hide_index=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.1f") for c in ("p50_ms", "p95_ms", "media_ms")})
+
+    if perfil.volcados:
+        st.subheader("cProfile")
+        volcados = list(perfil.volcados)[::-1]
+        elegido = st.selectbox("Ejecución", range(len(volcados)),
+                               format_func=lambda i: f"{volcados[i]['seccion']} · {volcados[i]['ms']:.0f} ms · {os.path.basename(volcados[i]['ruta'])}")
+        orden = st.radio("Ordenar por", ["cumulative", "tottime"], horizontal=True)
+        if os.path.exists(volcados[elegido]["ruta"]):
+            st.code(texto_cprofile(volcados[elegido]["ruta"], orden), language="text")
+            with open(volcados[elegido]["ruta"], "rb") as f:
+                st.download_button("📥 Descargar .pstats", data=f.read(), file_name=os.path.basename(volcados[elegido]["ruta"]))
+    else:
+        st.caption("Abre la app con ?perfil=cprofile para guardar un cProfile de cada ejecución.")
+
 # Pie de página flotante
 st.markdown("""
     <div class="footer-text">
         © Punto Express | Última actualización: Septiembre 2025
     </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+perfil.terminar_ejecucion()
@@ -0,0 +1,284 @@
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import pandas as pd
+
+import consultas
+import exportacion
+from costos import agregar_costos, resumen_por_producto
+
+# Armado de reportes sin Streamlit: el resumen ejecutivo (PDF del Dashboard), el libro de
+# Reportes y los libros de Rotación por máquina. La app los usa con sus lecturas cacheadas;
+# la CLI de abajo genera todos los de un rango de semanas en paralelo (ProcessPoolExecutor).
+
+
+def limpiar_unicode(texto):
+    return re.sub(r'[^\x00-\x7F]+', '', str(texto))
+
+
+# --- Dashboard: resumen ejecutivo y alertas ---
+
+def alertas_semana(df_sem, df_prev):
+    # Comparación por máquina con la semana anterior, profit y fondo de emergencia
+    alertas = []
+    ventas_actual_por_maquina = df_sem.groupby("maquina")["ventas"].sum() if not df_sem.empty else pd.Series(dtype=float)
+    ventas_prev_por_maquina = df_prev.groupby("maquina")["ventas"].sum() if not df_prev.empty else pd.Series(dtype=float)
+
+    for maquina in ventas_actual_por_maquina.index:
+        actual = float(ventas_actual_por_maquina.get(maquina, 0.0))
+        anterior = float(ventas_prev_por_maquina.get(maquina, 0.0)) if not ventas_prev_por_maquina.empty else 0.0
+        if anterior > 0:
+            cambio = ((actual - anterior) / anterior) * 100
+            if cambio <= -30:
+                alertas.append(f"🔴 {maquina} cayó {abs(round(cambio))}% respecto a la semana anterior.")
+            elif cambio >= 20:
+                alertas.append(f"🟢 {maquina} subió {round(cambio)}% respecto a la semana anterior.")
+        elif actual > 0:
+            alertas.append(f"🟢 {maquina} tuvo ventas esta semana pero estaba en cero la anterior.")
+
+    neto = float(df_sem["neto"].sum())
+    if neto < 0:
+        alertas.append("⚠️ Profit negativo esta semana. Revisa egresos y márgenes.")
+    if round(max(0.0, neto) * 0.05) < 50000:
+        alertas.append(f"⚠️ Fondo de emergencia bajo: solo ${round(max(0.0, neto) * 0.05):,.0f}")
+    return alertas
+
+
+def resumen_dashboard(ventas_actual, df_sem, df_prev):
+    ventas_prev = df_prev["ventas"].sum() if not df_prev.empty else 0
+    return pd.DataFrame(
+        {
+            "Métrica": [
+                "Total Ventas",
+                "Total Egresos",
+                "Profit Neto",
+                "Fondo Emergencia (5%)",
+                "Variación semanal",
+            ],
+            "Valor": [
+                f"${ventas_actual:,.0f}",
+                f"${df_sem['egresos'].sum():,.0f}",
+                f"${df_sem['neto'].sum():,.0f}",
+                f"${round(max(0.0, df_sem['neto'].sum()) * 0.05):,.0f}",
+                f"{(round(((ventas_actual - (ventas_prev if ventas_prev else 0)) / (ventas_prev if ventas_prev else 1)) * 100, 2) if ventas_prev else 0):+.2f}%",
+            ],
+        }
+    )
+
+
+def argumentos_pdf(año, semana, resumen, alertas):
+    # Argumentos de exportacion.construir_pdf_resumen / exportacion.pdf_resumen
+    observaciones = []
+    for alerta in alertas or []:
+        try:
+            observaciones.append(limpiar_unicode(alerta))
+        except Exception:
+            observaciones.append(str(alerta))
+    return (
+        "Puntoexpress - Resumen Ejecutivo",
+        f"Semana {semana}-{año}",
+        [tuple(f) for f in resumen[["Métrica", "Valor"]].itertuples(index=False)],
+        observaciones,
+    )
+
+
+def semana_anterior(año, semana):
+    return tuple((date.fromisocalendar(año, semana, 1) - timedelta(days=7)).isocalendar()[:2])
+
+
+def pdf_semana(conn, año, semana):
+    df_sem = consultas.totales_maquinas_semana(conn, año, semana)
+    df_prev = consultas.totales_maquinas_semana(conn, *semana_anterior(año, semana))
+    resumen = resumen_dashboard(float(df_sem["ventas"].sum()), df_sem, df_prev)
+    return exportacion.construir_pdf_resumen(*argumentos_pdf(año, semana, resumen, alertas_semana(df_sem, df_prev)), date.today())
+
+
+# --- Reportes: libro semanal ---
+
+def resumen_reporte(df_detalle, df_dias):
+    tv = df_detalle["ventas"].sum()
+    te = df_detalle["egresos"].sum()
+    tn = df_detalle["neto"].sum()
+    dv = int(df_detalle["dias_activos"].max()) if not df_detalle.empty else 0
+    pdia = round(tv / dv, 2) if dv else 0
+    ft = round(tn * 0.05)
+    dia_top = df_dias.sort_values("neto", ascending=False)["dia"].iloc[0] if not df_dias.empty else "N/A"
+    return pd.DataFrame({
+        "Indicador": [
+            "🔢 Total Ventas", "📉 Total Egresos", "💰 Profit Neto",
+            "📈 Promedio Diario", "🛟 Fondo Emergencia (5%)",
+            "📆 Día más rentable"
+        ],
+        "Valor": [
+            f"${tv:,.0f}", f"${te:,.0f}", f"${tn:,.0f}",
+            f"${pdia:,}", f"${ft:,}", dia_top
+        ]
+    })
+
+
+def hojas_reporte(df_ventas, df_detalle, resumen):
+    return {
+        "Tendencia": df_ventas,
+        "Por Máquina": df_detalle[["maquina", "ventas"]],
+        "Detalle": df_detalle,
+        "Resumen": resumen,
+    }
+
+
+def excel_reporte(conn, año, semana):
+    df_detalle = consultas.totales_maquinas_semana(conn, año, semana)
+    resumen = resumen_reporte(df_detalle, consultas.neto_por_dia(conn, año, semana))
+    hojas = hojas_reporte(consultas.tendencia_semanal(conn, año, semana, 12), df_detalle, resumen)
+    return exportacion.construir_excel(hojas)
+
+
+# --- Rotación: libro por máquina y semana ---
+
+def tablas_rotacion(df_rotacion):
+    # (registros con costos, inversión por producto, productos más vendidos)
+    df_rotacion = agregar_costos(df_rotacion)
+    df_por_producto = resumen_por_producto(df_rotacion)
+    df_resumen_gasto = df_por_producto[["producto", "unidad_compra", "costo_compra", "gasto_total", "porcentaje_inversion"]]
+    df_productos_vendidos = df_por_producto[["producto", "unidad_compra", "cantidad", "precio_unitario"]].copy()
+    df_productos_vendidos["cantidad"] = df_productos_vendidos["cantidad"].astype(int)
+    df_productos_vendidos = df_productos_vendidos.sort_values("cantidad", ascending=False)
+    return df_rotacion, df_resumen_gasto, df_productos_vendidos
+
+
+def hojas_rotacion(maquina, df_rotacion, df_resumen_gasto, df_productos_vendidos):
+    return {
+        f"Rotación_{maquina}": df_rotacion,
+        "Inversión_por_Producto": df_resumen_gasto,
+        "Productos_Vendidos": df_productos_vendidos,
+    }
+
+
+def excel_rotacion(conn, año, semana, maquina):
+    df_rotacion = consultas.rotacion_semana(conn, año, semana, maquina).drop(columns="rowid")
+    return exportacion.construir_excel(hojas_rotacion(maquina, *tablas_rotacion(df_rotacion)))
+
+
+# --- Generación por lotes ---
+
+_conn = None
+
+
+def _iniciar_proceso(ruta):
+    # Cada proceso del pool abre su propia conexión de solo lectura
+    global _conn
+    _conn = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True, timeout=30)
+
+
+def _nombre_salida(tarea):
+    tipo, año, semana = tarea[:3]
+    carpeta = f"{año}-S{semana:02d}"
+    if tipo == "pdf":
+        return os.path.join(carpeta, f"resumen_semana_{semana}_{año}.pdf")
+    if tipo == "reporte":
+        return os.path.join(carpeta, f"reporte_semanal_{semana}_{año}.xlsx")
+    return os.path.join(carpeta, f"rotacion_{tarea[3]}_semana_{semana}_{año}.xlsx")
+
+
+def generar(tarea, salida):
+    # tarea: ("pdf" | "reporte", año, semana) o ("rotacion", año, semana, maquina)
+    inicio = time.perf_counter()
+    tipo = tarea[0]
+    if tipo == "pdf":
+        contenido = pdf_semana(_conn, *tarea[1:])
+    elif tipo == "reporte":
+        contenido = excel_reporte(_conn, *tarea[1:])
+    else:
+        contenido = excel_rotacion(_conn, *tarea[1:])
+    ruta = os.path.join(salida, _nombre_salida(tarea))
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    return tarea, ruta, time.perf_counter() - inicio, len(contenido)
+
+
+def tareas(conn, desde, hasta, tipos=("pdf", "reporte", "rotacion")):
+    # desde/hasta: (iso_year, iso_week) inclusivos. Semanas con ventas registradas y, para
+    # Rotación, cada máquina con registros en la semana.
+    lista = []
+    semanas = conn.execute(
+        "SELECT DISTINCT iso_year, iso_week FROM weekly_machine_totals "
+        "WHERE (iso_year, iso_week) >= (?, ?) AND (iso_year, iso_week) <= (?, ?) ORDER BY iso_year, iso_week",
+        (*desde, *hasta),
+    ).fetchall()
+    for año, semana in semanas:
+        if "pdf" in tipos and exportacion.disponible("fpdf"):
+            lista.append(("pdf", año, semana))
+        if "reporte" in tipos:
+            lista.append(("reporte", año, semana))
+    if "rotacion" in tipos:
+        lista += [("rotacion", a, s, m) for a, s, m in conn.execute(
+            "SELECT DISTINCT iso_year, iso_week, maquina FROM rotacion_producto "
+            "WHERE (iso_year, iso_week) >= (?, ?) AND (iso_year, iso_week) <= (?, ?) AND maquina IS NOT NULL "
+            "ORDER BY iso_year, iso_week, maquina",
+            (*desde, *hasta),
+        )]
+    return lista
+
+
+def generar_lote(ruta_db, salida, desde, hasta, tipos=("pdf", "reporte", "rotacion"), procesos=None, progreso=None):
+    # Devuelve [(tarea, ruta, segundos, bytes)] en orden de finalización
+    conn = sqlite3.connect(f"file:{ruta_db}?mode=ro", uri=True, timeout=30)
+    lista = tareas(conn, desde, hasta, tipos)
+    conn.close()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(ruta_db,)) as pool:
+        futuros = [pool.submit(generar, tarea, salida) for tarea in lista]
+        for futuro in as_completed(futuros):
+            resultados.append(futuro.result())
+            if progreso:
+                progreso(resultados[-1], len(resultados), len(lista))
+    return resultados
+
+
+# Uso fuera de la app:
+#   python reportes.py --desde 2025-30 --hasta 2025-38 [--salida reportes] [--tipos pdf,reporte,rotacion]
+#                      [--procesos N] [--db ruta]
+if __name__ == "__main__":
+    import sys
+
+    from conexion import DB_PATH
+
+    args = sys.argv[1:]
+
+    def _opcion(nombre, defecto=None):
+        return args[args.index(nombre) + 1] if nombre in args else defecto
+
+    def _semana(texto):
+        año, semana = texto.split("-")
+        return int(año), int(semana)
+
+    if "--desde" not in args or "--hasta" not in args:
+        sys.exit("Uso: python reportes.py --desde AAAA-SS --hasta AAAA-SS [--salida carpeta] [--procesos N]")
+    salida = _opcion("--salida", "reportes")
+    procesos = int(_opcion("--procesos")) if "--procesos" in args else None
+    tipos = tuple(_opcion("--tipos", "pdf,reporte,rotacion").split(","))
+
+    def _progreso(resultado, hechos, total):
+        tarea, ruta, segundos, tamaño = resultado
+        print(f"  [{hechos}/{total}] {os.path.relpath(ruta, salida)}  {segundos * 1000:7.1f} ms  {tamaño / 1024:8.1f} KB")
+
+    inicio = time.perf_counter()
+    resultados = generar_lote(
+        os.path.abspath(_opcion("--db", DB_PATH)), salida, _semana(_opcion("--desde")), _semana(_opcion("--hasta")),
+        tipos, procesos, _progreso,
+    )
+    total = time.perf_counter() - inicio
+    if not resultados:
+        print("No hay semanas con datos en el rango.")
+    else:
+        tamaño = sum(r[3] for r in resultados)
+        for tipo in sorted({r[0][0] for r in resultados}):
+            tiempos = sorted(r[2] for r in resultados if r[0][0] == tipo)
+            print(f"{tipo:9} {len(tiempos):5} archivos  p50 {tiempos[len(tiempos) // 2] * 1000:7.1f} ms  "
+                  f"máx {tiempos[-1] * 1000:7.1f} ms")
+        print(f"{len(resultados)} reportes ({tamaño / 1024 / 1024:.1f} MB) en {total:.1f}s: "
+              f"{len(resultados) / total:.1f} reportes/s, {tamaño / 1024 / 1024 / total:.2f} MB/s -> {salida}")
@@ -0,0 +1,85 @@
+import functools
+import threading
+
+import pandas as pd
+import streamlit as st
+
+import consultas
+
+# Capa de acceso a datos con caché para las secciones de la app. Cada lectura se memoriza
+# con st.cache_data usando la versión de datos (tabla version_datos) como parte de la clave;
+# las escrituras incrementan esa versión y, al detectarse el cambio, se vacían las cachés.
+
+_lock = threading.Lock()
+_estadisticas = {}
+_cacheadas = []
+_version_vista = None
+
+
+def _version(conn):
+    global _version_vista
+    version = consultas.version_datos(conn)
+    with _lock:
+        cambio = _version_vista is not None and version != _version_vista
+        _version_vista = version
+    if cambio:
+        for fn in _cacheadas:
+            fn.clear()
+    return version
+
+
+def _cacheada(fn):
+    nombre = fn.__name__
+    _estadisticas[nombre] = {"llamadas": 0, "fallos": 0}
+
+    def _leer(_conn, version, *args):
+        with _lock:
+            _estadisticas[nombre]["fallos"] += 1
+        return fn(_conn, *args)
+
+    # st.cache_data identifica la función por módulo + __qualname__ + código: sin un
+    # nombre propio todas las funciones envueltas compartirían la misma caché.
+    _leer.__qualname__ = f"_leer_{nombre}"
+    en_cache = st.cache_data(show_spinner=False, max_entries=64)(_leer)
+    _cacheadas.append(en_cache)
+
+    @functools.wraps(fn)
+    def envoltura(conn, *args):
+        version = _version(conn)
+        with _lock:
+            _estadisticas[nombre]["llamadas"] += 1
+        return en_cache(conn, version, *args)
+
+    return envoltura
+
+
+ultima_semana = _cacheada(consultas.ultima_semana)
+leer_totales_autoritativos = _cacheada(consultas.leer_totales_autoritativos)
+totales_por_maquina_semanas = _cacheada(consultas.totales_por_maquina_semanas)
+totales_maquinas_semana = _cacheada(consultas.totales_maquinas_semana)
+neto_por_dia = _cacheada(consultas.neto_por_dia)
+tendencia_semanal = _cacheada(consultas.tendencia_semanal)
+resumen_semana = _cacheada(consultas.resumen_semana)
+ventas_semana = _cacheada(consultas.ventas_semana)
+ventas_semanales_por_mes = _cacheada(consultas.ventas_semanales_por_mes)
+fechas_registradas = _cacheada(consultas.fechas_registradas)
+maquinas = _cacheada(consultas.maquinas)
+productos_catalogo = _cacheada(consultas.productos_catalogo)
+rotacion_semana = _cacheada(consultas.rotacion_semana)
+rotacion_flota = _cacheada(consultas.rotacion_flota)
+mantenimientos = _cacheada(consultas.mantenimientos)
+
+
+def estadisticas_cache():
+    with _lock:
+        filas = [
+            {
+                "consulta": nombre,
+                "llamadas": e["llamadas"],
+                "aciertos": e["llamadas"] - e["fallos"],
+                "tasa_aciertos": (e["llamadas"] - e["fallos"]) / e["llamadas"] if e["llamadas"] else 0.0,
+            }
+            for nombre, e in _estadisticas.items()
+        ]
+        version = _version_vista
+    return pd.DataFrame(filas), version
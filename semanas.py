@@ -0,0 +1,41 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Derivaciones de semana ISO sobre columnas completas (sin apply fila a fila).
+
+
+def lunes_iso(años, semanas):
+    # Lunes de la semana ISO: el 4 de enero siempre cae en la semana 1
+    años = np.asarray(años, dtype="int64")
+    semanas = np.asarray(semanas, dtype="int64")
+    ene4 = (años - 1970).astype("datetime64[Y]").astype("datetime64[D]") + 3
+    dia_semana = (ene4.astype("int64") + 3) % 7          # 1970-01-01 fue jueves; 0 = lunes
+    return pd.to_datetime(ene4 - dia_semana + (semanas - 1) * 7)
+
+
+def lunes_de(fechas):
+    return fechas - pd.to_timedelta(fechas.dt.weekday, unit="D")
+
+
+def mes_etiqueta(fechas):
+    # strftime solo sobre los meses distintos; el resto es un take por código
+    codigos, meses = pd.factorize(fechas.dt.to_period("M"))
+    return pd.Series(np.asarray(meses.strftime("%B %Y"))[codigos], index=fechas.index)
+
+
+def etiqueta_semana(semanas, años):
+    return semanas.astype("int64").astype(str) + "-" + años.astype("int64").astype(str)
+
+
+def en_semanas(df, claves, col_semana="semana_num", col_año="semana_year"):
+    # Pertenencia de (semana, año) a un conjunto de claves vía MultiIndex
+    indice = pd.MultiIndex.from_arrays([df[col_semana], df[col_año]])
+    return indice.isin(list(claves))
+
+
+def inicio_ventana(fecha, meses):
+    # Primer día del mes que queda meses-1 meses antes de fecha (ventana de meses completos)
+    indice = fecha.year * 12 + fecha.month - 1 - (meses - 1)
+    return date(indice // 12, indice % 12 + 1, 1)
@@ -0,0 +1,234 @@
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from conexion import DB_PATH, obtener_conexion
+from exportacion import COLUMNAS_RANGO, columna_arrow, disponible, esquema_parquet
+from perfilador import perfil
+
+# Snapshots columnares para análisis de rango largo. Cada tabla histórica se escribe en Parquet
+# particionado por semana ISO (raiz/tabla/iso_year=AAAA/iso_week=S/parte.parquet) y un manifiesto
+# guarda la marca con que se escribió cada partición. La tabla snapshot_semana (migración 9) sube
+# la marca de una semana ante cualquier escritura, así sincronizar() solo reescribe las semanas
+# nuevas o cambiadas y nunca escribe en la base. Las lecturas usan pyarrow.dataset con proyección
+# de columnas y filtro de particiones, sin tocar la base que usan los operadores.
+
+RAIZ = os.environ.get("PUNTO_EXPRESS_SNAPSHOTS", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "snapshots"))
+INTERVALO = float(os.environ.get("PUNTO_EXPRESS_SNAPSHOT_INTERVALO", 300))
+TABLAS = tuple(COLUMNAS_RANGO)
+MANIFIESTO = "manifiesto.json"
+
+_lock = threading.Lock()
+_hilo = None
+_datasets = {}
+
+
+def _ruta_manifiesto(raiz):
+    return os.path.join(raiz, MANIFIESTO)
+
+
+def leer_manifiesto(raiz=RAIZ):
+    try:
+        with open(_ruta_manifiesto(raiz), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"actualizado": None, "tablas": {}}
+
+
+def _guardar_manifiesto(raiz, manifiesto):
+    ruta = _ruta_manifiesto(raiz)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _ruta_particion(raiz, tabla, iso_year, iso_week):
+    return os.path.join(raiz, tabla, f"iso_year={iso_year}", f"iso_week={iso_week}")
+
+
+def _escribir_particion(conn, raiz, tabla, esquema, iso_year, iso_week):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    filas = conn.execute(
+        f"SELECT {', '.join(esquema.names)} FROM {tabla} WHERE iso_year = ? AND iso_week = ? ORDER BY fecha, maquina",
+        (iso_year, iso_week),
+    ).fetchall()
+    carpeta = _ruta_particion(raiz, tabla, iso_year, iso_week)
+    ruta = os.path.join(carpeta, "parte.parquet")
+    if not filas:
+        # Semana que quedó vacía (borrados): se elimina la partición
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        return 0
+    os.makedirs(carpeta, exist_ok=True)
+    columnas = list(zip(*filas))
+    tabla_arrow = pa.table([columna_arrow(col, campo.type) for col, campo in zip(columnas, esquema)], schema=esquema)
+    # El temporal empieza con "." para que pyarrow.dataset no lo tome como parte del snapshot
+    temporal = os.path.join(carpeta, ".parte.parquet.tmp")
+    pq.write_table(tabla_arrow, temporal)
+    os.replace(temporal, ruta)
+    return len(filas)
+
+
+def sincronizar(conn=None, raiz=RAIZ, completo=False):
+    # Escribe las particiones cuya marca en snapshot_semana difiere del manifiesto (todas con
+    # completo=True). Devuelve {tabla: semanas reescritas}.
+    conn = conn or obtener_conexion()
+    with _lock:
+        os.makedirs(raiz, exist_ok=True)
+        manifiesto = leer_manifiesto(raiz)
+        escritas = {tabla: 0 for tabla in TABLAS}
+        # Una sola transacción de lectura: marcas y filas corresponden al mismo estado de la base
+        conn.execute("BEGIN")
+        try:
+            marcas = conn.execute("SELECT tabla, iso_year, iso_week, marca FROM snapshot_semana").fetchall()
+            esquemas = {tabla: esquema_parquet(conn, tabla) for tabla in TABLAS}
+            for tabla, iso_year, iso_week, marca in marcas:
+                if tabla not in esquemas:
+                    continue
+                semanas = manifiesto["tablas"].setdefault(tabla, {})
+                clave = f"{iso_year}-{iso_week}"
+                if not completo and semanas.get(clave, {}).get("marca") == marca:
+                    continue
+                filas = _escribir_particion(conn, raiz, tabla, esquemas[tabla], iso_year, iso_week)
+                semanas[clave] = {"marca": marca, "filas": filas}
+                escritas[tabla] += 1
+        finally:
+            conn.execute("ROLLBACK")
+        if any(escritas.values()) or manifiesto["actualizado"] is None:
+            manifiesto["actualizado"] = datetime.now().isoformat(timespec="seconds")
+            _guardar_manifiesto(raiz, manifiesto)
+        return escritas
+
+
+def pendientes(conn, raiz=RAIZ):
+    # Semanas con cambios aún no volcadas al snapshot
+    semanas = leer_manifiesto(raiz)["tablas"]
+    return sum(
+        1 for tabla, iso_year, iso_week, marca in conn.execute("SELECT tabla, iso_year, iso_week, marca FROM snapshot_semana")
+        if semanas.get(tabla, {}).get(f"{iso_year}-{iso_week}", {}).get("marca") != marca
+    )
+
+
+def iniciar_periodico(intervalo=INTERVALO, raiz=RAIZ):
+    # Hilo de fondo que sincroniza cada `intervalo` segundos (0 lo desactiva)
+    global _hilo
+    if not intervalo or not disponible("pyarrow"):
+        return False
+
+    def _bucle():
+        perfil.en_seccion("Snapshots")
+        while True:
+            try:
+                sincronizar(raiz=raiz)
+            except Exception as e:
+                print(f"[snapshots] sincronización fallida: {e}")
+            time.sleep(intervalo)
+
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_bucle, name="punto-express-snapshots", daemon=True)
+            _hilo.start()
+    return True
+
+
+def existe(raiz=RAIZ):
+    return disponible("pyarrow") and os.path.exists(_ruta_manifiesto(raiz))
+
+
+def _version(raiz):
+    # El manifiesto se reescribe en cada sincronización con cambios: su mtime versiona el snapshot
+    return os.stat(_ruta_manifiesto(raiz)).st_mtime_ns
+
+
+def _dataset(raiz, tabla):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # El descubrimiento de archivos se reutiliza mientras el manifiesto no cambie
+    carpeta = os.path.join(raiz, tabla)
+    if not os.path.isdir(carpeta):
+        return None
+    clave = (raiz, tabla)
+    version = _version(raiz)
+    if clave not in _datasets or _datasets[clave][0] != version:
+        particion = ds.partitioning(pa.schema([("iso_year", pa.int32()), ("iso_week", pa.int32())]), flavor="hive")
+        _datasets[clave] = (version, ds.dataset(carpeta, format="parquet", partitioning=particion))
+    return _datasets[clave][1]
+
+
+def _filtro(desde, hasta, maquinas):
+    import pyarrow.dataset as ds
+
+    año, semana = ds.field("iso_year"), ds.field("iso_week")
+    filtro = None
+    if desde:
+        filtro = (año > desde[0]) | ((año == desde[0]) & (semana >= desde[1]))
+    if hasta:
+        tope = (año < hasta[0]) | ((año == hasta[0]) & (semana <= hasta[1]))
+        filtro = tope if filtro is None else filtro & tope
+    if maquinas:
+        en_maquinas = ds.field("maquina").isin(list(maquinas))
+        filtro = en_maquinas if filtro is None else filtro & en_maquinas
+    return filtro
+
+
+def leer(tabla, columnas=None, desde=None, hasta=None, maquinas=None, raiz=RAIZ):
+    # desde/hasta: (iso_year, iso_week) inclusivos; el filtro de semana poda particiones enteras
+    dataset = _dataset(raiz, tabla) if existe(raiz) else None
+    if dataset is None:
+        return pd.DataFrame(columns=list(columnas or COLUMNAS_RANGO[tabla] + ["iso_year", "iso_week"]))
+    return dataset.to_table(columns=list(columnas or dataset.schema.names), filter=_filtro(desde, hasta, maquinas)).to_pandas()
+
+
+def totales_semanales(desde=None, hasta=None, maquinas=None, raiz=RAIZ):
+    # Ventas/egresos/neto por semana ISO; la agregación corre en Arrow sobre dos columnas y el
+    # resultado se memoriza por versión del snapshot (no cambia entre sincronizaciones)
+    if not existe(raiz):
+        return pd.DataFrame(columns=["iso_year", "iso_week", "ventas", "egresos", "neto"])
+    return _totales_semanales(raiz, _version(raiz), desde, hasta, tuple(maquinas or ())).copy()
+
+
+@functools.lru_cache(maxsize=32)
+def _totales_semanales(raiz, version, desde, hasta, maquinas):
+    dataset = _dataset(raiz, "resumen_semanal")
+    if dataset is None:
+        return pd.DataFrame(columns=["iso_year", "iso_week", "ventas", "egresos", "neto"])
+    tabla = dataset.to_table(
+        columns=["iso_year", "iso_week", "ventas", "egresos"], filter=_filtro(desde, hasta, maquinas)
+    )
+    df = (
+        tabla.group_by(["iso_year", "iso_week"])
+        .aggregate([("ventas", "sum"), ("egresos", "sum")])
+        .to_pandas()
+        .rename(columns={"ventas_sum": "ventas", "egresos_sum": "egresos"})
+        .fillna({"ventas": 0.0, "egresos": 0.0})
+        .sort_values(["iso_year", "iso_week"], ignore_index=True)
+    )
+    df["neto"] = df["ventas"] - df["egresos"]
+    return df
+
+
+# Uso fuera de la app (cron o tarea programada):
+#   python snapshots.py [--db ruta] [--dir carpeta] [--completo]
+if __name__ == "__main__":
+    import sqlite3
+    import sys
+
+    args = sys.argv[1:]
+    ruta = args[args.index("--db") + 1] if "--db" in args else DB_PATH
+    raiz = args[args.index("--dir") + 1] if "--dir" in args else RAIZ
+
+    conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    inicio = time.perf_counter()
+    escritas = sincronizar(conn, raiz, completo="--completo" in args)
+    for tabla, semanas in escritas.items():
+        print(f"  {tabla}: {semanas} semana(s) reescritas")
+    print(f"Snapshot en {raiz} ({time.perf_counter() - inicio:.1f}s)")
+    conn.close()
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# Ningún módulo importado por las pruebas debe tocar la base real de la app
+os.environ["PUNTO_EXPRESS_DB"] = os.path.join(tempfile.mkdtemp(prefix="punto-express-pruebas-"), "ventas_semanales.db")
+
+from migraciones import aplicar_migraciones
+
+
+@pytest.fixture
+def ruta_db(tmp_path):
+    return str(tmp_path / "ventas_semanales.db")
+
+
+@pytest.fixture
+def conn(ruta_db):
+    # Base en disco con el esquema completo; autocommit como las conexiones de la app
+    conexion = sqlite3.connect(ruta_db, isolation_level=None)
+    conexion.execute("PRAGMA journal_mode = WAL")
+    aplicar_migraciones(conexion)
+    yield conexion
+    conexion.close()
@@ -0,0 +1,69 @@
+import json
+import sqlite3
+import threading
+from http.client import HTTPConnection
+
+import pytest
+
+import api
+import consultas
+
+INSERTAR = ("INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+@pytest.fixture
+def servidor(conn, ruta_db):
+    conn.execute(INSERTAR, ("Semana 38-2025", "2025-09-15", "Norte", "Lunes", 300, 0, 2025, 38))
+    servidor = api.ServidorAPI(("127.0.0.1", 0), ruta_db, registrar=False)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _get(servidor, ruta, **cabeceras):
+    http = HTTPConnection(*servidor.server_address, timeout=10)
+    http.request("GET", ruta, headers=cabeceras)
+    respuesta = http.getresponse()
+    cuerpo = respuesta.read()
+    http.close()
+    return respuesta.status, respuesta.getheader("ETag"), json.loads(cuerpo) if cuerpo else None
+
+
+def _escribir(ruta_db, ventas):
+    otra = sqlite3.connect(ruta_db, isolation_level=None)
+    otra.execute("BEGIN IMMEDIATE")
+    otra.execute("UPDATE resumen_semanal SET ventas = ?", (ventas,))
+    consultas.marcar_cambio(otra)
+    otra.execute("COMMIT")
+    otra.close()
+
+
+def test_etag_y_304_hasta_que_cambian_los_datos(servidor, ruta_db):
+    estado, etag, cuerpo = _get(servidor, "/api/totales?anio=2025&semana=38")
+    assert estado == 200 and cuerpo["ventas"] == 300.0
+    assert _get(servidor, "/api/totales?anio=2025&semana=38", **{"If-None-Match": etag})[:2] == (304, etag)
+
+    _escribir(ruta_db, 450)
+    estado, etag_nuevo, cuerpo = _get(servidor, "/api/totales?anio=2025&semana=38", **{"If-None-Match": etag})
+    assert (estado, cuerpo["ventas"]) == (200, 450.0) and etag_nuevo != etag
+
+
+def test_cuerpo_y_etag_de_la_misma_version(servidor, ruta_db, monkeypatch):
+    # Una escritura que llega entre la lectura del ETag y la del cuerpo no se mezcla en la respuesta
+    def con_escritura_en_medio(conn, params):
+        _escribir(ruta_db, 999)
+        return {"ventas": consultas.leer_totales_autoritativos(conn, 2025, 38)[0]}
+
+    monkeypatch.setitem(api.RUTAS, "/api/prueba", con_escritura_en_medio)
+    estado, etag, cuerpo = _get(servidor, "/api/prueba")
+    assert (estado, etag, cuerpo) == (200, '"v0"', {"ventas": 300.0})
+    # La siguiente lectura ve la versión nueva con sus datos
+    _, etag, cuerpo = _get(servidor, "/api/totales?anio=2025&semana=38")
+    assert (etag, cuerpo["ventas"]) == ('"v1"', 999.0)
+
+
+def test_semana_53_invalida(servidor):
+    assert _get(servidor, "/api/totales?anio=2025&semana=53")[0] == 400
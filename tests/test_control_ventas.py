@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+import consultas
+import grilla
+from operaciones import guardar_celdas_resumen, sumar_egresos
+
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+FECHAS = [date(2025, 9, 15) + timedelta(days=i) for i in range(6)]
+MAQUINAS = ["Buses", "Norte"]
+SEMANA = "Semana 38-2025"
+
+
+def _grilla(conn):
+    return grilla.construir(consultas.resumen_semana(conn, 2025, 38), MAQUINAS, FECHAS, DIAS)
+
+
+def _guardar(conn, original, editada):
+    cambios = grilla.cambios(original, editada, FECHAS, DIAS, SEMANA, 2025, 38)
+    conn.execute("BEGIN")
+    n = guardar_celdas_resumen(conn, *cambios)
+    conn.execute("COMMIT")
+    return n
+
+
+def test_solo_se_escriben_las_celdas_modificadas(conn):
+    original = _grilla(conn)
+    editada = original.copy()
+    editada.loc["Norte", "Lunes · Ventas"] = 300
+    editada.loc["Norte", "Martes · Egresos"] = 40
+    assert _guardar(conn, original, editada) == 2
+    filas = conn.execute("SELECT maquina, fecha, ventas, egresos FROM resumen_semanal ORDER BY fecha").fetchall()
+    assert filas == [("Norte", "2025-09-15", 300, 0), ("Norte", "2025-09-16", 0, 40)]
+
+
+def test_upsert_no_duplica_ni_pisa_el_otro_campo(conn):
+    original = _grilla(conn)
+    editada = original.copy()
+    editada.loc["Norte", "Lunes · Ventas"] = 300
+    _guardar(conn, original, editada)
+
+    # Mientras se edita la grilla, Rotación sincroniza un egreso en la misma celda
+    original = _grilla(conn)
+    conn.execute("BEGIN")
+    sumar_egresos(conn, [("Norte", "2025-09-15", 25.0)])
+    conn.execute("COMMIT")
+    editada = original.copy()
+    editada.loc["Norte", "Lunes · Ventas"] = 500
+    assert _guardar(conn, original, editada) == 1
+
+    assert conn.execute("SELECT ventas, egresos FROM resumen_semanal WHERE maquina = 'Norte'").fetchall() == [(500, 25)]
+    assert conn.execute("SELECT ventas, egresos, filas FROM weekly_machine_totals").fetchall() == [(500.0, 25.0, 1)]
+
+
+def test_sin_cambios_no_escribe(conn):
+    original = _grilla(conn)
+    assert grilla.cambios(original, original.copy(), FECHAS, DIAS, SEMANA, 2025, 38) == ([], [])
@@ -0,0 +1,69 @@
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from costos import UNIDADES_POR_PAQUETE, agregar_costos, calcular_gasto, calcular_precio_unitario
+
+UNIDADES = ["unidad", "docena", "paquete", "caja", None]
+
+
+def _valor(rnd):
+    return rnd.choice([
+        lambda: float(rnd.randint(0, 50000)),
+        lambda: rnd.uniform(-1000, 1e6),
+        lambda: rnd.randint(0, 500),
+        lambda: str(rnd.randint(0, 9999)),
+        lambda: "abc",
+        lambda: None,
+        lambda: float("nan"),
+        lambda: float("inf"),
+    ])()
+
+
+def _paquete(rnd):
+    # Incluye los vacíos que deben caer en UNIDADES_POR_PAQUETE
+    return rnd.choice([lambda: rnd.randint(1, 48), lambda: 0, lambda: None, lambda: float("nan"), lambda: "12", lambda: "abc"])()
+
+
+def _marco(rnd, n, mezclado):
+    if mezclado:
+        costo = [_valor(rnd) for _ in range(n)]
+        cantidad = [_valor(rnd) for _ in range(n)]
+    else:
+        costo = [float(rnd.randint(0, 50000)) for _ in range(n)]
+        cantidad = [rnd.randint(1, 40) for _ in range(n)]
+    return pd.DataFrame({
+        "costo_compra": pd.Series(costo, dtype=object if mezclado else float),
+        "unidad_compra": [rnd.choice(UNIDADES) for _ in range(n)],
+        "cantidad": pd.Series(cantidad, dtype=object if mezclado else "int64"),
+        "unidades_por_paquete": pd.Series([_paquete(rnd) for _ in range(n)], dtype=object),
+    })
+
+
+def _iguales(a, b):
+    return (math.isnan(a) and math.isnan(b)) or a == b
+
+
+@pytest.mark.parametrize("caso", range(40))
+def test_vectorizado_igual_a_los_helpers_escalares(caso):
+    rnd = random.Random(2025 + caso)
+    df = _marco(rnd, rnd.randint(1, 60), mezclado=caso % 2 == 0)
+    res = agregar_costos(df)
+    for i in df.index:
+        # Celda a celda: iterrows convierte None en NaN cuando la fila mezcla tipos
+        fila = {c: df.at[i, c] for c in df.columns}
+        precio = calcular_precio_unitario(fila["costo_compra"], fila["unidad_compra"], fila["unidades_por_paquete"])
+        gasto = calcular_gasto(fila["costo_compra"], fila["unidad_compra"], fila["cantidad"], fila["unidades_por_paquete"])
+        assert _iguales(precio, res.at[i, "precio_unitario"]), fila
+        assert _iguales(gasto, res.at[i, "gasto_total"]), fila
+
+
+@pytest.mark.parametrize("paquete", [0, None, float("nan"), "", "abc"])
+def test_paquete_vacio_usa_el_predeterminado(paquete):
+    assert calcular_precio_unitario(1200.0, "paquete", paquete) == 1200.0 / UNIDADES_POR_PAQUETE
+    assert calcular_gasto(1200.0, "paquete", 3, paquete) == 3 * 1200.0 / UNIDADES_POR_PAQUETE
+    df = pd.DataFrame({"costo_compra": [1200.0], "unidad_compra": ["paquete"], "cantidad": [3],
+                       "unidades_por_paquete": pd.Series([paquete], dtype=object)})
+    assert agregar_costos(df).at[0, "precio_unitario"] == 1200.0 / UNIDADES_POR_PAQUETE
@@ -0,0 +1,64 @@
+import sqlite3
+import threading
+
+import pytest
+
+from escritor import Escritor
+
+INSERTAR = "INSERT INTO maquina (nombre_maquina) VALUES (?)"
+
+
+def _version(conn):
+    return conn.execute("SELECT version FROM version_datos").fetchone()[0]
+
+
+def test_lote_con_un_trabajo_fallido(conn, ruta_db):
+    escritor = Escritor(ruta=ruta_db, ventana=0.05)
+    version = _version(conn)
+
+    def fallar(tx):
+        tx.execute(INSERTAR, ("Descartada",))
+        raise ValueError("trabajo inválido")
+
+    futuros = [escritor.enviar(lambda tx: tx.execute(INSERTAR, ("Sur",)).rowcount),
+               escritor.enviar(fallar),
+               escritor.ejecutar(INSERTAR, ("Centro",))]
+    assert futuros[0].result(10) == 1
+    with pytest.raises(ValueError):
+        futuros[1].result(10)
+    assert futuros[2].result(10) == 1
+
+    # Un solo lote y un solo COMMIT: el trabajo fallido se deshizo en su SAVEPOINT
+    assert escritor.metricas()["lotes"] == 1
+    assert escritor.metricas()["errores"] == 1
+    nombres = {r[0] for r in conn.execute("SELECT nombre_maquina FROM maquina")}
+    assert {"Sur", "Centro"} <= nombres and "Descartada" not in nombres
+    assert _version(conn) == version + 1
+
+
+def test_escrituras_concurrentes_se_agrupan(conn, ruta_db):
+    escritor = Escritor(ruta=ruta_db, ventana=0.05)
+    hilos = [threading.Thread(target=escritor.escribir, args=(lambda tx, i=i: tx.execute(INSERTAR, (f"Lote {i}",)),))
+             for i in range(20)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join(10)
+    assert conn.execute("SELECT COUNT(*) FROM maquina WHERE nombre_maquina LIKE 'Lote %'").fetchone()[0] == 20
+    assert escritor.metricas()["lotes"] < 20
+
+
+def test_base_bloqueada_resuelve_todo_el_lote(conn, ruta_db):
+    escritor = Escritor(ruta=ruta_db, pragmas=("PRAGMA busy_timeout = 50",), ventana=0.05)
+    bloqueo = sqlite3.connect(ruta_db, isolation_level=None)
+    bloqueo.execute("BEGIN IMMEDIATE")
+    try:
+        futuros = [escritor.ejecutar(INSERTAR, (f"B{i}",)) for i in range(3)]
+        for futuro in futuros:
+            with pytest.raises(sqlite3.OperationalError):
+                futuro.result(10)
+    finally:
+        bloqueo.execute("ROLLBACK")
+        bloqueo.close()
+    # El escritor sigue sirviendo cuando la base se libera
+    assert escritor.escribir(lambda tx: tx.execute(INSERTAR, ("Libre",)).rowcount, timeout=10) == 1
@@ -0,0 +1,76 @@
+import io
+
+from escritor import Escritor
+from importacion import importar
+from operaciones import sumar_egresos
+
+VENTAS = """maquina,fecha,ventas,egresos
+Norte,2025-09-15,"$ 12.500",0
+norte,16/09/2025,8000,500
+Buses,2025-09-15,3000,
+Desconocida,2025-09-15,100,0
+Norte,2025-09-15,99999,0
+"""
+
+ROTACION = """maquina;fecha;producto;cantidad;costo;unidad;unidades_por_paquete
+Norte;2025-09-15;Papas;4;1200;paquete;6
+Norte;2025-09-15;Gaseosa;2;2400;docena;
+Caldas;2025-09-17;Papas;1;600;unidad;
+"""
+
+
+def _importar(ruta_db, texto, nombre):
+    return importar(io.BytesIO(texto.encode()), escritor=Escritor(ruta=ruta_db), nombre=nombre, lote=2)
+
+
+def _totales(conn):
+    return conn.execute("SELECT maquina, ventas, egresos, filas FROM weekly_machine_totals ORDER BY maquina").fetchall()
+
+
+def test_reimportar_no_duplica(conn, ruta_db):
+    primera = _importar(ruta_db, VENTAS, "ventas.csv")
+    assert (primera["tipo"], primera["insertadas"], primera["duplicadas"]) == ("ventas", 3, 1)
+    assert primera["rechazadas"] == {"máquina desconocida": 1}
+    totales = _totales(conn)
+    assert totales == [("Buses", 3000.0, 0.0, 1), ("Norte", 20500.0, 500.0, 2)]
+
+    segunda = _importar(ruta_db, VENTAS, "ventas.csv")
+    assert (segunda["insertadas"], segunda["duplicadas"]) == (0, 4)
+    assert conn.execute("SELECT COUNT(*) FROM resumen_semanal").fetchone()[0] == 3
+    assert _totales(conn) == totales
+
+
+def test_rotacion_suma_egresos_con_la_etiqueta_de_control_ventas(conn, ruta_db):
+    _importar(ruta_db, VENTAS, "ventas.csv")
+    assert _importar(ruta_db, ROTACION, "rotacion.csv")["insertadas"] == 3
+    assert _importar(ruta_db, ROTACION, "rotacion.csv")["insertadas"] == 0
+
+    # El costo de compra se suma una sola vez al egreso del día; un día nuevo usa "Semana N-AAAA"
+    filas = conn.execute("SELECT maquina, fecha, semana, egresos FROM resumen_semanal ORDER BY maquina, fecha").fetchall()
+    assert filas == [
+        ("Buses", "2025-09-15", "Semana 38-2025", 0),
+        ("Caldas", "2025-09-17", "Semana 38-2025", 600),
+        ("Norte", "2025-09-15", "Semana 38-2025", 3600),
+        ("Norte", "2025-09-16", "Semana 38-2025", 500),
+    ]
+    assert conn.execute("SELECT SUM(egresos) FROM weekly_machine_totals").fetchone()[0] == 4700.0
+    assert conn.execute(
+        "SELECT tabla, marca > 0 FROM snapshot_semana WHERE iso_year = 2025 AND iso_week = 38 ORDER BY tabla"
+    ).fetchall() == [("resumen_semanal", 1), ("rotacion_producto", 1)]
+
+
+def test_ventas_completan_dias_solo_de_egreso(conn, ruta_db):
+    # Una compra registrada en Rotación crea el día con ventas 0 (egreso_auto); las ventas
+    # importadas para ese día lo completan en lugar de contarse como duplicadas
+    sumar_egresos(conn, [("Norte", "2025-09-15", 1200)])
+    texto = "maquina,fecha,ventas\nNorte,2025-09-15,50000\nNorte,2025-09-16,40000\n"
+    resumen = _importar(ruta_db, texto, "ventas.csv")
+    assert (resumen["insertadas"], resumen["duplicadas"]) == (2, 0)
+    assert conn.execute("SELECT fecha, ventas, egresos FROM resumen_semanal ORDER BY fecha").fetchall() == [
+        ("2025-09-15", 50000, 1200), ("2025-09-16", 40000, 0),
+    ]
+    assert _totales(conn) == [("Norte", 90000.0, 1200.0, 2)]
+
+    # Con ventas ya cargadas, el mismo archivo es todo duplicado
+    segunda = _importar(ruta_db, texto, "ventas.csv")
+    assert (segunda["insertadas"], segunda["duplicadas"]) == (0, 2)
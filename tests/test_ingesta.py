@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+import ingesta
+from escritor import Escritor
+from ingesta import Diario, ServicioIngesta, aplicar_segmento
+
+EVENTOS = [{"maquina": "Norte", "fecha": "2025-09-15", "monto": 1000},
+           {"maquina": "norte", "fecha": "2025-09-15", "producto": "Papas", "cantidad": 2, "monto": 500}]
+
+
+def _ventas(conn):
+    return conn.execute("SELECT COALESCE(SUM(ventas), 0) FROM resumen_semanal WHERE maquina = 'Norte'").fetchone()[0]
+
+
+def _servicio(ruta_db, carpeta):
+    return ServicioIngesta(ruta_db, str(carpeta), escritor=Escritor(ruta=ruta_db, ventana=0))
+
+
+def test_recepcion_y_volcado(conn, ruta_db, tmp_path):
+    async def correr():
+        servicio = _servicio(ruta_db, tmp_path / "diario")
+        await servicio.iniciar()
+        assert (await servicio.recibir(EVENTOS + [{"maquina": "Nadie", "monto": 1}]))[0] == 202
+        await servicio.detener()
+        return servicio
+
+    servicio = asyncio.run(correr())
+    assert (servicio.confirmados, servicio.pendientes, servicio.rechazados) == (2, 0, 1)
+    assert _ventas(conn) == 1500
+    assert conn.execute("SELECT cantidad FROM rotacion_producto WHERE producto = 'Papas'").fetchone()[0] == 2
+    # Solo queda el segmento abierto vacío del diario, que se borra al cerrar
+    assert os.listdir(tmp_path / "diario") == []
+
+
+def test_recuperacion_tras_caida_sin_doble_conteo(conn, ruta_db, tmp_path):
+    carpeta = tmp_path / "diario"
+    os.makedirs(carpeta)
+    filas = [("Norte", "2025-09-15", "", 1, 100)] * 3
+    # Segmento abierto al caer (nunca volcado) con una última línea cortada
+    with open(carpeta / "00000000000000000001-a.abierto", "w") as f:
+        f.write("".join(json.dumps(e) + "\n" for e in filas) + '["Norte", "2025-')
+    # Segmento ya confirmado en la base, pero la caída llegó antes de borrar su archivo
+    with open(carpeta / "00000000000000000002-b.sellado", "w") as f:
+        f.write(json.dumps(["Norte", "2025-09-15", "", 1, 50]) + "\n")
+    conn.execute("BEGIN")
+    aplicar_segmento(conn, "00000000000000000002-b", [("Norte", "2025-09-15", "", 1, 50)])
+    # Aunque su registro sea viejo, sigue protegiendo al segmento mientras el archivo exista
+    conn.execute("UPDATE ingesta_segmento SET aplicado_en = datetime('now', '-30 days')")
+    conn.execute("COMMIT")
+
+    async def correr():
+        servicio = _servicio(ruta_db, carpeta)
+        recuperados = await servicio.iniciar()
+        await servicio.detener()
+        return recuperados
+
+    assert asyncio.run(correr()) == 4
+    assert _ventas(conn) == 350
+    assert os.listdir(carpeta) == []
+
+
+def test_volcado_fallido_se_reintenta_y_libera_pendientes(conn, ruta_db, tmp_path, monkeypatch):
+    fallos = [RuntimeError("base no disponible")]
+    original = ingesta.aplicar_segmento
+
+    def inestable(tx, *args):
+        if fallos:
+            raise fallos.pop()
+        return original(tx, *args)
+
+    monkeypatch.setattr(ingesta, "aplicar_segmento", inestable)
+
+    async def correr():
+        servicio = _servicio(ruta_db, tmp_path / "diario")
+        await servicio.iniciar()
+        servicio._parar = True          # sin volcado en segundo plano: se controla a mano
+        await servicio._tarea_volcado
+        await servicio.recibir(EVENTOS)
+        with pytest.raises(RuntimeError):
+            await servicio.volcar()
+        # El segmento sellado sigue en disco y los eventos siguen contando para la contrapresión
+        sellados = [n for n in os.listdir(tmp_path / "diario") if n.endswith(".sellado")]
+        assert len(sellados) == 1 and servicio.pendientes == 2
+        await servicio.volcar()
+        assert servicio.pendientes == 0
+        assert not [n for n in os.listdir(tmp_path / "diario") if n.endswith(".sellado")]
+        await servicio.recibir(EVENTOS[:1])
+        await servicio.volcar()
+        servicio.diario.cerrar()
+        return sellados[0].rsplit(".", 1)[0]
+
+    reintentado = asyncio.run(correr())
+    assert _ventas(conn) == 2500
+    # El registro del segmento reintentado se olvidó al confirmar el siguiente (su archivo ya no existe)
+    registrados = [r[0] for r in conn.execute("SELECT segmento FROM ingesta_segmento")]
+    assert len(registrados) == 1 and reintentado not in registrados
+
+
+def test_diario_descarta_solo_lo_pedido(tmp_path):
+    async def correr():
+        diario = Diario(str(tmp_path), fsync=False)
+        diario.escribir([("Norte", "2025-09-15", "", 1, 10)])
+        segmento, sellado = diario.sellar()
+        await sellado
+        assert diario.leer(segmento, "sellado") == [("Norte", "2025-09-15", "", 1, 10)]
+        await diario.descartar(segmento)
+        diario.cerrar()
+
+    asyncio.run(correr())
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,40 @@
+import sqlite3
+
+from migraciones import MIGRACIONES, _aplicadas, aplicar_migraciones, duplicados_respaldados, version_actual
+
+FILAS = [
+    ("Semana 38", "2025-09-15", "Norte", "Lunes", 100, 0, 2025, 38),
+    ("Semana 38-2025", "2025-09-15", "Norte", "Lunes", 200, 0, 2025, 38),
+    ("Semana 38", "2025-09-15", "Norte", "Lunes", 50, 0, 2025, 38),
+    ("Semana 38-2025", "2025-09-16", "Norte", "Martes", 70, 10, 2025, 38),
+]
+
+
+def test_duplicados_se_respaldan_antes_de_colapsar(ruta_db):
+    conn = sqlite3.connect(ruta_db)
+    aplicar_migraciones(conn, hasta=3)
+    conn.executemany(
+        "INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", FILAS)
+    conn.commit()
+    aplicar_migraciones(conn)
+
+    assert conn.execute("SELECT fecha, semana, ventas FROM resumen_semanal ORDER BY fecha").fetchall() == [
+        ("2025-09-15", "Semana 38-2025", 200), ("2025-09-16", "Semana 38-2025", 70)]
+    assert conn.execute("SELECT rowid_original, semana, ventas FROM resumen_semanal_duplicados ORDER BY 1").fetchall() == [
+        (1, "Semana 38", 100), (3, "Semana 38", 50)]
+    assert duplicados_respaldados(conn) == 2
+    # Los totales semanales solo cuentan las filas que quedaron
+    assert conn.execute("SELECT ventas, egresos, filas FROM weekly_machine_totals").fetchall() == [(270.0, 10.0, 2)]
+    conn.close()
+
+
+def test_migraciones_idempotentes(conn):
+    assert version_actual(conn) == MIGRACIONES[-1][0]
+    # Con el registro en memoria se devuelve la misma versión que en la primera llamada
+    assert aplicar_migraciones(conn) == MIGRACIONES[-1][0]
+    assert aplicar_migraciones(conn, hasta=3) == aplicar_migraciones(conn, hasta=3) == MIGRACIONES[-1][0]
+    _aplicadas.clear()          # fuerza la consulta a schema_version en lugar del registro en memoria
+    assert aplicar_migraciones(conn) == MIGRACIONES[-1][0]
+    assert conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == len(MIGRACIONES)
+    assert conn.execute("SELECT COUNT(*) FROM resumen_semanal_duplicados").fetchone()[0] == 0
@@ -0,0 +1,53 @@
+import pytest
+
+import repositorio
+from consultas import marcar_cambio
+
+INSERTAR = ("INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    # La clave de caché es (versión, argumentos): cada prueba parte de cachés vacías
+    for fn in repositorio._cacheadas:
+        fn.clear()
+    repositorio._version_vista = None
+    yield
+
+
+def _estadistica(nombre):
+    df, _ = repositorio.estadisticas_cache()
+    return df.set_index("consulta").loc[nombre]
+
+
+def test_lectura_repetida_sale_de_cache(conn):
+    conn.execute(INSERTAR, ("Semana 38-2025", "2025-09-15", "Norte", "Lunes", 300, 0, 2025, 38))
+    antes = _estadistica("leer_totales_autoritativos")
+    assert repositorio.leer_totales_autoritativos(conn, 2025, 38) == (300.0, 0.0)
+    # Sin cambio de versión la segunda lectura no consulta la base, aunque la tabla haya cambiado
+    conn.execute("UPDATE weekly_machine_totals SET ventas = 1")
+    assert repositorio.leer_totales_autoritativos(conn, 2025, 38) == (300.0, 0.0)
+    despues = _estadistica("leer_totales_autoritativos")
+    assert despues["llamadas"] - antes["llamadas"] == 2
+    assert despues["aciertos"] - antes["aciertos"] == 1
+
+
+def test_escritura_con_cambio_de_version_invalida(conn):
+    assert repositorio.ultima_semana(conn) is None
+    conn.execute("BEGIN")
+    conn.execute(INSERTAR, ("Semana 38-2025", "2025-09-15", "Norte", "Lunes", 300, 0, 2025, 38))
+    marcar_cambio(conn)
+    conn.execute("COMMIT")
+    assert repositorio.ultima_semana(conn) == (2025, 38)
+    assert repositorio.estadisticas_cache()[1] == 1
+
+
+def test_version_nueva_relee_los_datos(conn):
+    conn.execute(INSERTAR, ("Semana 38-2025", "2025-09-15", "Norte", "Lunes", 300, 0, 2025, 38))
+    assert repositorio.leer_totales_autoritativos(conn, 2025, 38) == (300.0, 0.0)
+    conn.execute("UPDATE resumen_semanal SET ventas = 450")
+    marcar_cambio(conn)
+    # La primera lectura de cualquier consulta con la versión nueva vacía todas las cachés
+    repositorio.maquinas(conn)
+    assert repositorio.leer_totales_autoritativos(conn, 2025, 38) == (450.0, 0.0)
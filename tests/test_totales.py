@@ -0,0 +1,54 @@
+import consultas
+import reportes
+
+INSERTAR = ("INSERT INTO resumen_semanal (semana, fecha, maquina, dia, ventas, egresos, iso_year, iso_week) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def _cargar(conn):
+    conn.executemany(INSERTAR, [
+        ("Semana 37-2025", "2025-09-08", "Norte", "Lunes", 100, 10, 2025, 37),
+        ("Semana 38-2025", "2025-09-15", "Norte", "Lunes", 300, 50, 2025, 38),
+        ("Semana 38-2025", "2025-09-16", "Norte", "Martes", 500, 0, 2025, 38),
+        ("Semana 38-2025", "2025-09-16", "Buses", "Martes", 0, 20, 2025, 38),
+        ("Semana 39-2025", "2025-09-22", "Buses", "Lunes", 900, 0, 2025, 39),
+    ])
+
+
+def test_triggers_mantienen_totales_semanales(conn):
+    _cargar(conn)
+    conn.execute("UPDATE resumen_semanal SET ventas = 400 WHERE maquina = 'Norte' AND fecha = '2025-09-15'")
+    conn.execute("DELETE FROM resumen_semanal WHERE iso_week = 39")
+    filas = conn.execute(
+        "SELECT iso_week, maquina, ventas, egresos, neto, dias_activos, filas FROM weekly_machine_totals ORDER BY 1, 2"
+    ).fetchall()
+    assert filas == [
+        (37, "Norte", 100.0, 10.0, 90.0, 1, 1),
+        (38, "Buses", 0.0, 20.0, -20.0, 0, 1),
+        (38, "Norte", 900.0, 50.0, 850.0, 2, 2),
+    ]
+    assert consultas.ultima_semana(conn) == (2025, 38)
+
+
+def test_totales_solo_de_las_semanas_pedidas(conn):
+    _cargar(conn)
+    df = consultas.totales_por_maquina_semanas(conn, ((2025, 38), (2025, 37)))
+    assert sorted(zip(df["semana_num"], df["maquina"])) == [(37, "Norte"), (38, "Buses"), (38, "Norte")]
+    assert consultas.totales_por_maquina_semanas(conn, ()).empty
+
+
+def test_dias_de_la_semana_cuentan_fechas_distintas(conn):
+    _cargar(conn)
+    conn.execute(INSERTAR, ("Semana 38-2025", "2025-09-17", "Buses", "Miércoles", 200, 0, 2025, 38))
+    df = consultas.totales_por_maquina_semanas(conn, ((2025, 38), (2025, 37)))
+    # Norte y Buses tienen 2 filas cada una, pero entre ambas cubren 3 fechas
+    assert df["filas"].max() == 2
+    assert dict(zip(df["semana_num"], df["dias_semana"])) == {37: 1, 38: 3}
+
+
+def test_resumen_reporte_dia_mas_rentable(conn):
+    _cargar(conn)
+    resumen = reportes.resumen_reporte(consultas.totales_maquinas_semana(conn, 2025, 38), consultas.neto_por_dia(conn, 2025, 38))
+    valores = dict(zip(resumen["Indicador"], resumen["Valor"]))
+    assert valores["📆 Día más rentable"] == "Martes"
+    assert valores["🔢 Total Ventas"] == "$800"